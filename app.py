@@ -6,6 +6,7 @@ Flask web application for managing hospital operations
 from flask import Flask, render_template
 from config import Config
 from extensions import db, init_extensions
+from utils.json_provider import FastJSONProvider
 from datetime import datetime
 
 
@@ -13,6 +14,7 @@ def create_app(config_class=Config):
     """Create and configure the Flask application"""
     app = Flask(__name__)
     app.config.from_object(config_class)
+    app.json = FastJSONProvider(app)
     
     # Initialize extensions
     init_extensions(app)
@@ -75,8 +77,8 @@ def init_database():
     from models.patient import Patient
     from models.appointment import Appointment
     from models.treatment import Treatment
-    from models.doctor_availability import DoctorAvailability
-    from datetime import date, time, timedelta
+    from models.doctor_availability_rule import DoctorAvailabilityRule
+    from datetime import date, time
     
     # Create all tables
     db.create_all()
@@ -181,17 +183,16 @@ def init_database():
             db.session.add(doctor)
             db.session.flush()  # Flush to get doctor.id
             
-            # Add availability for next 7 days
-            for i in range(7):
-                avail_date = date.today() + timedelta(days=i)
-                availability = DoctorAvailability(
+            # Weekly availability: every day 9 AM - 5 PM
+            for weekday in range(7):
+                rule = DoctorAvailabilityRule(
                     doctor_id=doctor.id,
-                    available_date=avail_date,
+                    weekday=weekday,
                     start_time=time(9, 0),
                     end_time=time(17, 0),
-                    is_available=True
+                    effective_from=date.today()
                 )
-                db.session.add(availability)
+                db.session.add(rule)
         
         # Create sample patients
         patients_data = [
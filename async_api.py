@@ -0,0 +1,264 @@
+"""
+Read-only asyncio API service
+Serves the doctor directory and free-slot lookups on an async database
+driver, so thousands of concurrent reads wait on I/O in one event loop
+instead of each occupying a sync gunicorn worker.
+
+Handled (same URLs, parameters and JSON as the Flask API):
+- GET /api/doctors
+- GET /api/doctors/<id>
+- GET /api/doctors/<id>/free-slots
+
+Every other path returns 404, so route only these URLs here (e.g. an nginx
+location for GET /api/doctors) and everything else to the Flask app.
+
+Requires uvicorn plus aiosqlite (SQLite) or asyncpg (PostgreSQL):
+    pip install uvicorn aiosqlite
+    uvicorn --factory async_api:create_async_app --port 5001
+
+Each request runs inside a Flask request context of the regular app, so
+config, query-string parsing, serializers, ETags and compression are the
+ones the Flask API uses; only the database I/O is async. Free slots are
+computed fresh per request (the free-slot cache client is synchronous).
+
+The gain comes from a networked database (PostgreSQL), where sync workers
+sit idle during each round trip. On a local SQLite file aiosqlite adds a
+thread hop per query and the sync path is faster; compare with
+benchmark_readonly_api.py before deploying.
+"""
+import asyncio
+from flask import jsonify, request, session
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import configure_mappers
+from app import create_app
+from config import Config
+from models.doctor import Doctor
+from routes.api import (serialize_doctor, doctor_list_filters, requested_ids, multi_get_response,
+                        free_slot_window, free_slots_response)
+from utils.conditional import etag_statement, etag_from_values, not_modified, etag_header
+from utils.pagination import keyset_query, page_from_rows, page_limit, next_link
+from utils.scheduling import availability_statements, build_availability, booked_statement, free_slots_from
+from utils.slot_holds import slot_holds, holder_for_user_id
+
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg'
+}
+
+
+def async_database_url(url):
+    """The async-driver equivalent of a SQLAlchemy database URL"""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f'No async driver configured for {backend}; set ASYNC_DATABASE_URI')
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+
+# ============= HANDLERS =============
+# Keyed by the Flask endpoint the URL matches; each mirrors that view
+# with awaited queries.
+
+async def get_doctors(db_session):
+    try:
+        serialize = serialize_doctor.for_request()
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+
+    if 'ids' in request.args:
+        ids, error = requested_ids()
+        if error:
+            return error
+        query = select(Doctor).where(Doctor.id.in_(ids), Doctor.is_deleted == False)
+        etag = etag_from_values((await db_session.execute(etag_statement(query, Doctor, Doctor.user))).one())
+        cached = not_modified(etag)
+        if cached:
+            return cached
+        doctors = (await db_session.scalars(query.options(*serialize.options()))).all()
+        return multi_get_response(ids, {d.id: serialize(d) for d in doctors}, etag)
+
+    query = select(Doctor).where(*doctor_list_filters())
+
+    etag = etag_from_values((await db_session.execute(etag_statement(query, Doctor, Doctor.user))).one())
+    cached = not_modified(etag)
+    if cached:
+        return cached
+
+    limit = page_limit()
+    try:
+        page_query = keyset_query(query.options(*serialize.options()), [Doctor.id], limit,
+                                  request.args.get('after'))
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    page = page_from_rows((await db_session.scalars(page_query)).all(), [Doctor.id], limit)
+
+    return jsonify({
+        'success': True,
+        'count': len(page.items),
+        'data': [serialize(d) for d in page.items],
+        'next_cursor': page.next_cursor,
+        'next': next_link(page.next_cursor)
+    }), 200, etag_header(etag)
+
+
+async def get_doctor(db_session, doctor_id):
+    try:
+        serialize = serialize_doctor.for_request()
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+
+    query = select(Doctor).where(Doctor.id == doctor_id, Doctor.is_deleted == False)
+    etag = etag_from_values((await db_session.execute(etag_statement(query, Doctor, Doctor.user))).one())
+    cached = not_modified(etag)
+    if cached:
+        return cached
+
+    doctor = (await db_session.scalars(query.options(*serialize.options()))).first()
+
+    if not doctor:
+        return jsonify({
+            'success': False,
+            'message': 'Doctor not found'
+        }), 404
+
+    return jsonify({
+        'success': True,
+        'data': serialize(doctor)
+    }), 200, etag_header(etag)
+
+
+async def get_doctor_free_slots(db_session, doctor_id):
+    doctor = (await db_session.scalars(
+        select(Doctor).where(Doctor.id == doctor_id, Doctor.is_deleted == False)
+    )).first()
+    if not doctor:
+        return jsonify({
+            'success': False,
+            'message': 'Doctor not found'
+        }), 404
+
+    start_date, end_date, duration, error = free_slot_window(doctor)
+    if error:
+        return error
+
+    rules, overrides = availability_statements([doctor_id], start_date, end_date)
+    blocks = build_availability([doctor_id], start_date, end_date,
+                                (await db_session.scalars(rules)).all(),
+                                (await db_session.execute(overrides)).all())[doctor_id]
+    booked = (await db_session.execute(booked_statement(doctor_id, start_date, end_date))).all()
+
+    # Flask-Login keeps the user id in the signed session cookie; a user's own holds stay bookable
+    user_id = session.get('_user_id')
+    holder = holder_for_user_id(user_id) if user_id else None
+    # The hold store client is synchronous; keep it off the event loop
+    held = await asyncio.to_thread(slot_holds.held_intervals, doctor_id, start_date, end_date,
+                                   exclude_holder=holder, minutes=duration)
+
+    slots = free_slots_from(blocks, booked, duration, held)
+    return free_slots_response(doctor_id, start_date, end_date, duration, slots)
+
+
+HANDLERS = {
+    'api.get_doctors': get_doctors,
+    'api.get_doctor': get_doctor,
+    'api.get_doctor_free_slots': get_doctor_free_slots
+}
+
+
+# ============= ASGI APPLICATION =============
+
+class ReadOnlyAPI:
+    """ASGI application dispatching HANDLERS on an async engine"""
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        # Backrefs such as Doctor.user exist once the mappers are configured
+        configure_mappers()
+        url = flask_app.config.get('ASYNC_DATABASE_URI') or \
+            async_database_url(flask_app.config['SQLALCHEMY_DATABASE_URI'])
+        self.engine = create_async_engine(url)
+        self.sessions = async_sessionmaker(self.engine, expire_on_commit=False)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _http(self, scope, send):
+        headers = [(name.decode('latin-1'), value.decode('latin-1')) for name, value in scope['headers']]
+        host = dict(headers).get('host') or '%s:%s' % scope.get('server', ('localhost', 80))
+        ctx = self.flask_app.test_request_context(
+            scope['path'],
+            method=scope['method'],
+            query_string=scope['query_string'].decode('latin-1'),
+            headers=headers,
+            base_url=f"{scope.get('scheme', 'http')}://{host}{scope.get('root_path', '')}"
+        )
+        with ctx:
+            response = self.flask_app.process_response(
+                self.flask_app.make_response(await self._dispatch())
+            )
+            body = b'' if scope['method'] == 'HEAD' else b''.join(response.iter_encoded())
+            response_headers = [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                                for name, value in response.headers.items()]
+
+        await send({'type': 'http.response.start', 'status': response.status_code,
+                    'headers': response_headers})
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def _dispatch(self):
+        if request.method not in ('GET', 'HEAD'):
+            return jsonify({
+                'success': False,
+                'message': 'This service is read-only'
+            }), 405
+
+        handler = HANDLERS.get(request.endpoint) if request.routing_exception is None else None
+        if handler is None:
+            return jsonify({
+                'success': False,
+                'message': 'Not found'
+            }), 404
+
+        try:
+            async with self.sessions() as db_session:
+                return await handler(db_session, **request.view_args)
+        except Exception as e:
+            self.flask_app.logger.exception(f"Read-only API error on {request.path}: {str(e)}")
+            return jsonify({
+                'success': False,
+                'message': 'Internal server error'
+            }), 500
+
+
+def create_async_app(config_class=Config):
+    """Create the ASGI application (uvicorn --factory async_api:create_async_app)"""
+    return ReadOnlyAPI(create_app(config_class))
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    uvicorn.run(create_async_app(), host='0.0.0.0', port=5001)
@@ -0,0 +1,84 @@
+# benchmark_readonly_api.py
+"""
+Compare concurrent read throughput of the Flask API and the async read-only service
+Start both servers against the same database, e.g.
+    gunicorn -w 4 -b 127.0.0.1:5000 "app:create_app()"
+    uvicorn --factory async_api:create_async_app --port 5001
+then run:
+    python benchmark_readonly_api.py --sync http://127.0.0.1:5000 --async http://127.0.0.1:5001
+
+Every path is requested `--requests` times at each concurrency level; the
+report shows throughput, median and 95th percentile latency and errors.
+Uses only the standard library.
+"""
+import argparse
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+DEFAULT_PATHS = [
+    '/api/doctors',
+    '/api/doctors/1',
+    '/api/doctors/1/free-slots?from={today}&to={week}'
+]
+
+
+def fetch(url):
+    """(seconds, ok) for one GET"""
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=30) as response:
+            response.read()
+            ok = response.status == 200
+    except (urllib.error.URLError, OSError):
+        ok = False
+    return time.perf_counter() - started, ok
+
+
+def run(base_url, path, concurrency, requests):
+    url = base_url.rstrip('/') + path
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(fetch, [url] * requests))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(seconds for seconds, _ in results)
+    return {
+        'rps': requests / elapsed,
+        'p50': statistics.median(latencies) * 1000,
+        'p95': latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        'errors': sum(1 for _, ok in results if not ok)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sync', dest='sync_url', default='http://127.0.0.1:5000')
+    parser.add_argument('--async', dest='async_url', default='http://127.0.0.1:5001')
+    parser.add_argument('--concurrency', default='1,16,64,256',
+                        help='Comma-separated concurrency levels')
+    parser.add_argument('--requests', type=int, default=1000, help='Requests per path and level')
+    parser.add_argument('--path', action='append', dest='paths', help='Path to request (repeatable)')
+    args = parser.parse_args()
+
+    today = date.today()
+    paths = [path.format(today=today.isoformat(), week=(today + timedelta(days=7)).isoformat())
+             for path in args.paths or DEFAULT_PATHS]
+    levels = [int(level) for level in args.concurrency.split(',')]
+
+    print(f"{'path':<52} {'conc':>5} {'server':<6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>6}")
+    for path in paths:
+        for concurrency in levels:
+            for name, base_url in (('sync', args.sync_url), ('async', args.async_url)):
+                # Warm up connections and caches before measuring
+                run(base_url, path, concurrency, min(concurrency, args.requests))
+                result = run(base_url, path, concurrency, args.requests)
+                print(f"{path[:52]:<52} {concurrency:>5} {name:<6} {result['rps']:>8.0f} "
+                      f"{result['p50']:>8.1f} {result['p95']:>8.1f} {result['errors']:>6}")
+
+
+if __name__ == '__main__':
+    main()
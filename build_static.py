@@ -0,0 +1,65 @@
+# build_static.py
+"""
+Build fingerprinted, precompressed static assets
+Run after changing anything under static/css: python build_static.py
+
+Writes static/dist/<dir>/<name>.<hash>.<ext> with .gz (and .br when the
+brotli package is installed) copies next to it, plus manifest.json mapping
+each source file to its built name. Templates pick the built file up via
+asset_url(); restart the app after building.
+"""
+import hashlib
+import json
+import os
+import shutil
+from utils.compression import ASSET_DIR, MANIFEST_NAME, precompress, brotli
+
+STATIC_FOLDER = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'static')
+SOURCE_DIRS = ['css']
+
+
+def build():
+    dist = os.path.join(STATIC_FOLDER, ASSET_DIR)
+    if os.path.isdir(dist):
+        shutil.rmtree(dist)
+
+    manifest = {}
+    for source_dir in SOURCE_DIRS:
+        for root, _, files in os.walk(os.path.join(STATIC_FOLDER, source_dir)):
+            for name in sorted(files):
+                source = os.path.join(root, name)
+                relative = os.path.relpath(source, STATIC_FOLDER).replace(os.sep, '/')
+                with open(source, 'rb') as f:
+                    data = f.read()
+
+                stem, ext = os.path.splitext(relative)
+                built = f'{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}'
+                target = os.path.join(dist, built)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+
+                gz, br = precompress(data)
+                with open(target, 'wb') as f:
+                    f.write(data)
+                with open(target + '.gz', 'wb') as f:
+                    f.write(gz)
+                if br is not None:
+                    with open(target + '.br', 'wb') as f:
+                        f.write(br)
+
+                manifest[relative] = built
+                sizes = f"{len(data)} B, gzip {len(gz)} B"
+                if br is not None:
+                    sizes += f", brotli {len(br)} B"
+                print(f"   ✓ {relative} -> {built} ({sizes})")
+
+    with open(os.path.join(dist, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+if __name__ == '__main__':
+    print("Building static assets...")
+    if brotli is None:
+        print("   (brotli not installed - writing gzip copies only)")
+    manifest = build()
+    print(f"\n✓ {len(manifest)} asset(s) written to static/{ASSET_DIR}")
@@ -18,13 +18,34 @@ class Config:
     BASE_DIR = os.path.abspath(os.path.dirname(__file__))
     SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(BASE_DIR, 'hospital.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Async driver URL for the read-only ASGI service (default: derived from the URI above)
+    ASYNC_DATABASE_URI = os.environ.get('ASYNC_DATABASE_URI')
     
     # Appointment settings (configurable)
     APPOINTMENT_SLOT_DURATION = 30  # minutes
+    # Default visit length per specialization (minutes); doctors may override
+    SPECIALIZATION_VISIT_MINUTES = {
+        'Dermatology': 10,
+        'Pediatrics': 20,
+        'Orthopedics': 45
+    }
     WORKING_HOURS_START = 9  # 9 AM
     WORKING_HOURS_END = 17  # 5 PM
     AVAILABLE_DAYS_AHEAD = 7  # Doctor can set availability for next 7 days
     
+    SCHEDULE_CELL_MINUTES = 5  # Granularity of occupancy bitmaps (must divide 1440)
+    
+    # Earliest-slot search horizon (days) per triage priority
+    TRIAGE_SEARCH_HORIZON_DAYS = {
+        'Emergency': 1,
+        'Urgent': 2,
+        'Standard': 14,
+        'Non-Urgent': 30
+    }
+    
+    # Days past the last affected appointment searched when bulk rescheduling
+    RESCHEDULE_SEARCH_DAYS = 14
+    
     # Email settings
     MAIL_SERVER = os.environ.get('MAIL_SERVER')
     MAIL_PORT = int(os.environ.get('MAIL_PORT', 2525))
@@ -46,9 +67,38 @@ class Config:
     CACHE_TYPE = 'redis'
     CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/1')
     CACHE_DEFAULT_TIMEOUT = 300  # 5 minutes
+    DASHBOARD_CACHE_MAX_AGE = 300  # revalidate the admin dashboard at least this often (seconds)
+    
+    # Slot holds taken while a patient fills in the booking form
+    SLOT_HOLD_BACKEND = 'redis'  # 'redis' or 'memory' (single process / tests)
+    SLOT_HOLD_REDIS_URL = os.environ.get('SLOT_HOLD_REDIS_URL', CACHE_REDIS_URL)
+    SLOT_HOLD_SECONDS = 300
+    
+    # Live dashboard updates (Server-Sent Events)
+    LIVE_EVENTS_BACKEND = 'redis'  # 'redis' or 'memory' (single process / tests)
+    LIVE_EVENTS_REDIS_URL = os.environ.get('LIVE_EVENTS_REDIS_URL', CACHE_REDIS_URL)
+    LIVE_EVENTS_HEARTBEAT_SECONDS = 15
+    LIVE_EVENTS_STREAM_SECONDS = 60  # streams then close and the browser reconnects, freeing the worker thread
+    
+    # Response compression (brotli is used when the package is installed)
+    COMPRESS_RESPONSES = True
+    COMPRESS_MIN_SIZE = 500  # bytes; smaller responses are sent as-is
+    COMPRESS_MIMETYPES = [
+        'text/html', 'text/css', 'text/plain', 'text/csv',
+        'application/json', 'application/x-ndjson', 'application/javascript'
+    ]
+    COMPRESS_GZIP_LEVEL = 6
+    COMPRESS_BROTLI_QUALITY = 5
+    ASSET_MAX_AGE = 365 * 24 * 3600  # built assets are fingerprinted, so cache for a year
     
     # Pagination settings
     ITEMS_PER_PAGE = 10
+    API_PAGE_SIZE = 100  # Default page size for cursor-paginated API lists
+    API_MAX_PAGE_SIZE = 500
+    EXPORT_BATCH_SIZE = 1000  # Rows fetched per round trip by NDJSON exports
+    BULK_MAX_ITEMS = 1000  # Largest batch accepted by the bulk create endpoints
+    CHANGES_SETTLE_SECONDS = 5  # Delta sync skips rows newer than this so late commits are not missed
+    BATCH_MAX_REQUESTS = 10  # Most GETs accepted by one /api/batch call
     
     # Admin credentials (for initial setup)
     ADMIN_USERNAME = 'admin'
@@ -21,6 +21,15 @@ def init_extensions(app):
     mail.init_app(app)  # ADD THIS LINE
     cache.init_app(app)  # ADD THIS LINE
     
+    from utils.slot_holds import slot_holds
+    slot_holds.init_app(app)
+    
+    from utils.live_events import live_events
+    live_events.init_app(app)
+    
+    from utils.compression import compression
+    compression.init_app(app)
+    
     # User loader for Flask-Login
     from models.user import User
     
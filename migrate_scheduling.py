@@ -0,0 +1,192 @@
+# migrate_scheduling.py
+"""
+Database migration script for the scheduling engine
+Run this once: python migrate_scheduling.py
+"""
+from app import create_app
+from extensions import db
+from sqlalchemy import text
+
+app = create_app()
+
+with app.app_context():
+    print("Starting database migration for scheduling engine...")
+
+    try:
+        result = db.session.execute(text(
+            "PRAGMA table_info(appointments)"
+        )).fetchall()
+
+        column_names = [row[1] for row in result]
+
+        if 'duration_minutes' not in column_names:
+            print("\n1. Adding 'duration_minutes' column to appointments table...")
+            db.session.execute(text(
+                "ALTER TABLE appointments ADD COLUMN duration_minutes INTEGER DEFAULT 30 NOT NULL"
+            ))
+            print("   ✓ duration_minutes column added")
+        else:
+            print("\n1. duration_minutes column already exists - skipping")
+
+        result = db.session.execute(text(
+            "SELECT name FROM sqlite_master WHERE type='index' AND name='uq_appointments_active_slot'"
+        )).fetchone()
+
+        if not result:
+            print("\n2. Creating unique index for active appointment slots...")
+            duplicates = db.session.execute(text(
+                "SELECT doctor_id, appointment_date, appointment_time, GROUP_CONCAT(id) "
+                "FROM appointments WHERE is_deleted = 0 AND status != 'Canceled' "
+                "GROUP BY doctor_id, appointment_date, appointment_time HAVING COUNT(*) > 1"
+            )).fetchall()
+            if duplicates:
+                print(f"   ✗ {len(duplicates)} slots are double-booked by active appointments:")
+                for doctor_id, appointment_date, appointment_time, ids in duplicates:
+                    print(f"       - doctor {doctor_id} on {appointment_date} at {str(appointment_time)[:5]}: "
+                          f"appointments {ids}")
+                print("     Cancel or reschedule all but one appointment per slot, then rerun.")
+                raise RuntimeError('Double-booked slots prevent creating uq_appointments_active_slot')
+            db.session.execute(text(
+                "CREATE UNIQUE INDEX uq_appointments_active_slot "
+                "ON appointments (doctor_id, appointment_date, appointment_time) "
+                "WHERE is_deleted = 0 AND status != 'Canceled'"
+            ))
+            print("   ✓ uq_appointments_active_slot index created")
+        else:
+            print("\n2. uq_appointments_active_slot index already exists - skipping")
+
+        result = db.session.execute(text(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name='doctor_availability_rules'"
+        )).fetchone()
+
+        from models.doctor import Doctor
+        from models.doctor_availability import DoctorAvailability
+        from models.doctor_availability_rule import DoctorAvailabilityRule
+
+        if not result:
+            print("\n3. Creating doctor_availability_rules table...")
+            DoctorAvailabilityRule.__table__.create(db.engine)
+            print("   ✓ doctor_availability_rules table created")
+        else:
+            print("\n3. doctor_availability_rules table already exists - skipping")
+
+        # Seed whenever the table is empty (not only when just created), so a
+        # rerun after a failed migration still converts the old rows
+        if db.session.query(DoctorAvailabilityRule.id).first() is None:
+            print("   Converting recurring doctor_availability rows into weekly rules...")
+            # Before the rules existed every open day was its own
+            # doctor_availability row. A (weekday, start, end) seen in at
+            # least two different weeks becomes a weekly rule; the rows stay
+            # as date overrides and still apply on their own dates.
+            weeks = {}
+            first_seen = {}
+            for doctor_id, available_date, start_time, end_time in db.session.query(
+                DoctorAvailability.doctor_id,
+                DoctorAvailability.available_date,
+                DoctorAvailability.start_time,
+                DoctorAvailability.end_time
+            ).filter(DoctorAvailability.is_available == True).all():
+                slot = (doctor_id, available_date.weekday(), start_time, end_time)
+                weeks.setdefault(slot, set()).add(available_date.isocalendar()[:2])
+                first_seen[slot] = min(first_seen.get(slot, available_date), available_date)
+            recurring = [slot for slot, seen in weeks.items() if len(seen) >= 2]
+            for doctor_id, weekday, start_time, end_time in recurring:
+                db.session.add(DoctorAvailabilityRule(
+                    doctor_id=doctor_id,
+                    weekday=weekday,
+                    start_time=start_time,
+                    end_time=end_time,
+                    effective_from=first_seen[(doctor_id, weekday, start_time, end_time)]
+                ))
+            # Commit now: later steps create tables on their own connection,
+            # which an open write transaction here would lock out
+            db.session.commit()
+            print(f"   ✓ {len(recurring)} weekly rules created from recurring availability rows")
+
+        # Only columns that exist before steps 5-6 add the newer doctors columns
+        without_rules = db.session.query(Doctor.id, Doctor.full_name).filter(
+            Doctor.is_deleted == False,
+            ~Doctor.id.in_(db.session.query(DoctorAvailabilityRule.doctor_id))
+        ).order_by(Doctor.id).all()
+        if without_rules:
+            print(f"   ⚠ WARNING: {len(without_rules)} active doctors have no weekly availability rules")
+            print("     and are only bookable on dates with a doctor_availability row:")
+            for doctor_id, full_name in without_rules:
+                print(f"       - {full_name} (id {doctor_id})")
+            print("     Create their weekly rules before relying on the new schedule.")
+
+        print("\n4. Indexing doctor_availability overrides by doctor and date...")
+        db.session.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_doctor_availability_doctor_date "
+            "ON doctor_availability (doctor_id, available_date)"
+        ))
+        print("   ✓ ix_doctor_availability_doctor_date index ready")
+
+        result = db.session.execute(text(
+            "PRAGMA table_info(doctors)"
+        )).fetchall()
+
+        if 'default_visit_minutes' not in [row[1] for row in result]:
+            print("\n5. Adding 'default_visit_minutes' column to doctors table...")
+            db.session.execute(text(
+                "ALTER TABLE doctors ADD COLUMN default_visit_minutes INTEGER"
+            ))
+            print("   ✓ default_visit_minutes column added")
+        else:
+            print("\n5. default_visit_minutes column already exists - skipping")
+
+        if 'calendar_token' not in [row[1] for row in result]:
+            print("\n6. Adding 'calendar_token' column to doctors table...")
+            db.session.execute(text(
+                "ALTER TABLE doctors ADD COLUMN calendar_token VARCHAR(64)"
+            ))
+            db.session.execute(text(
+                "CREATE UNIQUE INDEX IF NOT EXISTS ix_doctors_calendar_token ON doctors (calendar_token)"
+            ))
+            print("   ✓ calendar_token column added")
+        else:
+            print("\n6. calendar_token column already exists - skipping")
+
+        print("\n7. Indexing appointments for keyset pagination...")
+        db.session.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_appointments_date_time_id "
+            "ON appointments (appointment_date, appointment_time, id)"
+        ))
+        print("   ✓ ix_appointments_date_time_id index ready")
+
+        result = db.session.execute(text(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name='stat_counters'"
+        )).fetchone()
+
+        if not result:
+            print("\n8. Creating stat_counters table...")
+            from models.stat_counter import StatCounter
+            StatCounter.__table__.create(db.engine)
+            print("   ✓ stat_counters table created")
+        else:
+            print("\n8. stat_counters table already exists - skipping")
+        db.session.commit()
+
+        print("\n9. Indexing appointments for the change feed...")
+        db.session.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_appointments_updated_at_id "
+            "ON appointments (updated_at, id)"
+        ))
+        db.session.commit()
+        print("   ✓ ix_appointments_updated_at_id index ready")
+
+        print("\n10. Reconciling statistics counters...")
+        from utils.counters import reconcile_counters
+        reconcile_counters()
+        print("   ✓ stat counters up to date")
+
+        db.session.commit()
+        print("\n" + "="*60)
+        print("✓ DATABASE MIGRATION COMPLETED SUCCESSFULLY!")
+        print("="*60)
+
+    except Exception as e:
+        db.session.rollback()
+        print(f"\n✗ ERROR: {str(e)}")
+        print("Migration failed. Please report this error.")
+        raise
@@ -13,6 +13,8 @@ from models.patient import Patient
 from models.appointment import Appointment
 from models.treatment import Treatment
 from models.doctor_availability import DoctorAvailability
+from models.doctor_availability_rule import DoctorAvailabilityRule
 from models.nurse import Nurse
 from models.triage import Triage
 from models.triage_assessment import TriageAssessment
+from models.stat_counter import StatCounter
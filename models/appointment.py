@@ -8,6 +8,21 @@ from datetime import datetime
 class Appointment(db.Model):
     """Appointment booking model"""
     __tablename__ = 'appointments'
+    __table_args__ = (
+        # One active booking per doctor/date/time; enforced by the database so
+        # concurrent workers cannot double-book (see utils.helpers.is_slot_conflict)
+        db.Index(
+            'uq_appointments_active_slot',
+            'doctor_id', 'appointment_date', 'appointment_time',
+            unique=True,
+            sqlite_where=db.text("is_deleted = 0 AND status != 'Canceled'"),
+            postgresql_where=db.text("is_deleted = false AND status != 'Canceled'")
+        ),
+        # Keyset pagination order for /api/appointments
+        db.Index('ix_appointments_date_time_id', 'appointment_date', 'appointment_time', 'id'),
+        # Change feed order for /api/appointments/changes
+        db.Index('ix_appointments_updated_at_id', 'updated_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     patient_id = db.Column(db.Integer, db.ForeignKey('patients.id'), nullable=False)
@@ -16,6 +31,7 @@ class Appointment(db.Model):
     
     appointment_date = db.Column(db.Date, nullable=False, index=True)
     appointment_time = db.Column(db.Time, nullable=False)
+    duration_minutes = db.Column(db.Integer, default=30, nullable=False)
     status = db.Column(db.String(20), default='Booked', nullable=False)  # Booked, Completed, Canceled
     reason = db.Column(db.Text)
     notes = db.Column(db.Text)
@@ -18,6 +18,8 @@ class Doctor(db.Model):
     contact_number = db.Column(db.String(20))
     license_number = db.Column(db.String(50), unique=True)
     consultation_fee = db.Column(db.Float, default=0.0)
+    default_visit_minutes = db.Column(db.Integer)  # None = specialization default
+    calendar_token = db.Column(db.String(64), unique=True)  # Secret for the ICS feed URL
     bio = db.Column(db.Text)
     is_active = db.Column(db.Boolean, default=True, nullable=False)
     is_deleted = db.Column(db.Boolean, default=False, nullable=False)
@@ -27,6 +29,7 @@ class Doctor(db.Model):
     # Relationships
     appointments = db.relationship('Appointment', backref='doctor', lazy='dynamic')
     availability = db.relationship('DoctorAvailability', backref='doctor', lazy='dynamic')
+    availability_rules = db.relationship('DoctorAvailabilityRule', backref='doctor', lazy='dynamic')
     
     def __repr__(self):
         return f'<Doctor {self.full_name} - {self.specialization}>'
@@ -6,8 +6,15 @@ from extensions import db
 from datetime import datetime
 
 class DoctorAvailability(db.Model):
-    """Doctor availability slots"""
+    """
+    Date-specific availability override.
+    Any row for a doctor/date replaces that doctor's weekly rules for the day;
+    a row with is_available=False marks the day as unavailable.
+    """
     __tablename__ = 'doctor_availability'
+    __table_args__ = (
+        db.Index('ix_doctor_availability_doctor_date', 'doctor_id', 'available_date'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     doctor_id = db.Column(db.Integer, db.ForeignKey('doctors.id'), nullable=False)
@@ -0,0 +1,34 @@
+"""
+Recurring weekly availability rules for doctors
+"""
+from extensions import db
+from datetime import datetime, date
+
+class DoctorAvailabilityRule(db.Model):
+    """
+    Weekly recurring availability (e.g. every Monday 09:00-17:00).
+    Rules are expanded lazily for the requested date window; date-specific
+    exceptions are stored as DoctorAvailability override rows.
+    """
+    __tablename__ = 'doctor_availability_rules'
+    
+    WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+    
+    id = db.Column(db.Integer, primary_key=True)
+    doctor_id = db.Column(db.Integer, db.ForeignKey('doctors.id'), nullable=False, index=True)
+    weekday = db.Column(db.Integer, nullable=False)  # 0 = Monday ... 6 = Sunday
+    start_time = db.Column(db.Time, nullable=False)
+    end_time = db.Column(db.Time, nullable=False)
+    effective_from = db.Column(db.Date, nullable=False, default=date.today)
+    effective_until = db.Column(db.Date, nullable=True)  # None = open-ended
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def applies_to(self, day):
+        """Check if this rule produces availability on the given date"""
+        return (day.weekday() == self.weekday
+                and self.effective_from <= day
+                and (self.effective_until is None or day <= self.effective_until))
+    
+    def __repr__(self):
+        return f'<AvailabilityRule Doctor {self.doctor_id} {self.WEEKDAYS[self.weekday]}>'
@@ -0,0 +1,20 @@
+"""
+Precomputed totals for statistics pages
+"""
+from extensions import db
+from datetime import datetime
+
+class StatCounter(db.Model):
+    """
+    One running total, e.g. 'appointments:status:Booked'.
+    Maintained on every flush by utils.counters and corrected by the
+    periodic reconciliation job.
+    """
+    __tablename__ = 'stat_counters'
+
+    key = db.Column(db.String(100), primary_key=True)
+    value = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<StatCounter {self.key}={self.value}>'
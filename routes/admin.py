@@ -4,75 +4,28 @@ Includes dashboard, doctor/patient CRUD, appointments management, and search
 """
 from flask import render_template, redirect, url_for, flash, request, jsonify
 from flask_login import current_user
-from extensions import db, cache
+from extensions import db
 from models.user import User
 from models.doctor import Doctor
 from models.patient import Patient
 from models.appointment import Appointment
 from models.treatment import Treatment
 from utils.decorators import admin_required
+from utils.helpers import is_slot_conflict
+from utils.dashboard import get_dashboard_data
 from routes import admin_bp
 from datetime import datetime, date, timedelta
-from sqlalchemy import or_, func
+from sqlalchemy import or_
 from models.nurse import Nurse
 from models.triage import Triage
 from sqlalchemy.exc import IntegrityError
 
 @admin_bp.route('/dashboard')
 @admin_required
-@cache.cached(timeout=300, key_prefix='admin_dashboard')  # ADD THIS LINE - Cache for 5 minutes
 def dashboard():
     """Admin dashboard with statistics and charts"""
-    # Statistics
-    total_doctors = Doctor.query.filter_by(is_deleted=False, is_active=True).count()
-    total_patients = Patient.query.filter_by(is_deleted=False, is_active=True).count()
-    total_appointments = Appointment.query.filter_by(is_deleted=False).count()
-    
-    # Today's appointments
-    today = date.today()
-    today_appointments = Appointment.query.filter_by(
-        appointment_date=today,
-        is_deleted=False
-    ).count()
-    
-    # Upcoming appointments
-    upcoming_appointments = Appointment.query.filter(
-        Appointment.appointment_date >= today,
-        Appointment.is_deleted == False,
-        Appointment.status == 'Booked'
-    ).order_by(Appointment.appointment_date, Appointment.appointment_time).limit(10).all()
-    
-    # Recent patients
-    recent_patients = Patient.query.filter_by(is_deleted=False).order_by(
-        Patient.created_at.desc()
-    ).limit(5).all()
-    
-    # Get appointment statistics for charts
-    # Appointments by status
-    status_stats = db.session.query(
-        Appointment.status,
-        func.count(Appointment.id)
-    ).filter_by(is_deleted=False).group_by(Appointment.status).all()
-    
-    # Appointments by doctor (top 5)
-    doctor_stats = db.session.query(
-        Doctor.full_name,
-        func.count(Appointment.id)
-    ).join(Appointment).filter(
-        Appointment.is_deleted == False
-    ).group_by(Doctor.id).order_by(
-        func.count(Appointment.id).desc()
-    ).limit(5).all()
-    
-    return render_template('admin/dashboard.html',
-                         total_doctors=total_doctors,
-                         total_patients=total_patients,
-                         total_appointments=total_appointments,
-                         today_appointments=today_appointments,
-                         upcoming_appointments=upcoming_appointments,
-                         recent_patients=recent_patients,
-                         status_stats=status_stats,
-                         doctor_stats=doctor_stats)
+    # Cached until a booking, patient or doctor change invalidates it (see utils.dashboard)
+    return render_template('admin/dashboard.html', **get_dashboard_data())
 
 # ============= DOCTOR MANAGEMENT =============
 
@@ -104,6 +57,7 @@ def add_doctor():
         contact_number = request.form.get('contact_number')
         license_number = request.form.get('license_number')
         consultation_fee = request.form.get('consultation_fee', type=float)
+        default_visit_minutes = request.form.get('default_visit_minutes', type=int)
         bio = request.form.get('bio')
         
         # Validation
@@ -135,6 +89,7 @@ def add_doctor():
             contact_number=contact_number,
             license_number=license_number,
             consultation_fee=consultation_fee or 0.0,
+            default_visit_minutes=default_visit_minutes or None,
             bio=bio
         )
         db.session.add(doctor)
@@ -158,6 +113,7 @@ def edit_doctor(doctor_id):
         doctor.experience_years = request.form.get('experience_years', type=int)
         doctor.contact_number = request.form.get('contact_number')
         doctor.consultation_fee = request.form.get('consultation_fee', type=float)
+        doctor.default_visit_minutes = request.form.get('default_visit_minutes', type=int) or None
         doctor.bio = request.form.get('bio')
         doctor.is_active = request.form.get('is_active') == 'on'
         
@@ -766,7 +722,11 @@ def book_appointment():
         
         # Check slot availability
         from utils.helpers import is_slot_available
-        is_avail, msg = is_slot_available(doctor_id, appointment_date, appointment_time)
+        from utils.scheduling import visit_minutes
+        doctor = Doctor.query.get_or_404(doctor_id)
+        duration = visit_minutes(doctor)
+        is_avail, msg = is_slot_available(doctor_id, appointment_date, appointment_time,
+                                          slot_minutes=duration)
         if not is_avail:
             flash(f'Time slot not available: {msg}', 'danger')
             return redirect(url_for('admin.book_appointment'))
@@ -777,11 +737,19 @@ def book_appointment():
             doctor_id=doctor_id,
             appointment_date=appointment_date,
             appointment_time=appointment_time,
+            duration_minutes=duration,
             reason=reason,
             status='Booked'
         )
         db.session.add(appointment)
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError as e:
+            db.session.rollback()
+            if not is_slot_conflict(e):
+                raise
+            flash('Time slot not available: it was just booked by another request.', 'danger')
+            return redirect(url_for('admin.book_appointment'))
         
         flash('Appointment booked successfully!', 'success')
         return redirect(url_for('admin.appointments'))
@@ -821,7 +789,9 @@ def reschedule_appointment(appointment_id):
         
         # Check if new slot is available
         from utils.helpers import is_slot_available
-        is_avail, msg = is_slot_available(appointment.doctor_id, new_date, new_time, exclude_appointment_id=appointment_id)
+        is_avail, msg = is_slot_available(appointment.doctor_id, new_date, new_time,
+                                          slot_minutes=appointment.duration_minutes,
+                                          exclude_appointment_id=appointment_id)
         if not is_avail:
             flash(f'Time slot not available: {msg}', 'danger')
             return redirect(url_for('admin.reschedule_appointment', appointment_id=appointment_id))
@@ -829,7 +799,14 @@ def reschedule_appointment(appointment_id):
         # Update appointment
         appointment.appointment_date = new_date
         appointment.appointment_time = new_time
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError as e:
+            db.session.rollback()
+            if not is_slot_conflict(e):
+                raise
+            flash('Time slot not available: it was just booked by another request.', 'danger')
+            return redirect(url_for('admin.reschedule_appointment', appointment_id=appointment_id))
         
         flash('Appointment rescheduled successfully!', 'success')
         return redirect(url_for('admin.appointments'))
@@ -2,6 +2,16 @@
 REST API endpoints for Hospital Management System
 Provides JSON responses for CRUD operations
 
+List endpoints are cursor-paginated: pass ?limit= and follow `next`
+(or send ?after=<next_cursor>) until it is null.
+
+The doctor, patient and appointment lists also take ?ids=1,2,3 to fetch
+those records in one request, keyed by id.
+
+Resource GETs and exports take ?fields=a,b,c to return (and fetch) only
+those fields. Resource GETs send a weak ETag; repeat the request with
+If-None-Match to get 304 Not Modified when nothing changed.
+
 Endpoints:
 - GET /api/doctors - List all doctors
 - GET /api/doctors/<id> - Get doctor details
@@ -12,74 +22,169 @@ Endpoints:
 - GET /api/patients - List all patients
 - GET /api/patients/<id> - Get patient details
 - POST /api/patients - Create patient
+- POST /api/patients/bulk - Create many patients in one transaction (admin only)
 - PUT /api/patients/<id> - Update patient
 - DELETE /api/patients/<id> - Delete patient (admin only)
 
 - GET /api/appointments - List appointments
+- GET /api/appointments/changes - Appointments changed since a sync token
 - GET /api/appointments/<id> - Get appointment details
 - POST /api/appointments - Create appointment
+- POST /api/appointments/bulk - Create many appointments in one transaction (admin only)
 - PUT /api/appointments/<id> - Update appointment
 - DELETE /api/appointments/<id> - Cancel appointment
 
 - GET /api/stats - Get system statistics (admin only)
+
+- POST /api/batch - Run several API GETs in one round trip
+
+- GET /api/export/appointments - Stream all appointments as NDJSON (admin only)
+- GET /api/export/patients - Stream all patients as NDJSON (admin only)
+- GET /api/export/treatments - Stream all treatments as NDJSON (admin only)
+
+- GET /api/doctors/<id>/free-slots - Bookable slots for a doctor
+- POST /api/slots/hold - Hold a slot while the booking form is filled in
+- DELETE /api/slots/hold - Release a held slot
+- GET /api/doctors/earliest-slots - Earliest open slots across a specialization
+- GET /api/schedule/first-fit - Earliest free slot per doctor hospital-wide
+- GET /api/schedule/utilisation - Booked share of available time per doctor (admin only)
+
+- GET /api/events/appointments - Live stream of every appointment change (admin only)
+- GET /api/events/doctors/<id> - Live stream of one doctor's appointments and triage referrals
+- GET /api/events/triage - Live stream of the triage queue (triage, nurse and admin)
 """
-from flask import jsonify, request
+from flask import current_app, jsonify, request, Response, stream_with_context
 from flask_login import current_user, login_required
 from extensions import db
 from models.doctor import Doctor
 from models.patient import Patient
 from models.appointment import Appointment
 from models.user import User
+from models.treatment import Treatment
 from routes import api_bp
-from datetime import datetime, date
-
-# Helper function to serialize models
-def serialize_doctor(doctor):
-    """Serialize doctor object to dictionary"""
-    return {
-        'id': doctor.id,
-        'full_name': doctor.full_name,
-        'specialization': doctor.specialization,
-        'qualification': doctor.qualification,
-        'experience_years': doctor.experience_years,
-        'contact_number': doctor.contact_number,
-        'consultation_fee': doctor.consultation_fee,
-        'bio': doctor.bio,
-        'is_active': doctor.is_active,
-        'email': doctor.user.email
-    }
+from utils.helpers import check_slot, is_slot_available, is_slot_conflict
+from utils.slot_holds import slot_holds, holder_for
+from utils.pagination import keyset_page, page_limit, next_link, encode_cursor
+from utils.serialization import Serializer, Field, requested_fields
+from utils.export import export_columns, iter_ndjson
+from utils.conditional import resource_etag, not_modified, etag_header
+from utils.bulk import bulk_create_patients, bulk_create_appointments, invalidate_booked_doctors
+from utils.counters import read_counters
+from utils.live_events import live_events
+from utils.batch import run_batch
+from utils.scheduling import get_free_slots, find_earliest_slots, visit_minutes, visit_minutes_for
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+from datetime import datetime, date, timedelta
 
-def serialize_patient(patient):
-    """Serialize patient object to dictionary"""
-    return {
-        'id': patient.id,
-        'full_name': patient.full_name,
-        'date_of_birth': patient.date_of_birth.isoformat() if patient.date_of_birth else None,
-        'gender': patient.gender,
-        'blood_group': patient.blood_group,
-        'contact_number': patient.contact_number,
-        'address': patient.address,
-        'email': patient.user.email,
-        'is_active': patient.is_active
-    }
+# Model serializers; each field declares the columns and relationships it
+# reads so queries load exactly what ?fields= asks for (see utils.serialization).
+# Dates are left to the JSON provider, which writes them as ISO 8601.
+serialize_doctor = Serializer(Doctor, {
+    'id': Field(),
+    'full_name': Field(),
+    'specialization': Field(),
+    'qualification': Field(),
+    'experience_years': Field(),
+    'contact_number': Field(),
+    'consultation_fee': Field(),
+    'visit_minutes': Field(visit_minutes, columns=['default_visit_minutes', 'specialization']),
+    'bio': Field(),
+    'is_active': Field(),
+    'email': Field(lambda doctor: doctor.user.email, columns=['user_id'],
+                   loads=lambda: [joinedload(Doctor.user).load_only(User.email)])
+})
 
-def serialize_appointment(appointment):
-    """Serialize appointment object to dictionary"""
-    return {
-        'id': appointment.id,
-        'patient_id': appointment.patient_id,
-        'patient_name': appointment.patient.full_name,
-        'doctor_id': appointment.doctor_id,
-        'doctor_name': appointment.doctor.full_name,
-        'appointment_date': appointment.appointment_date.isoformat(),
-        'appointment_time': appointment.appointment_time.strftime('%H:%M'),
-        'status': appointment.status,
-        'reason': appointment.reason,
-        'notes': appointment.notes
-    }
+serialize_patient = Serializer(Patient, {
+    'id': Field(),
+    'full_name': Field(),
+    'date_of_birth': Field(),
+    'gender': Field(),
+    'blood_group': Field(),
+    'contact_number': Field(),
+    'address': Field(),
+    'email': Field(lambda patient: patient.user.email, columns=['user_id'],
+                   loads=lambda: [joinedload(Patient.user).load_only(User.email)]),
+    'is_active': Field()
+})
+
+serialize_appointment = Serializer(Appointment, {
+    'id': Field(),
+    'patient_id': Field(),
+    'patient_name': Field(lambda appointment: appointment.patient.full_name, columns=['patient_id'],
+                          loads=lambda: [joinedload(Appointment.patient).load_only(Patient.full_name)]),
+    'doctor_id': Field(),
+    'doctor_name': Field(lambda appointment: appointment.doctor.full_name, columns=['doctor_id'],
+                         loads=lambda: [joinedload(Appointment.doctor).load_only(Doctor.full_name)]),
+    'appointment_date': Field(),
+    'appointment_time': Field(lambda appointment: appointment.appointment_time.strftime('%H:%M'),
+                              columns=['appointment_time']),
+    'duration_minutes': Field(),
+    'status': Field(),
+    'reason': Field(),
+    'notes': Field()
+})
+
+def requested_ids():
+    """Ids from ?ids=1,2,3 as (ids, None), or (None, error response)"""
+    try:
+        ids = list(dict.fromkeys(int(value) for value in request.args['ids'].split(',') if value.strip()))
+    except ValueError:
+        return None, (jsonify({
+            'success': False,
+            'message': 'ids must be a comma-separated list of integers'
+        }), 400)
+    
+    max_ids = current_app.config['API_MAX_PAGE_SIZE']
+    if not ids or len(ids) > max_ids:
+        return None, (jsonify({
+            'success': False,
+            'message': f'ids must list between 1 and {max_ids} ids'
+        }), 400)
+    return ids, None
+
+def multi_get_response(ids, found, etag):
+    """200 response for a multi-get; `found` maps id -> serialized row"""
+    return jsonify({
+        'success': True,
+        'count': len(found),
+        'data': found,
+        'missing': [obj_id for obj_id in ids if obj_id not in found]
+    }), 200, etag_header(etag)
+
+def _multi_get(model, serialize, *relationships):
+    """
+    Response for ?ids=1,2,3 on a list endpoint: the requested rows in one
+    IN query, keyed by id, plus the ids that were not found.
+    Other list filters and pagination do not apply.
+    """
+    ids, error = requested_ids()
+    if error:
+        return error
+    
+    query = model.query.filter(model.id.in_(ids), model.is_deleted == False)
+    etag = resource_etag(query, model, *relationships)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    
+    found = {obj.id: serialize(obj) for obj in serialize.eager(query).all()}
+    return multi_get_response(ids, found, etag)
 
 # ============= DOCTOR ENDPOINTS =============
 
+def doctor_list_filters():
+    """WHERE clauses for the doctor list's specialization/active parameters"""
+    filters = [Doctor.is_deleted == False]
+    
+    specialization = request.args.get('specialization')
+    if specialization:
+        filters.append(Doctor.specialization.ilike(f'%{specialization}%'))
+    
+    if request.args.get('active', 'true').lower() == 'true':
+        filters.append(Doctor.is_active == True)
+    return filters
+
 @api_bp.route('/doctors', methods=['GET'])
 def get_doctors():
     """
@@ -87,30 +192,67 @@ def get_doctors():
     Query parameters:
     - specialization: Filter by specialization
     - active: Filter by active status (true/false)
+    - limit: Page size (default API_PAGE_SIZE, max API_MAX_PAGE_SIZE)
+    - after: Cursor from the previous page's next_cursor
+    - fields: Comma-separated fields to return (default: all)
+    - ids: Comma-separated doctor ids; returns just those, keyed by id
     """
-    specialization = request.args.get('specialization')
-    active = request.args.get('active', 'true').lower() == 'true'
+    try:
+        serialize = serialize_doctor.for_request()
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
     
-    query = Doctor.query.filter_by(is_deleted=False)
+    if 'ids' in request.args:
+        return _multi_get(Doctor, serialize, Doctor.user)
     
-    if specialization:
-        query = query.filter(Doctor.specialization.ilike(f'%{specialization}%'))
+    query = Doctor.query.filter(*doctor_list_filters())
     
-    if active:
-        query = query.filter_by(is_active=True)
+    etag = resource_etag(query, Doctor, Doctor.user)
+    cached = not_modified(etag)
+    if cached:
+        return cached
     
-    doctors = query.all()
+    try:
+        page = keyset_page(serialize.eager(query), [Doctor.id], page_limit(), request.args.get('after'))
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
     
     return jsonify({
         'success': True,
-        'count': len(doctors),
-        'data': [serialize_doctor(d) for d in doctors]
-    }), 200
+        'count': len(page.items),
+        'data': [serialize(d) for d in page.items],
+        'next_cursor': page.next_cursor,
+        'next': next_link(page.next_cursor)
+    }), 200, etag_header(etag)
 
 @api_bp.route('/doctors/<int:doctor_id>', methods=['GET'])
 def get_doctor(doctor_id):
-    """GET /api/doctors/<id> - Get doctor details"""
-    doctor = Doctor.query.filter_by(id=doctor_id, is_deleted=False).first()
+    """
+    GET /api/doctors/<id> - Get doctor details
+    Query parameters:
+    - fields: Comma-separated fields to return (default: all)
+    """
+    try:
+        serialize = serialize_doctor.for_request()
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    
+    query = Doctor.query.filter_by(id=doctor_id, is_deleted=False)
+    etag = resource_etag(query, Doctor, Doctor.user)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    
+    doctor = serialize.eager(query).first()
     
     if not doctor:
         return jsonify({
@@ -120,8 +262,8 @@ def get_doctor(doctor_id):
     
     return jsonify({
         'success': True,
-        'data': serialize_doctor(doctor)
-    }), 200
+        'data': serialize(doctor)
+    }), 200, etag_header(etag)
 
 @api_bp.route('/doctors', methods=['POST'])
 @login_required
@@ -173,6 +315,7 @@ def create_doctor():
         contact_number=data['contact_number'],
         license_number=data.get('license_number'),
         consultation_fee=data.get('consultation_fee', 0.0),
+        default_visit_minutes=data.get('default_visit_minutes'),
         bio=data.get('bio')
     )
     db.session.add(doctor)
@@ -210,6 +353,8 @@ def update_doctor(doctor_id):
         doctor.contact_number = data['contact_number']
     if 'consultation_fee' in data:
         doctor.consultation_fee = data['consultation_fee']
+    if 'default_visit_minutes' in data:
+        doctor.default_visit_minutes = data['default_visit_minutes']
     if 'bio' in data:
         doctor.bio = data['bio']
     if 'is_active' in data:
@@ -248,20 +393,70 @@ def delete_doctor(doctor_id):
 @api_bp.route('/patients', methods=['GET'])
 @login_required
 def get_patients():
-    """GET /api/patients - List all patients"""
-    patients = Patient.query.filter_by(is_deleted=False).all()
+    """
+    GET /api/patients - List all patients
+    Query parameters:
+    - limit: Page size (default API_PAGE_SIZE, max API_MAX_PAGE_SIZE)
+    - after: Cursor from the previous page's next_cursor
+    - fields: Comma-separated fields to return (default: all)
+    - ids: Comma-separated patient ids; returns just those, keyed by id
+    """
+    try:
+        serialize = serialize_patient.for_request()
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    
+    if 'ids' in request.args:
+        return _multi_get(Patient, serialize, Patient.user)
+    
+    query = Patient.query.filter_by(is_deleted=False)
+    etag = resource_etag(query, Patient, Patient.user)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    
+    try:
+        page = keyset_page(serialize.eager(query), [Patient.id], page_limit(), request.args.get('after'))
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
     
     return jsonify({
         'success': True,
-        'count': len(patients),
-        'data': [serialize_patient(p) for p in patients]
-    }), 200
+        'count': len(page.items),
+        'data': [serialize(p) for p in page.items],
+        'next_cursor': page.next_cursor,
+        'next': next_link(page.next_cursor)
+    }), 200, etag_header(etag)
 
 @api_bp.route('/patients/<int:patient_id>', methods=['GET'])
 @login_required
 def get_patient(patient_id):
-    """GET /api/patients/<id> - Get patient details"""
-    patient = Patient.query.filter_by(id=patient_id, is_deleted=False).first()
+    """
+    GET /api/patients/<id> - Get patient details
+    Query parameters:
+    - fields: Comma-separated fields to return (default: all)
+    """
+    try:
+        serialize = serialize_patient.for_request()
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    
+    query = Patient.query.filter_by(id=patient_id, is_deleted=False)
+    etag = resource_etag(query, Patient, Patient.user)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    
+    patient = serialize.eager(query).first()
     
     if not patient:
         return jsonify({
@@ -271,8 +466,8 @@ def get_patient(patient_id):
     
     return jsonify({
         'success': True,
-        'data': serialize_patient(patient)
-    }), 200
+        'data': serialize(patient)
+    }), 200, etag_header(etag)
 
 @api_bp.route('/patients', methods=['POST'])
 def create_patient():
@@ -334,6 +529,71 @@ def create_patient():
         'data': serialize_patient(patient)
     }), 201
 
+def _bulk_items():
+    """Items of a bulk request body, or an error response tuple"""
+    data = request.get_json(silent=True)
+    items = data.get('items') if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        return None, (jsonify({
+            'success': False,
+            'message': 'Request body must be a non-empty array of items'
+        }), 400)
+    max_items = current_app.config['BULK_MAX_ITEMS']
+    if len(items) > max_items:
+        return None, (jsonify({
+            'success': False,
+            'message': f'At most {max_items} items per request'
+        }), 400)
+    return items, None
+
+def _bulk_response(results):
+    # 201 when every item was created, 207 (Multi-Status) when only some were, 400 when none
+    created = sum(1 for result in results if result['success'])
+    if created == len(results):
+        status = 201
+    else:
+        status = 207 if created else 400
+    return jsonify({
+        'success': created == len(results),
+        'created': created,
+        'failed': len(results) - created,
+        'results': results
+    }), status
+
+@api_bp.route('/patients/bulk', methods=['POST'])
+@login_required
+def bulk_create_patients_endpoint():
+    """
+    POST /api/patients/bulk - Create many patients (admin only)
+
+    Body: an array of create_patient objects (or {"items": [...]}).
+    Valid items are created in one transaction; each item gets a result
+    {index, success, id | message}; the status is 201, 207 (some failed)
+    or 400 (all failed).
+    """
+    if not current_user.is_admin():
+        return jsonify({
+            'success': False,
+            'message': 'Unauthorized - Admin access required'
+        }), 403
+    
+    items, error = _bulk_items()
+    if error:
+        return error
+    
+    results = bulk_create_patients(items)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # A username/email was registered concurrently; nothing was saved
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': 'Username or email registered concurrently, batch not saved; please retry'
+        }), 409
+    
+    return _bulk_response(results)
+
 @api_bp.route('/patients/<int:patient_id>', methods=['PUT'])
 @login_required
 def update_patient(patient_id):
@@ -385,7 +645,23 @@ def get_appointments():
     - status: Filter by status (Booked, Completed, Canceled)
     - doctor_id: Filter by doctor
     - patient_id: Filter by patient
+    - limit: Page size (default API_PAGE_SIZE, max API_MAX_PAGE_SIZE)
+    - after: Cursor from the previous page's next_cursor
+    - fields: Comma-separated fields to return (default: all)
+    - ids: Comma-separated appointment ids; returns just those, keyed by id
+    Results are ordered by date, time and id.
     """
+    try:
+        serialize = serialize_appointment.for_request()
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    
+    if 'ids' in request.args:
+        return _multi_get(Appointment, serialize, Appointment.patient, Appointment.doctor)
+    
     query = Appointment.query.filter_by(is_deleted=False)
     
     status = request.args.get('status')
@@ -399,19 +675,126 @@ def get_appointments():
     if patient_id:
         query = query.filter_by(patient_id=patient_id)
     
-    appointments = query.all()
+    etag = resource_etag(query, Appointment, Appointment.patient, Appointment.doctor)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    
+    try:
+        page = keyset_page(
+            serialize.eager(query, Appointment.appointment_date, Appointment.appointment_time),
+            [Appointment.appointment_date, Appointment.appointment_time, Appointment.id],
+            page_limit(),
+            request.args.get('after')
+        )
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
     
     return jsonify({
         'success': True,
-        'count': len(appointments),
-        'data': [serialize_appointment(a) for a in appointments]
+        'count': len(page.items),
+        'data': [serialize(a) for a in page.items],
+        'next_cursor': page.next_cursor,
+        'next': next_link(page.next_cursor)
+    }), 200, etag_header(etag)
+
+@api_bp.route('/appointments/changes', methods=['GET'])
+@login_required
+def get_appointment_changes():
+    """
+    GET /api/appointments/changes - Delta sync for appointment clients
+    Query parameters:
+    - since: Token from the previous call's next_since (omit for a full sync)
+    - doctor_id: Only this doctor's appointments
+    - patient_id: Only this patient's appointments
+    - limit: Changes per call (default API_PAGE_SIZE, max API_MAX_PAGE_SIZE)
+    - fields: Comma-separated fields to return for changed rows (default: all)
+
+    Returns the appointments whose updated_at is past the token, oldest
+    change first: `data` holds active rows, `tombstones` the ids of rows
+    that were canceled or deleted. Store next_since and send it next time;
+    while has_more is true, call again straight away. Changes from the last
+    CHANGES_SETTLE_SECONDS are held back so slow transactions that commit
+    out of order are never skipped.
+    """
+    try:
+        serialize = serialize_appointment.for_request()
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    
+    settle = timedelta(seconds=current_app.config['CHANGES_SETTLE_SECONDS'])
+    query = Appointment.query.filter(Appointment.updated_at <= datetime.utcnow() - settle)
+    
+    doctor_id = request.args.get('doctor_id', type=int)
+    patient_id = request.args.get('patient_id', type=int)
+    if doctor_id:
+        query = query.filter_by(doctor_id=doctor_id)
+    if patient_id:
+        query = query.filter_by(patient_id=patient_id)
+    
+    since = request.args.get('since')
+    try:
+        page = keyset_page(
+            serialize.eager(query, Appointment.updated_at, Appointment.status, Appointment.is_deleted),
+            [Appointment.updated_at, Appointment.id],
+            page_limit(),
+            since
+        )
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'message': 'Invalid since token'
+        }), 400
+    
+    data, tombstones = [], []
+    for appointment in page.items:
+        if appointment.is_deleted or appointment.status == 'Canceled':
+            tombstones.append(appointment.id)
+        else:
+            data.append(serialize(appointment))
+    
+    next_since = since
+    if page.items:
+        last = page.items[-1]
+        next_since = encode_cursor([last.updated_at, last.id])
+    
+    return jsonify({
+        'success': True,
+        'data': data,
+        'tombstones': tombstones,
+        'next_since': next_since,
+        'has_more': page.next_cursor is not None
     }), 200
 
 @api_bp.route('/appointments/<int:appointment_id>', methods=['GET'])
 @login_required
 def get_appointment(appointment_id):
-    """GET /api/appointments/<id> - Get appointment details"""
-    appointment = Appointment.query.filter_by(id=appointment_id, is_deleted=False).first()
+    """
+    GET /api/appointments/<id> - Get appointment details
+    Query parameters:
+    - fields: Comma-separated fields to return (default: all)
+    """
+    try:
+        serialize = serialize_appointment.for_request()
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    
+    query = Appointment.query.filter_by(id=appointment_id, is_deleted=False)
+    etag = resource_etag(query, Appointment, Appointment.patient, Appointment.doctor)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    
+    appointment = serialize.eager(query).first()
     
     if not appointment:
         return jsonify({
@@ -421,8 +804,8 @@ def get_appointment(appointment_id):
     
     return jsonify({
         'success': True,
-        'data': serialize_appointment(appointment)
-    }), 200
+        'data': serialize(appointment)
+    }), 200, etag_header(etag)
 
 @api_bp.route('/appointments', methods=['POST'])
 @login_required
@@ -456,31 +839,52 @@ def create_appointment():
             'message': 'Cannot book appointments in the past'
         }), 400
     
-    # Check if slot is available
-    existing = Appointment.query.filter_by(
-        doctor_id=data['doctor_id'],
-        appointment_date=appointment_date,
-        appointment_time=appointment_time,
-        is_deleted=False
-    ).filter(Appointment.status != 'Canceled').first()
+    doctor = Doctor.query.filter_by(id=data['doctor_id'], is_deleted=False).first()
+    if not doctor:
+        return jsonify({
+            'success': False,
+            'message': 'Doctor not found'
+        }), 404
     
-    if existing:
+    duration = data.get('duration_minutes')
+    if duration is None:
+        duration = visit_minutes(doctor)
+    if not isinstance(duration, int) or duration < 5 or duration > 480:
         return jsonify({
             'success': False,
-            'message': 'This time slot is not available'
+            'message': 'duration_minutes must be between 5 and 480'
+        }), 400
+    
+    # Visits of different lengths can overlap without sharing a start time,
+    # which the unique index cannot see; check overlaps first
+    slot = check_slot(doctor.id, appointment_date, appointment_time, slot_minutes=duration)
+    if not slot.available:
+        return jsonify({
+            'success': False,
+            'message': slot.message
         }), 409
     
-    # Create appointment
+    # Create appointment; the active-slot unique index rejects racing double bookings
     appointment = Appointment(
         patient_id=data['patient_id'],
-        doctor_id=data['doctor_id'],
+        doctor_id=doctor.id,
         appointment_date=appointment_date,
         appointment_time=appointment_time,
+        duration_minutes=duration,
         reason=data.get('reason'),
         status='Booked'
     )
     db.session.add(appointment)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        if not is_slot_conflict(e):
+            raise
+        return jsonify({
+            'success': False,
+            'message': 'This time slot is not available'
+        }), 409
     
     return jsonify({
         'success': True,
@@ -488,6 +892,43 @@ def create_appointment():
         'data': serialize_appointment(appointment)
     }), 201
 
+@api_bp.route('/appointments/bulk', methods=['POST'])
+@login_required
+def bulk_create_appointments_endpoint():
+    """
+    POST /api/appointments/bulk - Create many appointments (admin only)
+
+    Body: an array of create_appointment objects (or {"items": [...]}).
+    Items get the same slot checks as single bookings, including against
+    each other; valid ones are created in one transaction and each item
+    gets a result {index, success, id | message}; the status is 201, 207
+    (some failed) or 400 (all failed).
+    """
+    if not current_user.is_admin():
+        return jsonify({
+            'success': False,
+            'message': 'Unauthorized - Admin access required'
+        }), 403
+    
+    items, error = _bulk_items()
+    if error:
+        return error
+    
+    results = bulk_create_appointments(items)
+    try:
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        if not is_slot_conflict(e):
+            raise
+        return jsonify({
+            'success': False,
+            'message': 'A slot was booked concurrently, batch not saved; please retry'
+        }), 409
+    
+    invalidate_booked_doctors(items, results)
+    return _bulk_response(results)
+
 @api_bp.route('/appointments/<int:appointment_id>', methods=['PUT'])
 @login_required
 def update_appointment(appointment_id):
@@ -496,18 +937,38 @@ def update_appointment(appointment_id):
     data = request.get_json()
     
     if 'status' in data:
-        if data['status'] in ['Booked', 'Completed', 'Canceled']:
-            appointment.status = data['status']
-        else:
+        if data['status'] not in ['Booked', 'Completed', 'Canceled']:
             return jsonify({
                 'success': False,
                 'message': 'Invalid status value'
             }), 400
+        
+        # Re-activating a cancelled appointment takes its slot again, which
+        # may have been booked (or overlapped) since it was freed
+        if appointment.status == 'Canceled' and data['status'] != 'Canceled':
+            slot = check_slot(appointment.doctor_id, appointment.appointment_date,
+                              appointment.appointment_time, slot_minutes=appointment.duration_minutes,
+                              exclude_appointment_id=appointment.id)
+            if not slot.available:
+                return jsonify({
+                    'success': False,
+                    'message': slot.message
+                }), 409
+        appointment.status = data['status']
     
     if 'notes' in data:
         appointment.notes = data['notes']
     
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        if not is_slot_conflict(e):
+            raise
+        return jsonify({
+            'success': False,
+            'message': 'This time slot is not available'
+        }), 409
     
     return jsonify({
         'success': True,
@@ -534,66 +995,533 @@ def cancel_appointment(appointment_id):
 @api_bp.route('/stats', methods=['GET'])
 @login_required
 def get_stats():
-    """GET /api/stats - Get system statistics (admin only)"""
+    """
+    GET /api/stats - Get system statistics (admin only)
+    Query parameters:
+    - fields: Comma-separated statistics to return (default: all)
+    Totals are read from the maintained counters (utils.counters), not counted.
+    """
     if not current_user.is_admin():
         return jsonify({
             'success': False,
             'message': 'Unauthorized - Admin access required'
         }), 403
     
-    stats = {
-        'total_doctors': Doctor.query.filter_by(is_deleted=False, is_active=True).count(),
-        'total_patients': Patient.query.filter_by(is_deleted=False, is_active=True).count(),
-        'total_appointments': Appointment.query.filter_by(is_deleted=False).count(),
-        'booked_appointments': Appointment.query.filter_by(is_deleted=False, status='Booked').count(),
-        'completed_appointments': Appointment.query.filter_by(is_deleted=False, status='Completed').count(),
-        'canceled_appointments': Appointment.query.filter_by(is_deleted=False, status='Canceled').count()
+    counters = {
+        'total_doctors': 'doctors:active',
+        'total_patients': 'patients:active',
+        'total_appointments': 'appointments',
+        'booked_appointments': 'appointments:status:Booked',
+        'completed_appointments': 'appointments:status:Completed',
+        'canceled_appointments': 'appointments:status:Canceled'
     }
     
+    names = requested_fields() or list(counters)
+    unknown = [name for name in names if name not in counters]
+    if unknown:
+        return jsonify({
+            'success': False,
+            'message': f"Unknown field(s): {', '.join(unknown)}"
+        }), 400
+    
+    names = [name for name in counters if name in names]
+    values = read_counters(counters[name] for name in names)
+    stats = {name: values[counters[name]] for name in names}
+    
     return jsonify({
         'success': True,
         'data': stats
     }), 200
+
+# ============= EXPORT ENDPOINTS =============
+
+EXPORT_MODELS = {
+    'appointments': Appointment,
+    'patients': Patient,
+    'treatments': Treatment
+}
+
+
+@api_bp.route('/export/<any(appointments, patients, treatments):table>', methods=['GET'])
+@login_required
+def export_table(table):
+    """
+    GET /api/export/<table> - Stream every row of a table as NDJSON (admin only)
+
+    One JSON object per line, raw column values, soft-deleted rows included.
+    Rows are streamed from a server-side cursor, so the export never holds
+    more than one batch in memory.
+
+    Query params:
+    - updated_since: ISO datetime; only rows with updated_at >= this
+    - updated_before: ISO datetime; only rows with updated_at < this
+    - fields: Comma-separated columns to export (default: all)
+
+    The X-Export-Watermark response header is the server time the export
+    started; pass it as updated_since on the next incremental pull.
+    """
+    if not current_user.is_admin():
+        return jsonify({
+            'success': False,
+            'message': 'Unauthorized - Admin access required'
+        }), 403
+
+    try:
+        columns = export_columns(EXPORT_MODELS[table], requested_fields())
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+
+    bounds = {}
+    for param in ('updated_since', 'updated_before'):
+        value = request.args.get(param)
+        if value:
+            try:
+                bounds[param] = datetime.fromisoformat(value)
+            except ValueError:
+                return jsonify({
+                    'success': False,
+                    'message': f'Invalid {param}, use ISO format (YYYY-MM-DDTHH:MM:SS)'
+                }), 400
+
+    watermark = datetime.utcnow()
+    response = Response(
+        stream_with_context(iter_ndjson(EXPORT_MODELS[table], columns, **bounds)),
+        mimetype='application/x-ndjson'
+    )
+    response.headers['Content-Disposition'] = f'attachment; filename={table}.ndjson'
+    response.headers['X-Export-Watermark'] = watermark.isoformat()
+    return response
+
+# ============= SCHEDULING ENDPOINTS =============
+
+MAX_FREE_SLOT_WINDOW_DAYS = 90
+
+@api_bp.route('/doctors/<int:doctor_id>/free-slots', methods=['GET'])
+def get_doctor_free_slots(doctor_id):
+    """
+    GET /api/doctors/<id>/free-slots - Bookable slots computed server-side
+    Query parameters:
+    - from: Start date YYYY-MM-DD (default today)
+    - to: End date YYYY-MM-DD, inclusive (default from + 30 days)
+    - duration: Slot length in minutes (default: the doctor's visit length)
+    """
+    doctor = Doctor.query.filter_by(id=doctor_id, is_deleted=False).first()
+    if not doctor:
+        return jsonify({
+            'success': False,
+            'message': 'Doctor not found'
+        }), 404
+    
+    start_date, end_date, duration, error = free_slot_window(doctor)
+    if error:
+        return error
+    
+    holder = holder_for(current_user) if current_user.is_authenticated else None
+    slots = get_free_slots(doctor_id, start_date, end_date, duration, holder=holder)
+    return free_slots_response(doctor_id, start_date, end_date, duration, slots)
+
+def free_slot_window(doctor):
+    """
+    (start_date, end_date, duration, None) from the free-slot query
+    parameters, or (None, None, None, error response)
+    """
+    try:
+        from_str = request.args.get('from')
+        to_str = request.args.get('to')
+        start_date = datetime.strptime(from_str, '%Y-%m-%d').date() if from_str else date.today()
+        end_date = datetime.strptime(to_str, '%Y-%m-%d').date() if to_str else start_date + timedelta(days=30)
+    except ValueError:
+        return None, None, None, (jsonify({
+            'success': False,
+            'message': 'Invalid date format'
+        }), 400)
+    
+    duration = request.args.get('duration', visit_minutes(doctor), type=int)
+    if not duration or duration < 5 or duration > 480:
+        return None, None, None, (jsonify({
+            'success': False,
+            'message': 'Duration must be between 5 and 480 minutes'
+        }), 400)
+    
+    if end_date < start_date or (end_date - start_date).days > MAX_FREE_SLOT_WINDOW_DAYS:
+        return None, None, None, (jsonify({
+            'success': False,
+            'message': f'Date range must be between 0 and {MAX_FREE_SLOT_WINDOW_DAYS} days'
+        }), 400)
+    return start_date, end_date, duration, None
+
+def free_slots_response(doctor_id, start_date, end_date, duration, slots):
+    """Free-slot list grouped by date"""
+    # Group by date to keep the payload compact
+    days = []
+    for slot_date, start_time, _ in slots:
+        if not days or days[-1]['date'] != slot_date.isoformat():
+            days.append({'date': slot_date.isoformat(), 'slots': []})
+        days[-1]['slots'].append(start_time.strftime('%H:%M'))
+    
+    return jsonify({
+        'success': True,
+        'doctor_id': doctor_id,
+        'from': start_date.isoformat(),
+        'to': end_date.isoformat(),
+        'duration': duration,
+        'count': len(slots),
+        'data': days
+    }), 200
+
+def _parse_slot_request():
+    """Parse doctor_id/date/time from a JSON body; returns (doctor_id, date, time, error)"""
+    data = request.get_json(silent=True) or {}
+    for field in ['doctor_id', 'date', 'time']:
+        if field not in data:
+            return None, None, None, f'Missing required field: {field}'
+    try:
+        slot_date = datetime.strptime(data['date'], '%Y-%m-%d').date()
+        slot_time = datetime.strptime(data['time'], '%H:%M').time()
+        doctor_id = int(data['doctor_id'])
+    except (TypeError, ValueError):
+        return None, None, None, 'Invalid doctor, date or time format'
+    return doctor_id, slot_date, slot_time, None
+
+@api_bp.route('/slots/hold', methods=['POST'])
+@login_required
+def hold_slot():
+    """
+    POST /api/slots/hold - Reserve a slot for SLOT_HOLD_SECONDS
+    JSON body: doctor_id, date (YYYY-MM-DD), time (HH:MM)
+    Holding again refreshes the caller's hold.
+    """
+    doctor_id, slot_date, slot_time, error = _parse_slot_request()
+    if error:
+        return jsonify({
+            'success': False,
+            'message': error
+        }), 400
+    
+    if slot_date < date.today():
+        return jsonify({
+            'success': False,
+            'message': 'Cannot hold slots in the past'
+        }), 400
+    
+    holder = holder_for(current_user)
+    current_holder = slot_holds.holder_of(doctor_id, slot_date, slot_time)
+    if current_holder and current_holder != holder:
+        return jsonify({
+            'success': False,
+            'message': 'Another patient is booking this slot. Please choose another time.'
+        }), 409
+    
+    doctor = Doctor.query.filter_by(id=doctor_id, is_deleted=False).first()
+    if not doctor:
+        return jsonify({
+            'success': False,
+            'message': 'Doctor not found'
+        }), 404
+    
+    is_avail, msg = is_slot_available(doctor_id, slot_date, slot_time,
+                                      slot_minutes=visit_minutes(doctor))
+    if not is_avail:
+        return jsonify({
+            'success': False,
+            'message': msg
+        }), 409
+    
+    if not slot_holds.hold(doctor_id, slot_date, slot_time, holder):
+        return jsonify({
+            'success': False,
+            'message': 'Another patient is booking this slot. Please choose another time.'
+        }), 409
+    
+    return jsonify({
+        'success': True,
+        'message': 'Slot held',
+        'data': {
+            'doctor_id': doctor_id,
+            'date': slot_date.isoformat(),
+            'time': slot_time.strftime('%H:%M'),
+            'expires_in': current_app.config['SLOT_HOLD_SECONDS']
+        }
+    }), 200
+
+@api_bp.route('/slots/hold', methods=['DELETE'])
+@login_required
+def release_slot():
+    """DELETE /api/slots/hold - Release the caller's hold (same JSON body as POST)"""
+    doctor_id, slot_date, slot_time, error = _parse_slot_request()
+    if error:
+        return jsonify({
+            'success': False,
+            'message': error
+        }), 400
+    
+    slot_holds.release(doctor_id, slot_date, slot_time, holder_for(current_user))
+    return jsonify({
+        'success': True,
+        'message': 'Slot released'
+    }), 200
+
+@api_bp.route('/doctors/earliest-slots', methods=['GET'])
+@login_required
+def get_earliest_slots():
+    """
+    GET /api/doctors/earliest-slots - Earliest open slots across matching doctors
+    Query parameters:
+    - specialization: Filter by specialization
+    - priority: Triage priority (sets the default search horizon)
+    - from, to: Date window YYYY-MM-DD (inclusive)
+    - limit: Number of slots to return (default 5, max 50)
+    - duration: Slot length in minutes (default: each doctor's visit length)
+    """
+    try:
+        from_str = request.args.get('from')
+        to_str = request.args.get('to')
+        start_date = datetime.strptime(from_str, '%Y-%m-%d').date() if from_str else None
+        end_date = datetime.strptime(to_str, '%Y-%m-%d').date() if to_str else None
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'message': 'Invalid date format'
+        }), 400
+    
+    limit = min(max(request.args.get('limit', 5, type=int) or 5, 1), 50)
+    duration = request.args.get('duration', type=int)
+    if duration is not None and (duration < 5 or duration > 480):
+        return jsonify({
+            'success': False,
+            'message': 'Duration must be between 5 and 480 minutes'
+        }), 400
+    
+    if start_date and end_date and (end_date < start_date or (end_date - start_date).days > MAX_FREE_SLOT_WINDOW_DAYS):
+        return jsonify({
+            'success': False,
+            'message': f'Date range must be between 0 and {MAX_FREE_SLOT_WINDOW_DAYS} days'
+        }), 400
+    
+    slots = find_earliest_slots(
+        specialization=request.args.get('specialization'),
+        priority=request.args.get('priority'),
+        start_date=start_date,
+        end_date=end_date,
+        limit=limit,
+        duration=duration
+    )
+    
+    return jsonify({
+        'success': True,
+        'count': len(slots),
+        'data': [{
+            'doctor_id': doctor.id,
+            'doctor_name': doctor.full_name,
+            'specialization': doctor.specialization,
+            'date': slot_date.isoformat(),
+            'start_time': start_time.strftime('%H:%M'),
+            'end_time': end_time.strftime('%H:%M')
+        } for doctor, slot_date, start_time, end_time in slots]
+    }), 200
+
+def _parse_schedule_window(default_days):
+    """Parse from/to query parameters; returns (start_date, end_date, error message)"""
+    try:
+        from_str = request.args.get('from')
+        to_str = request.args.get('to')
+        start_date = datetime.strptime(from_str, '%Y-%m-%d').date() if from_str else date.today()
+        end_date = datetime.strptime(to_str, '%Y-%m-%d').date() if to_str else start_date + timedelta(days=default_days)
+    except ValueError:
+        return None, None, 'Invalid date format'
+    if end_date < start_date or (end_date - start_date).days > MAX_FREE_SLOT_WINDOW_DAYS:
+        return None, None, f'Date range must be between 0 and {MAX_FREE_SLOT_WINDOW_DAYS} days'
+    return start_date, end_date, None
+
+def _schedule_doctor_ids():
+    """Active doctor ids, optionally filtered by ?specialization="""
+    query = db.session.query(Doctor.id).filter_by(is_deleted=False, is_active=True)
+    specialization = request.args.get('specialization')
+    if specialization:
+        query = query.filter(Doctor.specialization.ilike(f'%{specialization}%'))
+    return [row[0] for row in query.order_by(Doctor.id).all()]
+
+@api_bp.route('/schedule/first-fit', methods=['GET'])
+@login_required
+def get_first_fit():
+    """
+    GET /api/schedule/first-fit - Earliest free slot per matching doctor, soonest first
+    Query parameters:
+    - specialization: Filter by specialization
+    - from, to: Date window YYYY-MM-DD (default today + 7 days)
+    - duration: Slot length in minutes (default each doctor's visit length)
+    - limit: Number of doctors to return (default 5, max 50)
+    Slots held by other patients are skipped.
+    """
+    from utils.occupancy import build_occupancy
     
-@api_bp.route('/doctor/<int:doctor_id>/availability')
-def doctor_availability(doctor_id):
-    """Get doctor availability and booked appointments"""
-    from models.doctor_availability import DoctorAvailability
-    from models.appointment import Appointment
-    from datetime import date, timedelta
-    
-    today = date.today()
-    future = today + timedelta(days=30)
-    
-    # Get availability
-    avail = DoctorAvailability.query.filter(
-        DoctorAvailability.doctor_id == doctor_id,
-        DoctorAvailability.available_date >= today,
-        DoctorAvailability.available_date <= future,
-        DoctorAvailability.is_available == True
-    ).all()
-    
-    # Get booked appointments
-    appointments = Appointment.query.filter(
-        Appointment.doctor_id == doctor_id,
-        Appointment.appointment_date >= today,
-        Appointment.appointment_date <= future,
-        Appointment.is_deleted == False,
-        Appointment.status == 'Booked'
-    ).all()
+    start_date, end_date, error = _parse_schedule_window(7)
+    if error:
+        return jsonify({
+            'success': False,
+            'message': error
+        }), 400
+    
+    duration = request.args.get('duration', type=int)
+    if 'duration' in request.args and (not duration or duration < 5 or duration > 480):
+        return jsonify({
+            'success': False,
+            'message': 'Duration must be between 5 and 480 minutes'
+        }), 400
+    limit = min(max(request.args.get('limit', 5, type=int) or 5, 1), 50)
+    
+    doctor_ids = _schedule_doctor_ids()
+    durations = dict.fromkeys(doctor_ids, duration) if duration else visit_minutes_for(doctor_ids)
+    held = slot_holds.held_intervals_many(doctor_ids, start_date, end_date,
+                                          exclude_holder=holder_for(current_user), minutes=durations)
+    grid = build_occupancy(doctor_ids, start_date, end_date, held=held)
+    hits = grid.first_fit(durations, limit=limit, not_before=datetime.now())
     
     return jsonify({
         'success': True,
-        'availability': [{
-            'date': a.available_date.isoformat(),
-            'start_time': a.start_time.strftime('%H:%M'),
-            'end_time': a.end_time.strftime('%H:%M')
-        } for a in avail],
-        'appointments': [{
-            'date': apt.appointment_date.isoformat(),
-            'time': apt.appointment_time.strftime('%H:%M'),
-            'end_time': (datetime.combine(date.today(), apt.appointment_time) + timedelta(minutes=30)).strftime('%H:%M')
-        } for apt in appointments]
-    })
+        'count': len(hits),
+        'duration': duration,
+        'data': [{
+            'doctor_id': doctor_id,
+            'date': start.date().isoformat(),
+            'start_time': start.strftime('%H:%M'),
+            'end_time': (start + timedelta(minutes=durations[doctor_id])).strftime('%H:%M'),
+            'duration_minutes': durations[doctor_id]
+        } for start, doctor_id in hits]
+    }), 200
+
+@api_bp.route('/schedule/utilisation', methods=['GET'])
+@login_required
+def get_utilisation():
+    """
+    GET /api/schedule/utilisation - Booked share of available time (admin only)
+    Query parameters:
+    - specialization: Filter by specialization
+    - from, to: Date window YYYY-MM-DD (default today + 7 days)
+    """
+    from utils.occupancy import build_occupancy
     
+    if not current_user.is_admin():
+        return jsonify({
+            'success': False,
+            'message': 'Unauthorized - Admin access required'
+        }), 403
+    
+    start_date, end_date, error = _parse_schedule_window(7)
+    if error:
+        return jsonify({
+            'success': False,
+            'message': error
+        }), 400
+    
+    grid = build_occupancy(_schedule_doctor_ids(), start_date, end_date)
+    
+    return jsonify({
+        'success': True,
+        'from': start_date.isoformat(),
+        'to': end_date.isoformat(),
+        'data': grid.utilisation()
+    }), 200
+
+
+# ============= BATCH =============
+
+@api_bp.route('/batch', methods=['POST'])
+@login_required
+def batch():
+    """
+    POST /api/batch - Run several API GETs in one round trip
+
+    Body: {"requests": ["/api/doctors?limit=20", "/api/patients/3", ...]}
+    (at most BATCH_MAX_REQUESTS). Each path runs with the caller's own
+    permissions; the response lists {path, status, headers, body} per
+    request, in order.
+    """
+    data = request.get_json(silent=True)
+    paths = data.get('requests') if isinstance(data, dict) else None
+    if not isinstance(paths, list) or not paths:
+        return jsonify({
+            'success': False,
+            'message': 'Body must be {"requests": [<path>, ...]}'
+        }), 400
+    
+    max_requests = current_app.config['BATCH_MAX_REQUESTS']
+    if len(paths) > max_requests:
+        return jsonify({
+            'success': False,
+            'message': f'At most {max_requests} requests per batch'
+        }), 400
+    
+    responses = run_batch(paths)
+    
+    return jsonify({
+        'success': all(200 <= item['status'] < 400 for item in responses),
+        'responses': responses
+    }), 200
+
+
+# ============= LIVE EVENT STREAMS =============
+
+def _event_stream(*channels):
+    """text/event-stream response relaying `channels` until the client disconnects"""
+    # Don't hold a pooled connection for the lifetime of the stream
+    db.session.close()
+    return Response(
+        stream_with_context(live_events.stream(channels)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@api_bp.route('/events/appointments', methods=['GET'])
+@login_required
+def stream_appointment_events():
+    """
+    GET /api/events/appointments - Server-Sent Events for every appointment
+    created, updated or cancelled (admin only)
+    """
+    if not current_user.is_admin():
+        return jsonify({
+            'success': False,
+            'message': 'Unauthorized - Admin access required'
+        }), 403
+    
+    return _event_stream('appointments')
+
+
+@api_bp.route('/events/doctors/<int:doctor_id>', methods=['GET'])
+@login_required
+def stream_doctor_events(doctor_id):
+    """
+    GET /api/events/doctors/<id> - Server-Sent Events for one doctor's
+    appointments and the triage assessments assigned to them
+    (admin or that doctor)
+    """
+    if not current_user.is_admin():
+        doctor = Doctor.query.filter_by(user_id=current_user.id, is_deleted=False).first()
+        if not doctor or doctor.id != doctor_id:
+            return jsonify({
+                'success': False,
+                'message': 'Unauthorized'
+            }), 403
+    
+    return _event_stream(f'doctor:{doctor_id}')
+
+
+@api_bp.route('/events/triage', methods=['GET'])
+@login_required
+def stream_triage_events():
+    """
+    GET /api/events/triage - Server-Sent Events for triage assessments
+    (triage, nurse and admin)
+    """
+    if not (current_user.is_admin() or current_user.is_triage() or current_user.is_nurse()):
+        return jsonify({
+            'success': False,
+            'message': 'Unauthorized'
+        }), 403
     
+    return _event_stream('triage')
@@ -1,7 +1,7 @@
 """
 Doctor routes for appointment management and patient treatment
 """
-from flask import render_template, redirect, url_for, flash, request
+from flask import render_template, redirect, url_for, flash, request, abort, Response, stream_with_context
 from flask_login import current_user
 from extensions import db
 from models.doctor import Doctor
@@ -9,9 +9,16 @@ from models.patient import Patient
 from models.appointment import Appointment
 from models.treatment import Treatment
 from models.doctor_availability import DoctorAvailability
+from models.doctor_availability_rule import DoctorAvailabilityRule
 from utils.decorators import doctor_required
+from utils.helpers import is_slot_conflict
+from utils.scheduling import get_availability
+from utils.rescheduling import bulk_reschedule, queue_reschedule_notifications
+from utils.calendar_feed import feed_validators, iter_feed
 from routes import doctor_bp
 from datetime import datetime, date, time, timedelta
+import secrets
+from sqlalchemy.exc import IntegrityError
 
 @doctor_bp.route('/dashboard')
 @doctor_required
@@ -187,18 +194,10 @@ def complete_appointment(appointment_id):
         available_nurses = Nurse.query.filter(Nurse.is_active == True).all()
         busy_nurses = []
     # NEW: Fetch doctor's availability for follow-up scheduling
-    from models.doctor_availability import DoctorAvailability
-    from datetime import timedelta
-
     today = date.today()
     future_date = today + timedelta(days=30)  # Show next 30 days
 
-    doctor_availability = DoctorAvailability.query.filter(
-        DoctorAvailability.doctor_id == doctor.id,
-        DoctorAvailability.available_date >= today,
-        DoctorAvailability.available_date <= future_date,
-        DoctorAvailability.is_available == True
-    ).all()
+    doctor_availability = get_availability(doctor.id, today, future_date)
 
     # Get existing appointments for this doctor (to show as blocked)
     doctor_appointments = Appointment.query.filter(
@@ -284,65 +283,149 @@ def patient_history(patient_id):
 @doctor_bp.route('/availability', methods=['GET', 'POST'])
 @doctor_required
 def availability():
-    """Set availability for next 7 days"""
+    """Set weekly availability rules and date-specific exceptions"""
     doctor = Doctor.query.filter_by(user_id=current_user.id).first()
+    today = date.today()
+    
+    # Rules still in effect (today or later), keyed by weekday
+    current_rules = {}
+    for rule in DoctorAvailabilityRule.query.filter(
+        DoctorAvailabilityRule.doctor_id == doctor.id,
+        db.or_(
+            DoctorAvailabilityRule.effective_until == None,
+            DoctorAvailabilityRule.effective_until >= today
+        )
+    ).order_by(DoctorAvailabilityRule.effective_from).all():
+        current_rules[rule.weekday] = rule
     
     if request.method == 'POST':
-        # Clear existing availability for next 7 days
-        today = date.today()
-        future_date = today + timedelta(days=7)
-        
-        DoctorAvailability.query.filter(
-            DoctorAvailability.doctor_id == doctor.id,
-            DoctorAvailability.available_date >= today,
-            DoctorAvailability.available_date <= future_date
-        ).delete()
-        
-        # Add new availability
-        for i in range(7):
-            current_date = today + timedelta(days=i)
-            date_str = current_date.strftime('%Y-%m-%d')
-            
-            is_available = request.form.get(f'available_{date_str}') == 'on'
+        if request.form.get('form_type') == 'rules':
+            for weekday in range(7):
+                rule = current_rules.get(weekday)
+                is_available = request.form.get(f'rule_available_{weekday}') == 'on'
+                start_time_str = request.form.get(f'rule_start_{weekday}')
+                end_time_str = request.form.get(f'rule_end_{weekday}')
+                
+                if is_available and start_time_str and end_time_str:
+                    start_time = datetime.strptime(start_time_str, '%H:%M').time()
+                    end_time = datetime.strptime(end_time_str, '%H:%M').time()
+                    if rule and (rule.start_time, rule.end_time) == (start_time, end_time):
+                        continue
+                    if rule and rule.effective_from >= today:
+                        # Not in effect on any past date yet; safe to edit in place
+                        rule.start_time = start_time
+                        rule.end_time = end_time
+                    else:
+                        if rule:
+                            # Past dates (and their appointments) keep the old hours
+                            rule.effective_until = today - timedelta(days=1)
+                        db.session.add(DoctorAvailabilityRule(
+                            doctor_id=doctor.id,
+                            weekday=weekday,
+                            start_time=start_time,
+                            end_time=end_time,
+                            effective_from=today
+                        ))
+                elif rule:
+                    if rule.effective_from >= today:
+                        db.session.delete(rule)
+                    else:
+                        # Keep the rule for past dates, stop it from today on
+                        rule.effective_until = today - timedelta(days=1)
+        else:
+            # Date exceptions: only store an override where the submitted
+            # hours differ from what the weekly rules already produce
+            overrides = DoctorAvailability.query.filter(
+                DoctorAvailability.doctor_id == doctor.id,
+                DoctorAvailability.available_date >= today,
+                DoctorAvailability.available_date < today + timedelta(days=7)
+            ).all()
+            overrides_by_date = {}
+            for row in overrides:
+                overrides_by_date.setdefault(row.available_date, []).append(row)
             
-            if is_available:
-                start_time_str = request.form.get(f'start_time_{date_str}')
-                end_time_str = request.form.get(f'end_time_{date_str}')
+            for i in range(7):
+                current_date = today + timedelta(days=i)
+                date_str = current_date.strftime('%Y-%m-%d')
                 
-                if start_time_str and end_time_str:
+                is_available = request.form.get(f'available_{date_str}') == 'on'
+                start_time = end_time = None
+                if is_available:
+                    start_time_str = request.form.get(f'start_time_{date_str}')
+                    end_time_str = request.form.get(f'end_time_{date_str}')
+                    if not (start_time_str and end_time_str):
+                        continue
                     start_time = datetime.strptime(start_time_str, '%H:%M').time()
                     end_time = datetime.strptime(end_time_str, '%H:%M').time()
-                    
-                    availability = DoctorAvailability(
-                        doctor_id=doctor.id,
-                        available_date=current_date,
-                        start_time=start_time,
-                        end_time=end_time,
-                        is_available=True
-                    )
-                    db.session.add(availability)
+                
+                rule_hours = [(r.start_time, r.end_time) for r in current_rules.values()
+                              if r.applies_to(current_date)]
+                matches_rules = (rule_hours == [(start_time, end_time)] if is_available
+                                 else not rule_hours)
+                
+                existing = overrides_by_date.get(current_date, [])
+                if matches_rules:
+                    for row in existing:
+                        db.session.delete(row)
+                    continue
+                
+                if len(existing) == 1:
+                    override = existing[0]
+                else:
+                    for row in existing:
+                        db.session.delete(row)
+                    override = DoctorAvailability(doctor_id=doctor.id, available_date=current_date)
+                    db.session.add(override)
+                override.is_available = is_available
+                override.start_time = start_time or time(0, 0)
+                override.end_time = end_time or time(0, 0)
         
-        db.session.commit()
+        # Move appointments that no longer fit, in the same transaction
+        moves, unplaced = bulk_reschedule(doctor.id)
+        try:
+            db.session.commit()
+        except IntegrityError as e:
+            db.session.rollback()
+            if not is_slot_conflict(e):
+                raise
+            flash('A slot was booked while affected appointments were being moved. Please try again.', 'danger')
+            return redirect(url_for('doctor.availability'))
+        
+        queue_reschedule_notifications(moves)
         flash('Availability updated successfully!', 'success')
+        if moves:
+            flash(f'{len(moves)} affected appointment(s) were moved to the nearest free slot and the patients notified.', 'info')
+        if unplaced:
+            flash(f'{len(unplaced)} affected appointment(s) could not be moved automatically. Please reschedule them.', 'warning')
         return redirect(url_for('doctor.availability'))
     
-    # Get current availability for next 7 days
-    today = date.today()
-    availability_data = []
+    # Weekly rules form
+    rules_data = [{
+        'weekday': weekday,
+        'name': DoctorAvailabilityRule.WEEKDAYS[weekday],
+        'rule': current_rules.get(weekday)
+    } for weekday in range(7)]
     
+    # Effective availability for next 7 days (rules + exceptions)
+    blocks = get_availability(doctor.id, today, today + timedelta(days=6))
+    override_dates = {
+        row[0] for row in db.session.query(DoctorAvailability.available_date).filter(
+            DoctorAvailability.doctor_id == doctor.id,
+            DoctorAvailability.available_date >= today,
+            DoctorAvailability.available_date < today + timedelta(days=7)
+        ).all()
+    }
+    availability_data = []
     for i in range(7):
         current_date = today + timedelta(days=i)
-        availability = DoctorAvailability.query.filter_by(
-            doctor_id=doctor.id,
-            available_date=current_date
-        ).first()
-        
         availability_data.append({
             'date': current_date,
-            'availability': availability
+            'availability': next((b for b in blocks if b.available_date == current_date), None),
+            'is_override': current_date in override_dates
         })
     
     return render_template('doctor/availability.html', 
+                         rules_data=rules_data,
                          availability_data=availability_data)
 
 @doctor_bp.route('/profile', methods=['GET', 'POST'])
@@ -374,4 +457,36 @@ def profile():
         flash('Profile updated successfully!', 'success')
         return redirect(url_for('doctor.profile'))
 
-    return render_template('doctor/profile.html', doctor=doctor)
\ No newline at end of file
+    return render_template('doctor/profile.html', doctor=doctor)
+
+@doctor_bp.route('/calendar/token', methods=['POST'])
+@doctor_required
+def regenerate_calendar_token():
+    """Create or replace the secret calendar feed URL"""
+    doctor = Doctor.query.filter_by(user_id=current_user.id).first()
+    doctor.calendar_token = secrets.token_urlsafe(32)
+    db.session.commit()
+    flash('A new calendar feed link was created. Links shared earlier no longer work.', 'success')
+    return redirect(url_for('doctor.profile'))
+
+@doctor_bp.route('/calendar/<token>.ics')
+def calendar_feed(token):
+    """
+    Upcoming appointments as an iCalendar feed for calendar apps.
+
+    Authenticated by the secret token in the URL (calendar clients cannot
+    log in). ETag/Last-Modified let polling clients get a 304 from a single
+    aggregate query; the full feed is only streamed when something changed.
+    """
+    doctor = Doctor.query.filter_by(calendar_token=token, is_deleted=False).first()
+    if not doctor:
+        abort(404)
+    
+    etag, last_modified = feed_validators(doctor)
+    response = Response(stream_with_context(iter_feed(doctor)), mimetype='text/calendar')
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.headers['Content-Disposition'] = 'inline; filename="appointments.ics"'
+    return response.make_conditional(request)
@@ -8,12 +8,14 @@ from models.patient import Patient
 from models.doctor import Doctor
 from models.appointment import Appointment
 from models.treatment import Treatment
-from models.doctor_availability import DoctorAvailability
 from utils.decorators import patient_required
-from utils.helpers import is_slot_available, send_email, generate_time_slots
+from utils.scheduling import expand_availability, get_availability, visit_minutes
+from utils.helpers import is_slot_available, is_slot_conflict, send_email, generate_time_slots
+from utils.slot_holds import slot_holds, holder_for
 from routes import patient_bp
 from datetime import datetime, date, timedelta
 from config import Config
+from sqlalchemy.exc import IntegrityError
 
 @patient_bp.route('/dashboard')
 @patient_required
@@ -113,15 +115,7 @@ def doctors():
     today = date.today()
     future_date = today + timedelta(days=7)
     
-    doctor_availability = {}
-    for doctor in doctors:
-        available_dates = DoctorAvailability.query.filter(
-            DoctorAvailability.doctor_id == doctor.id,
-            DoctorAvailability.available_date >= today,
-            DoctorAvailability.available_date <= future_date,
-            DoctorAvailability.is_available == True
-        ).all()
-        doctor_availability[doctor.id] = available_dates
+    doctor_availability = expand_availability([d.id for d in doctors], today, future_date)
     
     return render_template('patient/doctors.html',
                          doctors=doctors,
@@ -140,12 +134,7 @@ def doctor_profile(doctor_id):
     today = date.today()
     future_date = today + timedelta(days=7)
     
-    availability = DoctorAvailability.query.filter(
-        DoctorAvailability.doctor_id == doctor_id,
-        DoctorAvailability.available_date >= today,
-        DoctorAvailability.available_date <= future_date,
-        DoctorAvailability.is_available == True
-    ).order_by(DoctorAvailability.available_date).all()
+    availability = get_availability(doctor_id, today, future_date)
     
     return render_template('patient/doctor_profile.html',
                          doctor=doctor,
@@ -175,8 +164,17 @@ def book_appointment(doctor_id):
             flash('Cannot book appointments in the past.', 'danger')
             return redirect(url_for('patient.book_appointment', doctor_id=doctor_id))
         
+        # Another patient is mid-booking this slot: reject before touching the DB
+        holder = holder_for(current_user)
+        current_holder = slot_holds.holder_of(doctor_id, appointment_date, appointment_time)
+        if current_holder and current_holder != holder:
+            flash('Another patient is booking this time slot. Please choose another time.', 'danger')
+            return redirect(url_for('patient.book_appointment', doctor_id=doctor_id))
+        
         # Validate: check if slot is available (enhanced check)
-        is_avail, msg = is_slot_available(doctor_id, appointment_date, appointment_time)
+        duration = visit_minutes(doctor)
+        is_avail, msg = is_slot_available(doctor_id, appointment_date, appointment_time,
+                                          slot_minutes=duration)
         if not is_avail:
             flash(f'Time slot not available: {msg}', 'danger')
             return redirect(url_for('patient.book_appointment', doctor_id=doctor_id))
@@ -199,11 +197,20 @@ def book_appointment(doctor_id):
             doctor_id=doctor_id,
             appointment_date=appointment_date,
             appointment_time=appointment_time,
+            duration_minutes=duration,
             reason=reason,
             status='Booked'
         )
         db.session.add(appointment)
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError as e:
+            db.session.rollback()
+            if not is_slot_conflict(e):
+                raise
+            flash('This time slot was just booked by someone else. Please choose another time.', 'danger')
+            return redirect(url_for('patient.book_appointment', doctor_id=doctor_id))
+        slot_holds.release(doctor_id, appointment_date, appointment_time, holder)
         
         # Send email notification
         try:
@@ -237,12 +244,7 @@ Hospital Management System
     today = date.today()
     future_date = today + timedelta(days=7)
     
-    available_dates = DoctorAvailability.query.filter(
-        DoctorAvailability.doctor_id == doctor_id,
-        DoctorAvailability.available_date >= today,
-        DoctorAvailability.available_date <= future_date,
-        DoctorAvailability.is_available == True
-    ).order_by(DoctorAvailability.available_date).all()
+    available_dates = get_availability(doctor_id, today, future_date)
     
     return render_template('patient/book_appointment.html',
                          doctor=doctor,
@@ -355,14 +357,24 @@ def reschedule_appointment(appointment_id):
             return redirect(url_for('patient.reschedule_appointment', appointment_id=appointment_id))
         
         # Check if new slot is available
-        if not is_slot_available(appointment.doctor_id, new_date, new_time):
-            flash('This time slot is not available. Please choose another time.', 'danger')
+        is_avail, msg = is_slot_available(appointment.doctor_id, new_date, new_time,
+                                          slot_minutes=appointment.duration_minutes,
+                                          exclude_appointment_id=appointment_id)
+        if not is_avail:
+            flash(f'Time slot not available: {msg}', 'danger')
             return redirect(url_for('patient.reschedule_appointment', appointment_id=appointment_id))
         
         # Update appointment
         appointment.appointment_date = new_date
         appointment.appointment_time = new_time
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError as e:
+            db.session.rollback()
+            if not is_slot_conflict(e):
+                raise
+            flash('This time slot was just booked by someone else. Please choose another time.', 'danger')
+            return redirect(url_for('patient.reschedule_appointment', appointment_id=appointment_id))
         
         flash('Appointment rescheduled successfully!', 'success')
         return redirect(url_for('patient.appointments'))
@@ -371,12 +383,7 @@ def reschedule_appointment(appointment_id):
     today = date.today()
     future_date = today + timedelta(days=7)
     
-    available_dates = DoctorAvailability.query.filter(
-        DoctorAvailability.doctor_id == appointment.doctor_id,
-        DoctorAvailability.available_date >= today,
-        DoctorAvailability.available_date <= future_date,
-        DoctorAvailability.is_available == True
-    ).order_by(DoctorAvailability.available_date).all()
+    available_dates = get_availability(appointment.doctor_id, today, future_date)
     
     return render_template('patient/reschedule_appointment.html',
                          appointment=appointment,
@@ -11,6 +11,9 @@ from models.triage_assessment import TriageAssessment
 from models.patient import Patient
 from models.doctor import Doctor
 from models.appointment import Appointment
+from utils.helpers import check_slot, is_slot_conflict
+from utils.scheduling import find_earliest_slots, visit_minutes
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime, date
 
 # Create blueprint
@@ -162,11 +165,21 @@ def assign_doctor(assessment_id):
             flash('Invalid date or time format.', 'danger')
             return redirect(url_for('triage.assign_doctor', assessment_id=assessment_id))
         
+        doctor = Doctor.query.get_or_404(doctor_id)
+        duration = visit_minutes(doctor)
+        # The unique index only catches identical start times; check overlaps
+        # and the doctor's availability like every other booking path
+        slot = check_slot(doctor.id, appointment_date, appointment_time, slot_minutes=duration)
+        if not slot.available:
+            flash(f'Time slot not available: {slot.message}', 'danger')
+            return redirect(url_for('triage.assign_doctor', assessment_id=assessment_id))
+        
         appointment = Appointment(
             patient_id=assessment.patient_id,
             doctor_id=doctor_id,
             appointment_date=appointment_date,
             appointment_time=appointment_time,
+            duration_minutes=duration,
             reason=assessment.chief_complaint,
             priority=assessment.priority_level,
             triage_assessment_id=assessment.id,
@@ -174,11 +187,19 @@ def assign_doctor(assessment_id):
         )
         db.session.add(appointment)
         
-        assessment.status = 'Assigned'
-        assessment.assigned_doctor_id = doctor_id
-        assessment.appointment_id = appointment.id
-        
-        db.session.commit()
+        try:
+            # Flush first so the appointment id exists for the assessment
+            db.session.flush()
+            assessment.status = 'Assigned'
+            assessment.assigned_doctor_id = doctor_id
+            assessment.appointment_id = appointment.id
+            db.session.commit()
+        except IntegrityError as e:
+            db.session.rollback()
+            if not is_slot_conflict(e):
+                raise
+            flash('This doctor is already booked at that time. Please choose another slot.', 'danger')
+            return redirect(url_for('triage.assign_doctor', assessment_id=assessment_id))
         
         flash('Doctor assigned and appointment created successfully!', 'success')
         return redirect(url_for('triage.dashboard'))
@@ -192,7 +213,15 @@ def assign_doctor(assessment_id):
     else:
         doctors = Doctor.query.filter_by(is_deleted=False, is_active=True).all()
     
+    # Earliest open slots across the matching doctors
+    earliest_slots = find_earliest_slots(
+        specialization=assessment.recommended_specialization,
+        priority=assessment.priority_level,
+        limit=5
+    )
+    
     return render_template('triage/assign_doctor.html',
                          assessment=assessment,
                          doctors=doctors,
+                         earliest_slots=earliest_slots,
                          today=date.today().isoformat())
\ No newline at end of file
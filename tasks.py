@@ -44,6 +44,10 @@ celery.conf.beat_schedule = {
         'task': 'tasks.send_monthly_doctor_reports',
         'schedule': crontab(day_of_month=1, hour=10, minute=0),
     },
+    'reconcile-stat-counters': {
+        'task': 'tasks.reconcile_stat_counters',
+        'schedule': crontab(hour=3, minute=0),
+    },
 }
 
 
@@ -196,6 +200,29 @@ Hospital Management System
         return f"Sent {sent_count} monthly reports to doctors"
 
 
+@celery.task(name='tasks.reconcile_stat_counters')
+def reconcile_stat_counters():
+    """
+    Recompute the statistics counters from the source tables
+    Runs nightly; corrects drift from writes that bypass the ORM
+    """
+    with flask_app.app_context():
+        from utils.counters import reconcile_counters
+        
+        corrected = reconcile_counters()
+        print(f"Reconciled stat counters ({corrected} corrected)")
+        return corrected
+
+
+@celery.task(name='tasks.refresh_admin_dashboard', ignore_result=True)
+def refresh_admin_dashboard():
+    """Recompute the cached admin dashboard after its data changed"""
+    with flask_app.app_context():
+        from utils.dashboard import refresh_dashboard_cache
+        refresh_dashboard_cache()
+        return "Admin dashboard cache refreshed"
+
+
 @celery.task(name='tasks.send_treatment_summary')
 def send_treatment_summary(appointment_id):
     """
@@ -282,6 +309,66 @@ Hospital Management System
             import traceback
             traceback.print_exc()
             return f"Error sending treatment summary: {str(e)}"
+
+
+@celery.task(name='tasks.send_reschedule_notifications')
+def send_reschedule_notifications(moves):
+    """
+    User-triggered task: Email every patient whose appointment was moved by a
+    bulk reschedule. `moves` is a list of dicts with appointment_id,
+    old_doctor_id, old_date (ISO) and old_time (HH:MM).
+    """
+    with flask_app.app_context():
+        appointment_ids = [move['appointment_id'] for move in moves]
+        appointments = {
+            a.id: a for a in Appointment.query.filter(Appointment.id.in_(appointment_ids)).all()
+        }
+        doctor_ids = {a.doctor_id for a in appointments.values()}
+        doctor_ids.update(move['old_doctor_id'] for move in moves)
+        doctors = {d.id: d for d in Doctor.query.filter(Doctor.id.in_(doctor_ids)).all()}
+        
+        sent_count = 0
+        # One SMTP connection for the whole batch
+        with mail.connect() as conn:
+            for move in moves:
+                appointment = appointments.get(move['appointment_id'])
+                if not appointment or appointment.status != 'Booked':
+                    continue
+                try:
+                    patient = appointment.patient
+                    doctor = doctors[appointment.doctor_id]
+                    old_doctor = doctors.get(move['old_doctor_id'], doctor)
+                    old_date = datetime.strptime(move['old_date'], '%Y-%m-%d')
+                    old_time = datetime.strptime(move['old_time'], '%H:%M')
+                    
+                    body = f"""
+Dear {patient.full_name},
+
+Dr. {old_doctor.full_name} is no longer available at the time of your appointment,
+so it has been rescheduled to the nearest free slot.
+
+Previous: Dr. {old_doctor.full_name}, {old_date.strftime('%A, %d %B %Y')} at {old_time.strftime('%I:%M %p')}
+New:      Dr. {doctor.full_name} ({doctor.specialization}), {appointment.appointment_date.strftime('%A, %d %B %Y')} at {appointment.appointment_time.strftime('%I:%M %p')}
+
+If the new time does not suit you, please log in to your account to reschedule or cancel.
+
+Thank you,
+Hospital Management System
+                    """
+                    
+                    msg = Message(
+                        subject="Your appointment has been rescheduled",
+                        recipients=[patient.user.email],
+                        body=body
+                    )
+                    conn.send(msg)
+                    sent_count += 1
+                    
+                except Exception as e:
+                    print(f"Error sending reschedule notice for appointment {appointment.id}: {str(e)}")
+                    continue
+        
+        return f"Sent {sent_count} reschedule notifications"
         
         
 # tasks.py
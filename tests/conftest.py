@@ -0,0 +1,53 @@
+"""
+Shared fixtures: the app on an in-memory database seeded by init_database()
+"""
+import contextlib
+import io
+import os
+import sys
+
+import pytest
+from flask import g
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+
+
+class TestConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    CACHE_TYPE = 'SimpleCache'
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    SLOT_HOLD_BACKEND = 'memory'
+    LIVE_EVENTS_BACKEND = 'memory'
+
+
+@pytest.fixture
+def app():
+    from app import create_app, init_database
+    from extensions import db
+
+    app = create_app(TestConfig)
+    with app.app_context():
+        with contextlib.redirect_stdout(io.StringIO()):
+            init_database()
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def login(client):
+    """Function logging the test client in as a user id (1 is the seeded admin)"""
+    def login(user_id):
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+            session['_fresh'] = True
+        # Requests share the fixture's app context; drop Flask-Login's cached user
+        g.pop('_login_user', None)
+    return login
@@ -0,0 +1,83 @@
+"""
+Delta sync (/api/appointments/changes): changes arrive once, removals as tombstones
+"""
+from datetime import date, datetime, time, timedelta
+
+import pytest
+
+from extensions import db
+from models.appointment import Appointment
+
+
+@pytest.fixture
+def sync(app, client, login):
+    app.config['CHANGES_SETTLE_SECONDS'] = 0
+    login(1)
+
+    def sync(since=None, **params):
+        response = client.get('/api/appointments/changes',
+                              query_string={'since': since or '', **params})
+        assert response.status_code == 200
+        return response.get_json()
+    return sync
+
+
+def _book(hour):
+    appointment = Appointment(patient_id=1, doctor_id=1, appointment_date=date.today() + timedelta(days=1),
+                              appointment_time=time(hour, 0), status='Booked')
+    db.session.add(appointment)
+    db.session.commit()
+    return appointment
+
+
+def test_changes_and_tombstones(sync):
+    kept, canceled, deleted = _book(9), _book(10), _book(11)
+
+    full = sync()
+    assert {item['id'] for item in full['data']} >= {kept.id, canceled.id, deleted.id}
+    assert full['has_more'] is False
+    since = full['next_since']
+
+    # Nothing changed: same token back, no rows
+    empty = sync(since)
+    assert empty['data'] == [] and empty['tombstones'] == []
+    assert empty['next_since'] == since
+
+    canceled.status = 'Canceled'
+    deleted.is_deleted = True
+    kept.notes = 'Bring previous ECG'
+    db.session.commit()
+
+    delta = sync(since)
+    assert [item['id'] for item in delta['data']] == [kept.id]
+    assert sorted(delta['tombstones']) == sorted([canceled.id, deleted.id])
+    assert sync(delta['next_since'])['tombstones'] == []
+
+
+def test_paged_changes(sync):
+    booked = [_book(hour) for hour in range(9, 14)]
+    ids, since = [], None
+    while True:
+        page = sync(since, limit=2, doctor_id=1)
+        ids.extend(item['id'] for item in page['data'])
+        since = page['next_since']
+        if not page['has_more']:
+            break
+    assert set(ids) >= {a.id for a in booked}
+    assert len(ids) == len(set(ids))
+
+
+def test_settle_window_holds_back_recent_rows(app, sync):
+    app.config['CHANGES_SETTLE_SECONDS'] = 60
+    recent = _book(9)
+    assert recent.id not in [item['id'] for item in sync()['data']]
+
+    recent.updated_at = datetime.utcnow() - timedelta(minutes=5)
+    db.session.commit()
+    assert recent.id in [item['id'] for item in sync()['data']]
+
+
+def test_invalid_since(sync, client):
+    response = client.get('/api/appointments/changes', query_string={'since': 'bogus'})
+    assert response.status_code == 400
+    assert response.get_json()['message'] == 'Invalid since token'
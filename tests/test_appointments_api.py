@@ -0,0 +1,100 @@
+"""
+Booking through /api/appointments: slot conflicts surface as 409
+"""
+from datetime import date, time, timedelta
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models.appointment import Appointment
+from utils.helpers import is_slot_conflict
+
+DAY = (date.today() + timedelta(days=1)).isoformat()
+
+
+@pytest.fixture
+def admin(login):
+    login(1)
+
+
+def _book(client, start, doctor_id=1, **extra):
+    return client.post('/api/appointments', json={
+        'patient_id': 1, 'doctor_id': doctor_id,
+        'appointment_date': DAY, 'appointment_time': start, **extra
+    })
+
+
+def test_same_slot_booked_twice(client, admin):
+    assert _book(client, '09:00').status_code == 201
+    response = _book(client, '09:00')
+    assert response.status_code == 409
+    assert response.get_json()['success'] is False
+
+    # Another doctor's identical slot is unaffected
+    assert _book(client, '09:00', doctor_id=2).status_code == 201
+
+
+def test_cancelled_slot_rebook(client, admin):
+    first = _book(client, '10:00').get_json()['data']['id']
+    assert client.delete(f'/api/appointments/{first}').status_code == 200
+
+    # The freed slot can be taken by someone else
+    assert _book(client, '10:00').status_code == 201
+
+    response = client.put(f'/api/appointments/{first}', json={'status': 'Booked'})
+    assert response.status_code == 409
+    assert response.get_json()['message'] == 'Conflicts with existing appointment at 10:00'
+    assert client.get(f'/api/appointments/{first}').get_json()['data']['status'] == 'Canceled'
+
+
+def test_cancelled_appointment_reactivated_when_free(client, admin):
+    first = _book(client, '11:00').get_json()['data']['id']
+    client.delete(f'/api/appointments/{first}')
+
+    response = client.put(f'/api/appointments/{first}', json={'status': 'Booked'})
+    assert response.status_code == 200
+    assert response.get_json()['data']['status'] == 'Booked'
+
+
+def test_active_slot_index(app):
+    """Racing bookings that both pass check_slot are stopped by the partial unique index"""
+    slot = dict(patient_id=1, doctor_id=1, appointment_date=date.fromisoformat(DAY),
+                appointment_time=time(14, 0))
+    db.session.add(Appointment(status='Canceled', **slot))
+    db.session.add(Appointment(status='Booked', **slot))
+    db.session.commit()
+
+    db.session.add(Appointment(status='Booked', **slot))
+    with pytest.raises(IntegrityError) as error:
+        db.session.commit()
+    db.session.rollback()
+    assert is_slot_conflict(error.value)
+
+
+def test_visit_length_defaults(client, admin):
+    # Doctor 1 is Cardiology (APPOINTMENT_SLOT_DURATION), 3 Orthopedics (45)
+    assert _book(client, '09:00').get_json()['data']['duration_minutes'] == 30
+    assert _book(client, '09:00', doctor_id=3).get_json()['data']['duration_minutes'] == 45
+    assert _book(client, '10:00', duration_minutes=15).get_json()['data']['duration_minutes'] == 15
+
+
+@pytest.mark.parametrize('duration', [0, 4, 481, '30'])
+def test_invalid_duration(client, admin, duration):
+    response = _book(client, '09:00', duration_minutes=duration)
+    assert response.status_code == 400
+    assert response.get_json()['message'] == 'duration_minutes must be between 5 and 480'
+
+
+def test_overlapping_mixed_length_bookings(client, admin):
+    assert _book(client, '09:00', duration_minutes=60).status_code == 201
+
+    # Starts inside the hour-long visit, so the unique index alone would allow it
+    response = _book(client, '09:30', duration_minutes=15)
+    assert response.status_code == 409
+    assert response.get_json()['message'] == 'Conflicts with existing appointment at 09:00'
+
+    # And a long visit may not swallow a later short one
+    assert _book(client, '11:00', duration_minutes=10).status_code == 201
+    assert _book(client, '10:30', duration_minutes=45).status_code == 409
+    assert _book(client, '10:00', duration_minutes=60).status_code == 201
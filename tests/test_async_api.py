@@ -0,0 +1,79 @@
+"""
+Read-only ASGI service: same responses as the Flask API on an async driver
+"""
+import asyncio
+import contextlib
+import io
+import json
+from datetime import date, timedelta
+
+import pytest
+
+from async_api import async_database_url
+from conftest import TestConfig
+
+
+def test_async_database_url():
+    assert str(async_database_url('sqlite:///hospital.db')) == 'sqlite+aiosqlite:///hospital.db'
+    assert str(async_database_url('postgresql://u:p@db/hms')).startswith('postgresql+asyncpg://u:')
+    with pytest.raises(ValueError):
+        async_database_url('mysql://u:p@db/hms')
+
+
+@pytest.fixture
+def services(tmp_path):
+    """(Flask test client, ASGI app) sharing one SQLite file"""
+    pytest.importorskip('aiosqlite')
+    from app import create_app, init_database
+    from async_api import ReadOnlyAPI
+    from extensions import db
+
+    class FileConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'hospital.db'}"
+
+    app = create_app(FileConfig)
+    with app.app_context():
+        with contextlib.redirect_stdout(io.StringIO()):
+            init_database()
+        db.session.remove()
+    service = ReadOnlyAPI(app)
+    yield app.test_client(), service
+    asyncio.run(service.engine.dispose())
+
+
+def _asgi_get(service, path, query_string='', method='GET'):
+    sent = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b''}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': query_string.encode(),
+             'headers': [(b'host', b'localhost')], 'scheme': 'http'}
+    asyncio.run(service(scope, receive, send))
+    start, body = sent
+    return start['status'], dict((k.decode(), v.decode()) for k, v in start['headers']), body['body']
+
+
+def test_matches_flask(services):
+    client, service = services
+    day = (date.today() + timedelta(days=1)).isoformat()
+    for path, query in [('/api/doctors', 'limit=2'),
+                        ('/api/doctors', 'ids=1,3,99&fields=id,full_name'),
+                        ('/api/doctors/2', ''),
+                        ('/api/doctors/1/free-slots', f'from={day}&to={day}')]:
+        expected = client.get(f'{path}?{query}')
+        status, headers, body = _asgi_get(service, path, query)
+        assert status == expected.status_code
+        assert json.loads(body) == expected.get_json()
+        if 'ETag' in expected.headers:
+            assert headers['etag'] == expected.headers['ETag']
+
+
+def test_read_only_and_unrouted(services):
+    _, service = services
+    assert _asgi_get(service, '/api/doctors', method='POST')[0] == 405
+    assert _asgi_get(service, '/api/patients')[0] == 404
+    assert _asgi_get(service, '/api/doctors/99')[0] == 404
@@ -0,0 +1,71 @@
+"""
+Weekly availability rules, date overrides and rule versioning
+"""
+from datetime import date, time, timedelta
+
+from extensions import db
+from models.doctor_availability import DoctorAvailability
+from models.doctor_availability_rule import DoctorAvailabilityRule
+from utils.scheduling import expand_availability
+
+TODAY = date.today()
+
+
+def _hours(doctor_id, day):
+    return [(block.start_time, block.end_time) for block in expand_availability([doctor_id], day, day)[doctor_id]]
+
+
+def _rules_form(changes):
+    form = {'form_type': 'rules'}
+    for weekday in range(7):
+        start, end = changes.get(weekday, ('09:00', '17:00'))
+        if start:
+            form.update({f'rule_available_{weekday}': 'on', f'rule_start_{weekday}': start,
+                         f'rule_end_{weekday}': end})
+    return form
+
+
+def test_overrides_replace_rules(app):
+    day = TODAY + timedelta(days=3)
+    assert _hours(1, day) == [(time(9, 0), time(17, 0))]
+
+    db.session.add_all([
+        DoctorAvailability(doctor_id=1, available_date=day, start_time=time(14, 0), end_time=time(16, 0)),
+        DoctorAvailability(doctor_id=1, available_date=day, start_time=time(8, 0), end_time=time(10, 0)),
+        DoctorAvailability(doctor_id=2, available_date=day, start_time=time(9, 0), end_time=time(17, 0),
+                           is_available=False),
+    ])
+    db.session.commit()
+    assert _hours(1, day) == [(time(8, 0), time(10, 0)), (time(14, 0), time(16, 0))]
+    assert _hours(2, day) == []
+    # Other dates still follow the weekly rules
+    assert _hours(1, day + timedelta(days=7)) == [(time(9, 0), time(17, 0))]
+
+
+def test_changed_hours_keep_past_dates(client, login):
+    past = TODAY - timedelta(days=7)
+    DoctorAvailabilityRule.query.filter_by(doctor_id=1).update({'effective_from': TODAY - timedelta(days=28)})
+    db.session.commit()
+
+    login(2)  # dr.sharma, doctor 1
+    changes = {TODAY.weekday(): ('10:00', '12:00'), (TODAY.weekday() + 1) % 7: (None, None)}
+    response = client.post('/doctor/availability', data=_rules_form(changes))
+    assert response.status_code == 302
+
+    # Past dates (and the appointments on them) keep the hours they had
+    assert _hours(1, past) == [(time(9, 0), time(17, 0))]
+    assert _hours(1, past + timedelta(days=1)) == [(time(9, 0), time(17, 0))]
+    assert _hours(1, TODAY) == [(time(10, 0), time(12, 0))]
+    assert _hours(1, TODAY + timedelta(days=1)) == []
+    assert _hours(1, TODAY + timedelta(days=2)) == [(time(9, 0), time(17, 0))]
+    assert DoctorAvailabilityRule.query.filter_by(doctor_id=1).count() == 8
+
+
+def test_rules_not_yet_in_effect_edited_in_place(client, login):
+    login(2)
+    client.post('/doctor/availability', data=_rules_form({TODAY.weekday(): ('10:00', '12:00')}))
+    client.post('/doctor/availability', data=_rules_form({TODAY.weekday(): ('11:00', '13:00')}))
+
+    # The seeded rules start today, so no history needs keeping
+    assert DoctorAvailabilityRule.query.filter_by(doctor_id=1).count() == 7
+    assert _hours(1, TODAY) == [(time(11, 0), time(13, 0))]
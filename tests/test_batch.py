@@ -0,0 +1,44 @@
+"""
+Batch endpoint running several API GETs in one round trip
+"""
+
+
+def _batch(client, paths):
+    return client.post('/api/batch', json={'requests': paths})
+
+
+def test_batch_results_in_order(client, login):
+    login(1)
+    response = _batch(client, ['/api/doctors/2?fields=id,full_name', '/api/doctors/99', '/api/stats'])
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['success'] is False
+    first, missing, stats = body['responses']
+    assert (first['path'], first['status']) == ('/api/doctors/2?fields=id,full_name', 200)
+    assert first['body']['data'] == {'id': 2, 'full_name': 'Dr. Priya Patel'}
+    assert first['headers']['ETag'].startswith('W/')
+    assert missing['status'] == 404
+    assert stats['status'] == 200 and stats['body']['success'] is True
+
+
+def test_sub_requests_use_caller_permissions(client, login):
+    login(2)  # a doctor: the admin-only endpoints answer 403
+    responses = _batch(client, ['/api/schedule/utilisation', '/api/doctors/1']).get_json()['responses']
+    assert [item['status'] for item in responses] == [403, 200]
+
+
+def test_rejected_paths(client, login):
+    login(1)
+    responses = _batch(client, ['/api/export/patients', '/api/batch', 'http://example.com/api/doctors',
+                                '/api/nowhere', '/api/events/appointments']).get_json()['responses']
+    assert [item['status'] for item in responses] == [400] * 5
+    assert responses[0]['body']['message'] == 'This endpoint cannot be batched'
+    assert responses[3]['body']['message'] == 'No GET endpoint at this path'
+
+
+def test_invalid_body(app, client, login):
+    login(1)
+    assert _batch(client, []).status_code == 400
+    assert client.post('/api/batch', json=['/api/doctors']).status_code == 400
+    too_many = ['/api/doctors'] * (app.config['BATCH_MAX_REQUESTS'] + 1)
+    assert _batch(client, too_many).status_code == 400
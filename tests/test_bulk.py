@@ -0,0 +1,94 @@
+"""
+Bulk create endpoints: per-item results with 201 / 207 / 400 overall
+"""
+from datetime import date, timedelta
+
+import pytest
+
+from extensions import db
+from models.appointment import Appointment
+from models.patient import Patient
+
+DAY = (date.today() + timedelta(days=1)).isoformat()
+
+
+@pytest.fixture
+def admin(login):
+    login(1)
+
+
+def _patient(name, **extra):
+    return {'username': name, 'email': f'{name}@example.com', 'password': 'secret',
+            'full_name': name.title(), 'contact_number': '555-0100', **extra}
+
+
+def _appointment(start, doctor_id=1, **extra):
+    return {'patient_id': 1, 'doctor_id': doctor_id, 'appointment_date': DAY,
+            'appointment_time': start, **extra}
+
+
+def test_patients_partial(client, admin):
+    before = Patient.query.count()
+    response = client.post('/api/patients/bulk', json=[
+        _patient('alice', date_of_birth='1990-04-01'),
+        _patient('patient1'),
+        _patient('bob', date_of_birth='01/04/1990'),
+        {'username': 'carol'},
+        _patient('dave', email='alice@example.com'),
+    ])
+    assert response.status_code == 207
+    body = response.get_json()
+    assert (body['created'], body['failed'], body['success']) == (1, 4, False)
+
+    results = body['results']
+    assert [result['index'] for result in results] == list(range(5))
+    assert results[0]['success'] and db.session.get(Patient, results[0]['id']).date_of_birth == date(1990, 4, 1)
+    assert results[1]['message'] == 'Username already exists'
+    assert results[2]['message'] == 'Invalid date_of_birth'
+    assert results[3]['message'].startswith('Missing required field')
+    assert results[4]['message'] == 'Email already registered'
+    assert Patient.query.count() == before + 1
+
+
+def test_patients_all_or_none(client, admin):
+    response = client.post('/api/patients/bulk', json={'items': [_patient('erin'), _patient('frank')]})
+    assert response.status_code == 201
+    assert response.get_json()['success'] is True
+
+    response = client.post('/api/patients/bulk', json=[_patient('erin')])
+    assert response.status_code == 400
+    assert response.get_json()['created'] == 0
+
+    assert client.post('/api/patients/bulk', json=[]).status_code == 400
+
+
+def test_appointments_partial(client, admin):
+    client.post('/api/appointments', json=_appointment('09:00'))
+    response = client.post('/api/appointments/bulk', json=[
+        _appointment('09:15'),
+        _appointment('10:00', duration_minutes=60),
+        _appointment('10:30', duration_minutes=15),
+        _appointment('16:45'),
+        _appointment('11:00', doctor_id=999),
+        _appointment('11:00', duration_minutes=0),
+        _appointment('11:00', doctor_id=2),
+    ])
+    assert response.status_code == 207
+    results = response.get_json()['results']
+    assert [result['success'] for result in results] == [False, True, False, False, False, False, True]
+    assert results[0]['message'] == 'Conflicts with existing appointment at 09:00'
+    # Items of one batch are checked against each other too
+    assert results[2]['message'] == 'Conflicts with existing appointment at 10:00'
+    assert results[3]['message'] == "Requested time is outside doctor's availability"
+    assert results[4]['message'] == 'Doctor not found'
+    assert results[5]['message'] == 'duration_minutes must be between 5 and 480'
+
+    created = db.session.get(Appointment, results[1]['id'])
+    assert (created.duration_minutes, created.status) == (60, 'Booked')
+    # Doctor 2 is Pediatrics, so the specialization default applies
+    assert db.session.get(Appointment, results[6]['id']).duration_minutes == 20
+
+
+def test_bulk_requires_admin(client, login):
+    login(2)  # dr.sharma
+    assert client.post('/api/appointments/bulk', json=[_appointment('09:00')]).status_code == 403
@@ -0,0 +1,70 @@
+"""
+Token-authenticated ICS feed: content, line folding and conditional GETs
+"""
+from datetime import date, time, timedelta
+
+import pytest
+
+from extensions import db
+from models.appointment import Appointment
+from models.doctor import Doctor
+from utils.calendar_feed import _line
+
+DAY = date.today() + timedelta(days=1)
+
+
+@pytest.fixture
+def feed_url(app):
+    doctor = db.session.get(Doctor, 1)
+    doctor.calendar_token = 'secret-token'
+    db.session.commit()
+    return '/doctor/calendar/secret-token.ics'
+
+
+def _book(start, minutes, status='Booked', reason=None):
+    appointment = Appointment(patient_id=1, doctor_id=1, appointment_date=DAY, appointment_time=start,
+                              duration_minutes=minutes, status=status, reason=reason)
+    db.session.add(appointment)
+    db.session.commit()
+    return appointment
+
+
+def test_feed_content(client, feed_url):
+    booked = _book(time(9, 0), 45, reason='Chest pain; follow-up, ECG')
+    canceled = _book(time(11, 0), 30, status='Canceled')
+
+    response = client.get(feed_url)
+    assert response.status_code == 200
+    assert response.mimetype == 'text/calendar'
+    body = response.get_data()
+    assert body.startswith(b'BEGIN:VCALENDAR\r\n') and body.endswith(b'END:VCALENDAR\r\n')
+    assert f'UID:appointment-{booked.id}@'.encode() in body
+    assert f'UID:appointment-{canceled.id}@'.encode() not in body
+    day = DAY.strftime('%Y%m%d')
+    assert f'DTSTART:{day}T090000\r\nDTEND:{day}T094500\r\n'.encode() in body
+    assert b'DESCRIPTION:Chest pain\\; follow-up\\, ECG\r\n' in body
+
+
+def test_conditional_get(client, feed_url):
+    booked = _book(time(9, 0), 30)
+    etag = client.get(feed_url).headers['ETag']
+
+    assert client.get(feed_url, headers={'If-None-Match': etag}).status_code == 304
+
+    # Cancelling removes a row without necessarily raising max(updated_at)
+    booked.status = 'Canceled'
+    db.session.commit()
+    response = client.get(feed_url, headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_unknown_token(client, feed_url):
+    assert client.get('/doctor/calendar/wrong.ics').status_code == 404
+
+
+def test_line_folding():
+    line = _line('DESCRIPTION', 'é' * 60)
+    parts = line.split(b'\r\n ')
+    assert all(len(part) <= 75 for part in parts)
+    assert b''.join(parts).decode('utf-8') == 'DESCRIPTION:' + 'é' * 60 + '\r\n'
@@ -0,0 +1,66 @@
+"""
+Response compression and precompressed static assets
+"""
+import gzip
+import zlib
+
+GZIP = {'Accept-Encoding': 'gzip'}
+
+
+def test_gzip_json(client):
+    plain = client.get('/api/doctors')
+    response = client.get('/api/doctors', headers=GZIP)
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert gzip.decompress(response.get_data()) == plain.get_data()
+    # The ETag is weak, so it stays valid for both encodings
+    assert response.headers['ETag'] == plain.headers['ETag']
+
+    etag = response.headers['ETag']
+    not_modified = client.get('/api/doctors', headers={**GZIP, 'If-None-Match': etag})
+    assert not_modified.status_code == 304
+    assert 'Content-Encoding' not in not_modified.headers
+
+
+def test_small_and_unaccepted_left_alone(client):
+    small = client.get('/api/doctors/1', query_string={'fields': 'id'}, headers=GZIP)
+    assert 'Content-Encoding' not in small.headers
+    assert small.get_json()['data'] == {'id': 1}
+
+    identity = client.get('/api/doctors', headers={'Accept-Encoding': 'identity'})
+    assert 'Content-Encoding' not in identity.headers
+
+
+def test_streamed_export(app, client, login):
+    app.config['EXPORT_BATCH_SIZE'] = 2
+    login(1)
+    plain = client.get('/api/export/patients').get_data()
+    response = client.get('/api/export/patients', headers=GZIP)
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Length' not in response.headers
+
+    # Each batch is sync-flushed, so every chunk decodes on its own
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    decoded = [decompressor.decompress(chunk) for chunk in response.response]
+    assert all(chunk.endswith(b'\n') for chunk in decoded if chunk)
+    assert b''.join(decoded) + decompressor.flush() == plain
+
+
+def test_precompressed_asset(app, client, tmp_path):
+    dist = tmp_path / 'dist' / 'css'
+    dist.mkdir(parents=True)
+    (dist / 'style.0123456789ab.css').write_bytes(b'body { color: red; }')
+    (dist / 'style.0123456789ab.css.gz').write_bytes(gzip.compress(b'body { color: red; }'))
+    app.static_folder = str(tmp_path)
+
+    response = client.get('/assets/css/style.0123456789ab.css', headers=GZIP)
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.mimetype == 'text/css'
+    assert 'immutable' in response.headers['Cache-Control']
+    assert gzip.decompress(response.get_data()) == b'body { color: red; }'
+    response.close()
+
+    response = client.get('/assets/css/style.0123456789ab.css')
+    assert 'Content-Encoding' not in response.headers
+    assert response.get_data() == b'body { color: red; }'
+    response.close()
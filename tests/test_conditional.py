@@ -0,0 +1,44 @@
+"""
+Weak ETags and If-None-Match on API resource GETs
+"""
+from extensions import db
+from models.doctor import Doctor
+from models.user import User
+
+
+def _etag(response):
+    assert response.status_code == 200
+    return response.headers['ETag']
+
+
+def test_not_modified(client):
+    etag = _etag(client.get('/api/doctors/1'))
+    assert etag.startswith('W/"')
+
+    response = client.get('/api/doctors/1', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.get_data() == b''
+    assert response.headers['ETag'] == etag
+
+
+def test_changes_invalidate(client):
+    etag = _etag(client.get('/api/doctors'))
+
+    doctor = db.session.get(Doctor, 2)
+    doctor.is_active = False
+    db.session.commit()
+    etag_after_update = _etag(client.get('/api/doctors', headers={'If-None-Match': etag}))
+
+    # Embedded rows count too: the doctor's email lives on the user
+    user = db.session.get(User, db.session.get(Doctor, 3).user_id)
+    user.email = 'new-address@example.com'
+    db.session.commit()
+    assert _etag(client.get('/api/doctors', headers={'If-None-Match': etag_after_update})) != etag_after_update
+
+
+def test_each_representation_has_its_own_etag(client):
+    full = _etag(client.get('/api/doctors/1'))
+    narrowed = _etag(client.get('/api/doctors/1', query_string={'fields': 'id'}))
+    assert full != narrowed
+    response = client.get('/api/doctors/1', query_string={'fields': 'id'}, headers={'If-None-Match': full})
+    assert response.status_code == 200
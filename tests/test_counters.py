@@ -0,0 +1,62 @@
+"""
+Maintained stat counters must always equal a full recount
+"""
+from datetime import date, time, timedelta
+
+from extensions import db
+from models.appointment import Appointment
+from models.doctor import Doctor
+from models.stat_counter import StatCounter
+from utils.counters import RECONCILED_KEY, _computed_counters, read_counters
+
+
+def _assert_counters_match():
+    stored = {key: value for key, value in db.session.query(StatCounter.key, StatCounter.value)
+              if value and key != RECONCILED_KEY}
+    expected = {key: value for key, value in _computed_counters().items() if value}
+    assert stored == expected
+
+
+def _book():
+    appointment = Appointment(patient_id=1, doctor_id=1, appointment_date=date.today() + timedelta(days=1),
+                              appointment_time=time(9, 0), status='Booked')
+    db.session.add(appointment)
+    db.session.commit()
+    return appointment
+
+
+def test_update_of_expired_columns(app):
+    read_counters(['appointments'])
+    appointment = _book()
+
+    # Attributes are expired after commit, so the old status was never loaded
+    appointment.status = 'Canceled'
+    appointment.doctor_id = 2
+    db.session.commit()
+    _assert_counters_match()
+
+    doctor = db.session.get(Doctor, 3)
+    db.session.commit()
+    doctor.is_active = False
+    db.session.commit()
+    _assert_counters_match()
+
+
+def test_delete_of_expired_row(app):
+    read_counters(['appointments'])
+    appointment = _book()
+
+    db.session.delete(appointment)
+    db.session.commit()
+    _assert_counters_match()
+
+
+def test_update_of_loaded_columns(app):
+    read_counters(['appointments'])
+    appointment = _book()
+
+    assert appointment.status == 'Booked'
+    appointment.status = 'Completed'
+    appointment.is_deleted = True
+    db.session.commit()
+    _assert_counters_match()
@@ -0,0 +1,63 @@
+"""
+Earliest open slots across doctors (k-way merge of per-doctor streams)
+"""
+from datetime import date, datetime, time, timedelta
+
+from extensions import db
+from models.appointment import Appointment
+from models.doctor import Doctor
+from models.doctor_availability_rule import DoctorAvailabilityRule
+from utils.scheduling import find_earliest_slots
+
+DAY = date.today() + timedelta(days=1)
+NOW = datetime.combine(DAY, time(0, 0))
+
+
+def _slots(result):
+    return [(doctor.id, slot_date, start.strftime('%H:%M')) for doctor, slot_date, start, _ in result]
+
+
+def test_merge_across_doctors(app):
+    # Every doctor opens at 9:00; then the shortest visit lengths come next
+    result = find_earliest_slots(start_date=DAY, end_date=DAY, limit=4, not_before=NOW)
+    assert [start for _, _, start in _slots(result)] == ['09:00'] * 4
+    assert sorted(doctor_id for doctor_id, _, _ in _slots(result)) == [1, 2, 3, 4]
+
+    result = find_earliest_slots(start_date=DAY, end_date=DAY, limit=6, not_before=NOW)
+    assert _slots(result)[4:] == [(4, DAY, '09:10'), (2, DAY, '09:20')]
+
+
+def test_specialization_and_bookings(app):
+    db.session.add(Appointment(patient_id=1, doctor_id=3, appointment_date=DAY,
+                               appointment_time=time(9, 0), duration_minutes=45, status='Booked'))
+    db.session.commit()
+
+    result = find_earliest_slots('ortho', start_date=DAY, end_date=DAY, limit=2, not_before=NOW)
+    assert _slots(result) == [(3, DAY, '09:45'), (3, DAY, '10:30')]
+    assert result[0][3] == time(10, 30)
+
+
+def test_colleague_fills_in(app):
+    # A second cardiologist who also works 8:00-9:00 on that weekday comes first
+    doctor = Doctor(user_id=1, full_name='Dr. Early', specialization='Cardiology',
+                    qualification='MD', experience_years=1, contact_number='555-0101',
+                    consultation_fee=100)
+    db.session.add(doctor)
+    db.session.flush()
+    db.session.add(DoctorAvailabilityRule(doctor_id=doctor.id, weekday=DAY.weekday(),
+                                          start_time=time(8, 0), end_time=time(9, 0),
+                                          effective_from=date.today()))
+    db.session.commit()
+
+    result = find_earliest_slots('cardio', start_date=DAY, end_date=DAY, limit=3, not_before=NOW)
+    assert _slots(result) == [(doctor.id, DAY, '08:00'), (doctor.id, DAY, '08:30'), (1, DAY, '09:00')]
+
+
+def test_endpoint(client, login):
+    login(1)
+    query = {'specialization': 'derm', 'from': DAY.isoformat(), 'to': DAY.isoformat(), 'limit': 2}
+    body = client.get('/api/doctors/earliest-slots', query_string=query).get_json()
+    assert [(item['doctor_id'], item['start_time'], item['end_time']) for item in body['data']] == [
+        (4, '09:00', '09:10'), (4, '09:10', '09:20')
+    ]
+    assert client.get('/api/doctors/earliest-slots', query_string={'duration': 500}).status_code == 400
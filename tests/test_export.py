@@ -0,0 +1,68 @@
+"""
+Streaming NDJSON export
+"""
+import json
+from datetime import date, datetime, time, timedelta
+
+import pytest
+
+from extensions import db
+from models.appointment import Appointment
+from models.patient import Patient
+from utils.export import iter_ndjson
+
+
+@pytest.fixture
+def admin(login):
+    login(1)
+
+
+def _lines(response):
+    return [json.loads(line) for line in response.get_data().splitlines()]
+
+
+def test_export_rows(client, admin):
+    patient = db.session.get(Patient, 2)
+    patient.is_deleted = True
+    db.session.commit()
+
+    response = client.get('/api/export/patients')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    assert datetime.fromisoformat(response.headers['X-Export-Watermark'])
+
+    rows = _lines(response)
+    assert [row['id'] for row in rows] == sorted(row['id'] for row in rows)
+    assert len(rows) == Patient.query.count()
+    deleted = next(row for row in rows if row['id'] == 2)
+    assert deleted['is_deleted'] is True and deleted['full_name'] == patient.full_name
+
+
+def test_export_fields_and_window(client, admin):
+    appointment = Appointment(patient_id=1, doctor_id=1, appointment_date=date.today() + timedelta(days=1),
+                              appointment_time=time(9, 30), status='Booked')
+    db.session.add(appointment)
+    db.session.commit()
+
+    since = (appointment.updated_at - timedelta(seconds=1)).isoformat()
+    response = client.get('/api/export/appointments',
+                          query_string={'fields': 'status,id,appointment_time', 'updated_since': since})
+    assert _lines(response) == [{'id': appointment.id, 'appointment_time': '09:30:00', 'status': 'Booked'}]
+
+    response = client.get('/api/export/appointments', query_string={'updated_before': since})
+    assert appointment.id not in [row['id'] for row in _lines(response)]
+
+    assert client.get('/api/export/appointments', query_string={'fields': 'secret'}).status_code == 400
+    assert client.get('/api/export/appointments', query_string={'updated_since': 'yesterday'}).status_code == 400
+    assert client.get('/api/export/users').status_code == 404
+
+
+def test_batches(app):
+    chunks = list(iter_ndjson(Patient, batch_size=2))
+    assert len(chunks) == -(-Patient.query.count() // 2)
+    assert all(chunk.endswith(b'\n') for chunk in chunks)
+
+
+def test_export_requires_admin(client, login):
+    login(2)
+    assert client.get('/api/export/patients').status_code == 403
@@ -0,0 +1,70 @@
+"""
+Server-side free slots: the sorted sweep and its cached endpoint
+"""
+from datetime import date, datetime, time, timedelta
+
+from extensions import db
+from models.appointment import Appointment
+from models.doctor_availability import DoctorAvailability
+from utils.scheduling import compute_free_slots
+
+DAY = date.today() + timedelta(days=1)
+NOW = datetime.combine(DAY, time(0, 0))
+
+
+def _book(start, minutes, doctor_id=1, status='Booked'):
+    appointment = Appointment(patient_id=1, doctor_id=doctor_id, appointment_date=DAY,
+                              appointment_time=start, duration_minutes=minutes, status=status)
+    db.session.add(appointment)
+    db.session.commit()
+    return appointment
+
+
+def _starts(slots):
+    return [slot_start.strftime('%H:%M') for _, slot_start, _ in slots]
+
+
+def test_sweep_skips_past_mixed_length_bookings(app):
+    db.session.add(DoctorAvailability(doctor_id=1, available_date=DAY,
+                                      start_time=time(9, 0), end_time=time(12, 0)))
+    db.session.commit()
+    _book(time(9, 30), 45)
+    _book(time(11, 0), 10)
+    _book(time(9, 0), 30, status='Canceled')
+
+    slots = compute_free_slots(1, DAY, DAY, 30, not_before=NOW)
+    # The cursor jumps to 10:15 after the 45-minute visit and to 11:10 after the short one
+    assert _starts(slots) == ['09:00', '10:15', '11:10']
+    assert slots[0] == (DAY, time(9, 0), time(9, 30))
+
+    later = compute_free_slots(1, DAY, DAY, 30, not_before=datetime.combine(DAY, time(10, 0)))
+    assert _starts(later) == ['10:15', '11:10']
+
+
+def test_default_duration_is_visit_length(app):
+    # Doctor 4 is Dermatology (10-minute visits), open 9:00-17:00
+    slots = compute_free_slots(4, DAY, DAY, not_before=NOW)
+    assert len(slots) == 48
+    assert slots[1] == (DAY, time(9, 10), time(9, 20))
+
+
+def test_endpoint_reflects_new_bookings(client, login):
+    query = {'from': DAY.isoformat(), 'to': DAY.isoformat(), 'duration': 60}
+    body = client.get('/api/doctors/1/free-slots', query_string=query).get_json()
+    assert body['count'] == 8
+    assert body['data'][0]['slots'][:2] == ['09:00', '10:00']
+
+    login(1)
+    client.post('/api/appointments', json={'patient_id': 1, 'doctor_id': 1, 'appointment_date': DAY.isoformat(),
+                                           'appointment_time': '09:00'})
+    # The cached window is invalidated when the booking commits
+    body = client.get('/api/doctors/1/free-slots', query_string=query).get_json()
+    assert body['data'][0]['slots'][:2] == ['09:30', '10:30']
+
+
+def test_endpoint_validation(client):
+    assert client.get('/api/doctors/999/free-slots').status_code == 404
+    assert client.get('/api/doctors/1/free-slots', query_string={'from': 'tomorrow'}).status_code == 400
+    assert client.get('/api/doctors/1/free-slots', query_string={'duration': 1}).status_code == 400
+    query = {'from': DAY.isoformat(), 'to': (DAY - timedelta(days=1)).isoformat()}
+    assert client.get('/api/doctors/1/free-slots', query_string=query).status_code == 400
@@ -0,0 +1,48 @@
+"""
+JSON provider: the orjson fast path and the stdlib fallback agree
+"""
+import json
+from datetime import date, datetime, time
+
+import pytest
+from sqlalchemy import literal, select
+
+from extensions import db
+from utils import json_provider
+
+
+@pytest.fixture(params=['orjson', 'stdlib'])
+def provider(app, request, monkeypatch):
+    if request.param == 'stdlib':
+        monkeypatch.setattr(json_provider, 'orjson', None)
+    elif json_provider.orjson is None:
+        pytest.skip('orjson is not installed')
+    return app.json
+
+
+def test_values(provider):
+    row = db.session.execute(select(literal(7).label('id'), literal('Booked').label('status'))).one()
+    payload = {
+        'date': date(2026, 3, 1),
+        'time': time(9, 30),
+        'datetime': datetime(2026, 3, 1, 9, 30, 15),
+        'row': row,
+        'rows': [row],
+    }
+    decoded = json.loads(provider.dumps(payload))
+    assert decoded['date'] == '2026-03-01'
+    assert decoded['time'] == '09:30:00'
+    assert decoded['datetime'].startswith('2026-03-01')
+    assert decoded['row'] == decoded['rows'][0] == {'id': 7, 'status': 'Booked'}
+    assert provider.dumps({2: 'b', 1: 'a'}, separators=(',', ':')) == '{"1":"a","2":"b"}'
+    assert provider.loads(provider.dumpb({'a': 1})) == {'a': 1}
+
+
+def test_response(provider, app):
+    response = provider.response({'b': 1, 'a': [date(2026, 3, 1)]})
+    assert response.mimetype == 'application/json'
+    assert response.get_data() == b'{"a":["2026-03-01"],"b":1}\n'
+
+
+def test_unsupported_kwargs_fall_back(provider):
+    assert provider.dumps({'a': 1}, indent=4) == '{\n    "a": 1\n}'
@@ -0,0 +1,82 @@
+"""
+Live events: published on commit, dropped on rollback, streamed as SSE
+"""
+import json
+from datetime import date, time, timedelta
+
+from extensions import db
+from models.appointment import Appointment
+from utils.live_events import live_events
+
+
+def _messages(subscription):
+    messages = []
+    while True:
+        message = subscription.get(timeout=0)
+        if message is None:
+            return messages
+        messages.append(message)
+
+
+def _data(message):
+    event_line, data_line = message.strip().split('\n')
+    return event_line.split(': ', 1)[1], json.loads(data_line.split(': ', 1)[1])
+
+
+def _appointment(doctor_id=1):
+    return Appointment(patient_id=1, doctor_id=doctor_id, appointment_date=date.today() + timedelta(days=1),
+                       appointment_time=time(9, 0), status='Booked')
+
+
+def test_published_after_commit(app):
+    doctor_channel = live_events.broker.subscribe(['doctor:1'])
+    other_doctor = live_events.broker.subscribe(['doctor:2'])
+
+    appointment = _appointment()
+    db.session.add(appointment)
+    db.session.flush()
+    assert _messages(doctor_channel) == []
+    db.session.commit()
+
+    [message] = _messages(doctor_channel)
+    event_type, data = _data(message)
+    assert event_type == 'appointment'
+    assert (data['id'], data['action'], data['appointment_time']) == (appointment.id, 'created', '09:00')
+
+    # Moving to another doctor notifies both
+    appointment.doctor_id = 2
+    db.session.commit()
+    assert _data(_messages(doctor_channel)[0])[1]['action'] == 'updated'
+    assert _data(_messages(other_doctor)[0])[1]['doctor_id'] == 2
+
+
+def test_dropped_on_rollback(app):
+    subscription = live_events.broker.subscribe(['appointments'])
+    db.session.add(_appointment())
+    db.session.flush()
+    db.session.rollback()
+    db.session.commit()
+    assert _messages(subscription) == []
+
+
+def test_stream_frames(app):
+    stream = live_events.stream(['appointments'], heartbeat=0.01, lifetime=0.2)
+    assert next(stream) == 'retry: 3000\n\n'
+    live_events.publish(['appointments'], 'appointment', {'id': 1})
+    assert next(stream) == 'event: appointment\ndata: {"id":1}\n\n'
+    assert next(stream) == ': keep-alive\n\n'
+    stream.close()
+    # Closing the stream unsubscribes it
+    assert live_events.broker._subscribers['appointments'] == set()
+
+
+def test_endpoint_access(app, client, login):
+    app.config['LIVE_EVENTS_STREAM_SECONDS'] = 0.1
+    login(2)  # dr.sharma, doctor 1
+    response = client.get('/api/events/doctors/1')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    assert response.get_data(as_text=True).startswith('retry: 3000\n\n')
+
+    assert client.get('/api/events/doctors/2').status_code == 403
+    assert client.get('/api/events/appointments').status_code == 403
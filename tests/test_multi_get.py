@@ -0,0 +1,40 @@
+"""
+Multi-get via ?ids= on list endpoints
+"""
+from extensions import db
+from models.doctor import Doctor
+
+
+def test_doctors_by_id(client):
+    doctor = db.session.get(Doctor, 3)
+    doctor.is_deleted = True
+    db.session.commit()
+
+    response = client.get('/api/doctors', query_string={'ids': '2,1,3,99,2', 'fields': 'id,full_name'})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['count'] == 2
+    assert body['data'] == {'1': {'id': 1, 'full_name': 'Dr. Rajesh Sharma'},
+                            '2': {'id': 2, 'full_name': 'Dr. Priya Patel'}}
+    # Requested order, duplicates dropped, soft-deleted rows count as missing
+    assert body['missing'] == [3, 99]
+
+    etag = response.headers['ETag']
+    response = client.get('/api/doctors', query_string={'ids': '2,1,3,99,2', 'fields': 'id,full_name'},
+                          headers={'If-None-Match': etag})
+    assert response.status_code == 304
+
+
+def test_patients_and_appointments_by_id(client, login):
+    login(1)
+    body = client.get('/api/patients', query_string={'ids': '1'}).get_json()
+    assert list(body['data']) == ['1'] and body['missing'] == []
+    body = client.get('/api/appointments', query_string={'ids': '5'}).get_json()
+    assert body['data'] == {} and body['missing'] == [5]
+
+
+def test_invalid_ids(client):
+    assert client.get('/api/doctors', query_string={'ids': '1,two'}).status_code == 400
+    assert client.get('/api/doctors', query_string={'ids': ','}).status_code == 400
+    too_many = ','.join(str(i) for i in range(1, 502))
+    assert client.get('/api/doctors', query_string={'ids': too_many}).status_code == 400
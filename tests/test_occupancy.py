@@ -0,0 +1,66 @@
+"""
+Occupancy bitmaps: first fit, free slots and utilisation
+"""
+from datetime import date, datetime, time, timedelta
+
+from extensions import db
+from models.appointment import Appointment
+from utils.occupancy import build_occupancy
+
+DAY = date.today() + timedelta(days=1)
+NOW = datetime.combine(DAY, time(0, 0))
+
+
+def _at(hour, minute=0):
+    return datetime.combine(DAY, time(hour, minute))
+
+
+def _book(doctor_id, start, minutes, status='Booked'):
+    db.session.add(Appointment(patient_id=1, doctor_id=doctor_id, appointment_date=DAY,
+                               appointment_time=start, duration_minutes=minutes, status=status))
+    db.session.commit()
+
+
+def test_first_fit_per_doctor_lengths(app):
+    _book(1, time(9, 0), 60)
+    _book(2, time(9, 0), 20)
+    _book(2, time(9, 30), 30)
+    _book(3, time(9, 0), 30, status='Canceled')
+
+    grid = build_occupancy([1, 2, 3], DAY, DAY)
+    # Doctor 2 has a 10-minute gap at 9:20, too short for a 20-minute visit
+    hits = grid.first_fit({1: 30, 2: 20, 3: 45}, limit=3, not_before=NOW)
+    assert hits == [(_at(9), 3), (_at(10), 1), (_at(10), 2)]
+    assert grid.first_fit({1: 30, 2: 10, 3: 45}, limit=3, not_before=NOW)[1] == (_at(9, 20), 2)
+    assert grid.first_fit(30, limit=1, not_before=_at(9, 1)) == [(_at(9, 5), 3)]
+
+
+def test_holds_block_slots_but_are_not_booked(app):
+    _book(1, time(9, 0), 30)
+    grid = build_occupancy([1], DAY, DAY, held={1: [(_at(9, 30), _at(10))]})
+
+    assert grid.free_slots(1, 30, not_before=NOW)[:2] == [_at(10), _at(10, 30)]
+    assert grid.utilisation()[1] == {'available_minutes': 480, 'booked_minutes': 30, 'utilisation': 0.0625}
+
+
+def test_free_slots_round_outward(app):
+    # A 7-minute visit makes the whole 9:05-9:10 cell busy
+    _book(1, time(9, 0), 7)
+    grid = build_occupancy([1], DAY, DAY)
+    assert grid.free_slots(1, 10, step=5, not_before=NOW)[:2] == [_at(9, 10), _at(9, 15)]
+
+
+def test_endpoints(client, login):
+    login(1)
+    query = {'from': DAY.isoformat(), 'to': DAY.isoformat()}
+    body = client.get('/api/schedule/first-fit', query_string=dict(query, specialization='derm')).get_json()
+    assert body['duration'] is None
+    assert body['data'] == [{'doctor_id': 4, 'date': DAY.isoformat(), 'start_time': '09:00',
+                             'end_time': '09:10', 'duration_minutes': 10}]
+
+    body = client.get('/api/schedule/utilisation', query_string=query).get_json()
+    assert body['data']['1']['available_minutes'] == 480
+
+    assert client.get('/api/schedule/first-fit', query_string={'duration': 0}).status_code == 400
+    login(2)
+    assert client.get('/api/schedule/utilisation').status_code == 403
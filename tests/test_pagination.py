@@ -0,0 +1,58 @@
+"""
+Keyset cursor pagination: tokens round-trip and pages tile the list exactly
+"""
+from datetime import date, datetime, time, timedelta
+
+import pytest
+
+from extensions import db
+from models.appointment import Appointment
+from utils.pagination import decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip(app):
+    columns = [Appointment.appointment_date, Appointment.appointment_time, Appointment.id]
+    values = [date(2026, 3, 1), time(9, 30), 42]
+    token = encode_cursor(values)
+    assert '=' not in token
+    assert decode_cursor(token, columns) == values
+
+    updated = [datetime(2026, 3, 1, 9, 30, 15, 250), 7]
+    assert decode_cursor(encode_cursor(updated), [Appointment.updated_at, Appointment.id]) == updated
+
+
+@pytest.mark.parametrize('token', ['not-a-cursor', encode_cursor([1, 2]), encode_cursor(['x', '09:00', 1])])
+def test_invalid_cursor(app, token):
+    columns = [Appointment.appointment_date, Appointment.appointment_time, Appointment.id]
+    with pytest.raises(ValueError):
+        decode_cursor(token, columns)
+
+
+def test_pages_cover_list(client, login):
+    login(1)
+    day = date.today() + timedelta(days=1)
+    # Same date and time for different doctors, so the id tie-break matters
+    for doctor_id in (1, 2, 3):
+        for hour in (9, 10, 11):
+            db.session.add(Appointment(patient_id=1, doctor_id=doctor_id, appointment_date=day,
+                                       appointment_time=time(hour, 0), status='Booked'))
+    db.session.commit()
+
+    seen, after = [], None
+    while True:
+        response = client.get('/api/appointments', query_string={'limit': 4, 'after': after or ''})
+        assert response.status_code == 200
+        body = response.get_json()
+        assert body['count'] <= 4
+        seen.extend(item['id'] for item in body['data'])
+        after = body['next_cursor']
+        if after is None:
+            break
+        assert f'after={after}' in body['next']
+
+    expected = [a.id for a in Appointment.query.order_by(
+        Appointment.appointment_date, Appointment.appointment_time, Appointment.id)]
+    assert seen == expected
+
+    response = client.get('/api/appointments', query_string={'after': 'bogus'})
+    assert response.status_code == 400
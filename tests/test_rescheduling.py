@@ -0,0 +1,78 @@
+"""
+Bulk rescheduling of stranded appointments and the interval index behind it
+"""
+from datetime import date, datetime, time, timedelta
+
+from extensions import db
+from models.appointment import Appointment
+from models.doctor_availability import DoctorAvailability
+from utils.intervals import IntervalTree
+from utils.rescheduling import bulk_reschedule, find_stranded_appointments
+
+DAY = date.today() + timedelta(days=1)
+NOW = datetime.combine(DAY, time(0, 0))
+
+
+def _at(hour, minute=0):
+    return datetime.combine(DAY, time(hour, minute))
+
+
+def _book(start, minutes, doctor_id=1):
+    appointment = Appointment(patient_id=1, doctor_id=doctor_id, appointment_date=DAY,
+                              appointment_time=start, duration_minutes=minutes, status='Booked')
+    db.session.add(appointment)
+    db.session.commit()
+    return appointment
+
+
+def _override(start, end, is_available=True):
+    db.session.add(DoctorAvailability(doctor_id=1, available_date=DAY, start_time=start,
+                                      end_time=end, is_available=is_available))
+    db.session.commit()
+
+
+def test_interval_tree():
+    tree = IntervalTree([(_at(9), _at(9, 45), 'a'), (_at(10), _at(10, 30), 'b')])
+    assert len(tree) == 2
+    assert tree.overlap(_at(9, 30), _at(10)) == (_at(9), _at(9, 45), 'a')
+    assert tree.overlap(_at(9, 45), _at(10)) is None  # half-open: touching is fine
+    assert tree.overlap(_at(8), _at(11))[2] == 'a'  # earliest overlap wins
+
+    # Same start, different keys
+    tree.insert(_at(10), _at(11), 'c')
+    assert tree.remove(_at(10), 'b')
+    assert not tree.remove(_at(10), 'b')
+    assert tree.overlap(_at(10, 45), _at(11))[2] == 'c'
+    assert len(tree) == 2
+
+
+def test_moves_to_nearest_free_slots(app):
+    early = _book(time(9, 0), 45)
+    next_one = _book(time(9, 45), 30)
+    kept = _book(time(14, 0), 30)
+    _override(time(12, 0), time(17, 0))
+
+    assert find_stranded_appointments(1, NOW) == [early, next_one]
+
+    moves, unplaced = bulk_reschedule(1, now=NOW)
+    assert unplaced == []
+    assert [(move.appointment_id, move.old_time, move.new_doctor_id, move.new_date) for move in moves] == [
+        (early.id, time(9, 0), 1, DAY), (next_one.id, time(9, 45), 1, DAY)
+    ]
+    db.session.commit()
+
+    # The 45-minute visit took 12:00, so the next one cannot start before 12:45
+    assert early.appointment_time == time(12, 0)
+    assert next_one.appointment_time >= time(12, 45)
+    assert next_one.appointment_time != kept.appointment_time
+    assert find_stranded_appointments(1, NOW) == []
+
+
+def test_unplaced_when_nothing_fits(app):
+    stranded = _book(time(9, 0), 30)
+    _override(time(9, 0), time(17, 0), is_available=False)
+
+    moves, unplaced = bulk_reschedule(1, now=NOW, search_days=0)
+    assert moves == []
+    assert unplaced == [stranded]
+    assert stranded.appointment_time == time(9, 0)
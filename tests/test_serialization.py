@@ -0,0 +1,61 @@
+"""
+Serializer layer: list endpoints issue a fixed number of queries
+"""
+from contextlib import contextmanager
+from datetime import date, time, timedelta
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.exc import InvalidRequestError
+
+from extensions import db
+from models.appointment import Appointment
+from routes.api import serialize_appointment
+
+
+@contextmanager
+def _count_selects():
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+
+def _book_many(count, days_ahead=1):
+    day = date.today() + timedelta(days=days_ahead)
+    for i in range(count):
+        db.session.add(Appointment(patient_id=1 + i % 3, doctor_id=1 + i % 4, appointment_date=day,
+                                   appointment_time=time(9 + i // 4, 0), status='Booked'))
+    db.session.commit()
+
+
+def _list_selects(client, count, days_ahead):
+    _book_many(count, days_ahead)
+    with _count_selects() as statements:
+        response = client.get('/api/appointments')
+    assert response.status_code == 200
+    assert len(response.get_json()['data']) >= count
+    return len(statements)
+
+
+def test_appointment_list_query_count(client, login):
+    login(1)
+    few = _list_selects(client, 4, days_ahead=1)
+    assert _list_selects(client, 20, days_ahead=2) == few
+
+
+def test_undeclared_access_raises(app):
+    _book_many(1)
+    narrowed = serialize_appointment.only(['id', 'status'])
+    appointment = narrowed.eager(Appointment.query).first()
+    assert narrowed(appointment) == {'id': appointment.id, 'status': 'Booked'}
+    # TESTING turns reads the serializer did not declare into errors
+    with pytest.raises(InvalidRequestError):
+        appointment.patient
@@ -0,0 +1,80 @@
+"""
+Single-statement slot validation (utils.helpers.check_slot)
+"""
+from datetime import date, time, timedelta
+
+from sqlalchemy import select
+from sqlalchemy.dialects import mysql, postgresql
+
+from extensions import db
+from models.appointment import Appointment
+from models.doctor_availability import DoctorAvailability
+from utils.helpers import check_slot
+from utils.sql import time_add_minutes
+
+DAY = date.today() + timedelta(days=1)
+
+
+def _book(start, minutes, doctor_id=1, status='Booked'):
+    appointment = Appointment(patient_id=1, doctor_id=doctor_id, appointment_date=DAY,
+                              appointment_time=start, duration_minutes=minutes, status=status)
+    db.session.add(appointment)
+    db.session.commit()
+    return appointment
+
+
+def test_overlapping_mixed_length_bookings_rejected(app):
+    long_visit = _book(time(9, 0), 45)
+    _book(time(11, 0), 30)
+
+    # Different start times, overlapping intervals
+    slot = check_slot(1, DAY, time(9, 30), slot_minutes=30)
+    assert not slot.available
+    assert slot.conflict_id == long_visit.id
+    assert slot.message == 'Conflicts with existing appointment at 09:00'
+    assert not check_slot(1, DAY, time(10, 30), slot_minutes=45).available
+
+    # Touching intervals do not overlap
+    assert check_slot(1, DAY, time(9, 45), slot_minutes=30).available
+    assert check_slot(1, DAY, time(10, 30), slot_minutes=30).available
+
+
+def test_cancelled_and_excluded_appointments_ignored(app):
+    cancelled = _book(time(9, 0), 30, status='Canceled')
+    assert check_slot(1, DAY, time(9, 0), slot_minutes=30).available
+
+    cancelled.status = 'Booked'
+    db.session.commit()
+    assert not check_slot(1, DAY, time(9, 0), slot_minutes=30).available
+    assert check_slot(1, DAY, time(9, 0), slot_minutes=30,
+                      exclude_appointment_id=cancelled.id).available
+
+
+def test_availability_rules_and_overrides(app):
+    assert check_slot(1, DAY, time(16, 30), slot_minutes=30).available
+    slot = check_slot(1, DAY, time(16, 45), slot_minutes=30)
+    assert slot.message == "Requested time is outside doctor's availability"
+    assert not check_slot(1, DAY, time(23, 45), slot_minutes=30).available
+
+    # An override replaces the weekly rules for its date
+    db.session.add(DoctorAvailability(doctor_id=1, available_date=DAY,
+                                      start_time=time(13, 0), end_time=time(15, 0)))
+    db.session.commit()
+    assert not check_slot(1, DAY, time(9, 0), slot_minutes=30).available
+    assert check_slot(1, DAY, time(14, 0), slot_minutes=60).available
+
+    db.session.add(DoctorAvailability(doctor_id=2, available_date=DAY, start_time=time(9, 0),
+                                      end_time=time(17, 0), is_available=False))
+    db.session.commit()
+    assert check_slot(2, DAY, time(9, 0)).message == 'Doctor not available on this date'
+
+
+def test_time_add_minutes(app):
+    _book(time(9, 50), 45)
+    end = db.session.scalar(select(time_add_minutes(Appointment.appointment_time,
+                                                    Appointment.duration_minutes)))
+    assert end == time(10, 35)
+
+    expression = time_add_minutes(Appointment.appointment_time, Appointment.duration_minutes)
+    assert "INTERVAL '1 minute'" in str(expression.compile(dialect=postgresql.dialect()))
+    assert 'ADDTIME' in str(expression.compile(dialect=mysql.dialect()))
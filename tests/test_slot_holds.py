@@ -0,0 +1,71 @@
+"""
+Slot holds: one holder per slot until released or expired
+"""
+from datetime import date, time, timedelta
+
+import pytest
+
+from utils import slot_holds as slot_holds_module
+from utils.slot_holds import slot_holds
+
+DAY = date.today() + timedelta(days=1)
+SLOT = {'doctor_id': 1, 'date': DAY.isoformat(), 'time': '09:00'}
+
+
+def _free_times(client):
+    response = client.get('/api/doctors/1/free-slots',
+                          query_string={'from': DAY.isoformat(), 'to': DAY.isoformat()})
+    return response.get_json()['data'][0]['slots']
+
+
+def test_hold_contention(client, login):
+    login(6)
+    response = client.post('/api/slots/hold', json=SLOT)
+    assert response.status_code == 200
+    assert response.get_json()['data']['time'] == '09:00'
+    # Holding again refreshes the caller's own hold
+    assert client.post('/api/slots/hold', json=SLOT).status_code == 200
+
+    login(7)
+    response = client.post('/api/slots/hold', json=SLOT)
+    assert response.status_code == 409
+    assert response.get_json()['message'].startswith('Another patient is booking this slot')
+    # Releasing someone else's hold is a no-op
+    client.delete('/api/slots/hold', json=SLOT)
+    assert client.post('/api/slots/hold', json=SLOT).status_code == 409
+
+    login(6)
+    assert client.delete('/api/slots/hold', json=SLOT).status_code == 200
+    login(7)
+    assert client.post('/api/slots/hold', json=SLOT).status_code == 200
+
+
+def test_held_slot_hidden_from_others(client, login):
+    login(6)
+    client.post('/api/slots/hold', json=SLOT)
+    # The holder still sees the slot it is booking
+    assert '09:00' in _free_times(client)
+
+    login(7)
+    times = _free_times(client)
+    assert '09:00' not in times and '09:30' in times
+
+
+def test_hold_validation(client, login):
+    login(6)
+    assert client.post('/api/slots/hold', json={'doctor_id': 1, 'date': DAY.isoformat()}).status_code == 400
+    past = dict(SLOT, date=(date.today() - timedelta(days=1)).isoformat())
+    assert client.post('/api/slots/hold', json=past).status_code == 400
+    assert client.post('/api/slots/hold', json=dict(SLOT, doctor_id=999)).status_code == 404
+    assert client.post('/api/slots/hold', json=dict(SLOT, time='23:00')).status_code == 409
+
+
+def test_hold_expiry(app, monkeypatch):
+    now = 1_000_000.0
+    monkeypatch.setattr(slot_holds_module._time, 'time', lambda: now)
+    assert slot_holds.hold(1, DAY, time(9, 0), 'user-6', seconds=60)
+    assert not slot_holds.hold(1, DAY, time(9, 0), 'user-7')
+
+    now += 61
+    assert slot_holds.holder_of(1, DAY, time(9, 0)) is None
+    assert slot_holds.hold(1, DAY, time(9, 0), 'user-7')
@@ -0,0 +1,33 @@
+"""
+Sparse fieldsets via ?fields=
+"""
+from datetime import date, time, timedelta
+
+from extensions import db
+from models.appointment import Appointment
+
+
+def test_doctor_fields(client):
+    body = client.get('/api/doctors', query_string={'fields': 'specialization,id'}).get_json()
+    assert body['count'] == 4
+    assert [set(item) for item in body['data']] == [{'id', 'specialization'}] * 4
+
+    body = client.get('/api/doctors/2', query_string={'fields': 'visit_minutes,email'}).get_json()
+    assert set(body['data']) == {'visit_minutes', 'email'}
+    assert body['data']['visit_minutes'] == 20 and '@' in body['data']['email']
+
+
+def test_appointment_fields(client, login):
+    login(1)
+    db.session.add(Appointment(patient_id=1, doctor_id=1, appointment_date=date.today() + timedelta(days=1),
+                               appointment_time=time(9, 0), status='Booked'))
+    db.session.commit()
+
+    body = client.get('/api/appointments', query_string={'fields': 'doctor_name,appointment_time'}).get_json()
+    assert body['data'] == [{'doctor_name': 'Dr. Rajesh Sharma', 'appointment_time': '09:00'}]
+
+
+def test_unknown_field(client):
+    response = client.get('/api/doctors', query_string={'fields': 'id,password_hash'})
+    assert response.status_code == 400
+    assert response.get_json()['message'] == 'Unknown field(s): password_hash'
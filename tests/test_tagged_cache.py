@@ -0,0 +1,107 @@
+"""
+Tag-invalidated cache with stale-while-revalidate
+"""
+from datetime import date, time, timedelta
+
+import pytest
+
+from extensions import db
+from models.appointment import Appointment
+from utils import tagged_cache
+from utils.tagged_cache import cached_with_tags, store, tag_versions
+
+KEY = 'test_payload'
+TAGS = ['appointments']
+
+
+class Source:
+    """Counts computes and queued refreshes"""
+
+    def __init__(self):
+        self.value = 0
+        self.refreshes = 0
+        self.refresh_error = None
+
+    def compute(self):
+        self.value += 1
+        return self.value
+
+    def refresh(self):
+        if self.refresh_error:
+            raise self.refresh_error
+        self.refreshes += 1
+
+    def get(self, **kwargs):
+        return cached_with_tags(KEY, TAGS, self.compute, self.refresh, **kwargs)
+
+
+@pytest.fixture
+def source(app):
+    return Source()
+
+
+def _book():
+    db.session.add(Appointment(patient_id=1, doctor_id=1, appointment_date=date.today() + timedelta(days=1),
+                               appointment_time=time(9, 0), status='Booked'))
+    db.session.commit()
+
+
+def test_stale_while_revalidate(source):
+    assert source.get() == 1  # cold: computed inline
+    assert source.get() == 1
+
+    _book()
+    # Stale: the old value is served and one refresh is queued
+    assert source.get() == 1
+    assert source.get() == 1
+    assert source.refreshes == 1
+
+    # The background job stores the new value
+    store(KEY, TAGS, source.compute)
+    assert source.get() == 2
+    assert source.refreshes == 1
+
+
+def test_unrelated_and_rolled_back_changes(source):
+    versions = tag_versions(TAGS)
+    db.session.add(Appointment(patient_id=1, doctor_id=1, appointment_date=date.today(),
+                               appointment_time=time(9, 0), status='Booked'))
+    db.session.flush()
+    db.session.rollback()
+    assert tag_versions(TAGS) == versions
+
+    tagged_cache.queue_tags(db.session, ['patients'])
+    db.session.commit()
+    assert tag_versions(TAGS) == versions
+    assert tag_versions(['patients'])['patients'] != 0
+
+
+def test_no_broker_recomputes_inline(source):
+    source.get()
+    _book()
+    source.refresh_error = ConnectionError('broker down')
+    assert source.get() == 2
+
+
+def test_overdue_refresh_recomputed_inline(source, monkeypatch):
+    now = 1_000_000.0
+    monkeypatch.setattr(tagged_cache._time, 'time', lambda: now)
+    assert source.get(max_age=30) == 1
+
+    now += 31
+    assert source.get(max_age=30) == 1  # stale by age: refresh queued
+    assert source.refreshes == 1
+
+    # The refresh never ran; past the lock window the entry is recomputed
+    now += tagged_cache.REFRESH_LOCK_SECONDS
+    assert source.get(max_age=30) == 2
+
+
+def test_commit_during_compute_leaves_entry_stale(source):
+    def compute():
+        _book()
+        return 'computed before the commit'
+
+    store(KEY, TAGS, compute)
+    assert source.get() == 'computed before the commit'
+    assert source.refreshes == 1
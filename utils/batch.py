@@ -0,0 +1,88 @@
+"""
+Batched API GETs
+
+Runs several relative API GETs inside the current request, so a client on a
+high-latency link gets the doctor list, its appointments and its profile in
+one round trip. Each sub-request is dispatched through the normal Flask
+request machinery with the caller's credentials, so every endpoint applies
+its own authorization, and all of them share the outer request's database
+session.
+"""
+from flask import current_app, request
+from werkzeug.exceptions import HTTPException, MethodNotAllowed, NotFound
+
+# Endpoints that stream, recurse or only accept writes are rejected up front
+BATCH_EXCLUDED_ENDPOINTS = {
+    'api.batch',
+    'api.export_table',
+    'api.stream_appointment_events',
+    'api.stream_doctor_events',
+    'api.stream_triage_events'
+}
+
+# Request headers passed through to each sub-request
+FORWARDED_HEADERS = ('Cookie', 'Authorization')
+
+
+def _check_path(path):
+    """Error message for a path that may not be batched, or None"""
+    if not isinstance(path, str) or not path.startswith('/api/'):
+        return 'Path must be a string starting with /api/'
+    adapter = current_app.url_map.bind_to_environ(request.environ)
+    try:
+        endpoint, _ = adapter.match(path.split('?', 1)[0], method='GET')
+    except (NotFound, MethodNotAllowed):
+        return 'No GET endpoint at this path'
+    except HTTPException:
+        # e.g. a redirect for a missing trailing slash
+        return 'Path must match an endpoint exactly'
+    if endpoint in BATCH_EXCLUDED_ENDPOINTS:
+        return 'This endpoint cannot be batched'
+    return None
+
+
+def _body(response):
+    if response.is_json:
+        return response.get_json()
+    return response.get_data(as_text=True)
+
+
+def dispatch_get(path):
+    """
+    Run one GET sub-request and return {path, status, headers, body}.
+    Unexpected errors become a 500 entry instead of failing the batch.
+    """
+    app = current_app._get_current_object()
+    headers = {name: request.headers[name] for name in FORWARDED_HEADERS if name in request.headers}
+    with app.test_request_context(path, method='GET', base_url=request.host_url, headers=headers):
+        try:
+            response = app.full_dispatch_request()
+        except Exception as e:
+            from extensions import db
+            db.session.rollback()
+            app.logger.exception(f"Batched request {path} failed: {str(e)}")
+            return {'path': path, 'status': 500, 'headers': {},
+                    'body': {'success': False, 'message': 'Internal server error'}}
+        try:
+            result = {
+                'path': path,
+                'status': response.status_code,
+                'headers': {'ETag': response.headers['ETag']} if 'ETag' in response.headers else {},
+                'body': _body(response)
+            }
+        finally:
+            response.close()
+    return result
+
+
+def run_batch(paths):
+    """Results of each GET in `paths`, in order"""
+    results = []
+    for path in paths:
+        error = _check_path(path)
+        if error:
+            results.append({'path': path, 'status': 400, 'headers': {},
+                            'body': {'success': False, 'message': error}})
+        else:
+            results.append(dispatch_get(path))
+    return results
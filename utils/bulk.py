@@ -0,0 +1,252 @@
+"""
+Bulk creation of patients and appointments for batch uploads
+
+Each batch is validated in one pass with a fixed number of queries
+(uniqueness via IN lookups, slot checks against availability blocks and an
+in-memory ScheduleIndex), and the valid items are inserted with executemany
+inside a single transaction. Invalid items are reported per index and do
+not stop the rest of the batch.
+"""
+from datetime import datetime, date, timedelta
+from sqlalchemy import insert
+from extensions import db
+from utils.intervals import ScheduleIndex
+from utils.scheduling import expand_availability, visit_minutes_for, invalidate_free_slots
+from utils.counters import count_inserted, column_default
+from utils.live_events import queue_event, appointment_event, APPOINTMENT_EVENT_FIELDS
+from utils.tagged_cache import queue_tags
+
+PATIENT_REQUIRED_FIELDS = ['username', 'email', 'password', 'full_name', 'contact_number']
+APPOINTMENT_REQUIRED_FIELDS = ['patient_id', 'doctor_id', 'appointment_date', 'appointment_time']
+
+
+def _failed(index, message):
+    return {'index': index, 'success': False, 'message': message}
+
+
+def _missing_field(item, required):
+    if not isinstance(item, dict):
+        return 'Item must be an object'
+    for field in required:
+        if field not in item:
+            return f'Missing required field: {field}'
+    return None
+
+
+def _insert_ids(model, rows):
+    """executemany INSERT of `rows`, returning the new ids in row order"""
+    if not rows:
+        return []
+    return db.session.scalars(
+        insert(model).returning(model.id, sort_by_parameter_order=True), rows
+    ).all()
+
+
+def bulk_create_patients(items):
+    """
+    Register many patients (user + patient rows) in one transaction.
+
+    Usernames and emails are checked against the database with one IN query
+    and against earlier items of the same batch.
+
+    Returns:
+        List of per-item results in input order:
+        {'index', 'success': True, 'id'} or {'index', 'success': False, 'message'}
+    """
+    from werkzeug.security import generate_password_hash
+    from models.user import User
+    from models.patient import Patient
+
+    results = [None] * len(items)
+    candidates = []
+    birth_dates = {}
+    for index, item in enumerate(items):
+        error = _missing_field(item, PATIENT_REQUIRED_FIELDS)
+        if error:
+            results[index] = _failed(index, error)
+            continue
+        if not all(isinstance(item[field], str) for field in PATIENT_REQUIRED_FIELDS):
+            results[index] = _failed(index, 'Fields must be strings')
+            continue
+        if item.get('date_of_birth'):
+            try:
+                birth_dates[index] = datetime.strptime(item['date_of_birth'], '%Y-%m-%d').date()
+            except (TypeError, ValueError):
+                results[index] = _failed(index, 'Invalid date_of_birth')
+                continue
+        candidates.append((index, item))
+
+    usernames = {item['username'] for _, item in candidates}
+    emails = {item['email'] for _, item in candidates}
+    taken_usernames, taken_emails = set(), set()
+    if candidates:
+        for username, email in db.session.query(User.username, User.email).filter(
+            db.or_(User.username.in_(usernames), User.email.in_(emails))
+        ).all():
+            taken_usernames.add(username)
+            taken_emails.add(email)
+
+    accepted = []
+    for index, item in candidates:
+        if item['username'] in taken_usernames:
+            results[index] = _failed(index, 'Username already exists')
+            continue
+        if item['email'] in taken_emails:
+            results[index] = _failed(index, 'Email already registered')
+            continue
+        taken_usernames.add(item['username'])
+        taken_emails.add(item['email'])
+        accepted.append((index, item))
+
+    user_ids = _insert_ids(User, [{
+        'username': item['username'],
+        'email': item['email'],
+        'password_hash': generate_password_hash(item['password']),
+        'role': 'patient'
+    } for _, item in accepted])
+
+    patient_rows = []
+    for (index, item), user_id in zip(accepted, user_ids):
+        patient_rows.append({
+            'user_id': user_id,
+            'full_name': item['full_name'],
+            'contact_number': item['contact_number'],
+            'date_of_birth': birth_dates.get(index),
+            'gender': item.get('gender'),
+            'blood_group': item.get('blood_group'),
+            'address': item.get('address')
+        })
+
+    count_inserted(Patient, patient_rows)
+    queue_tags(db.session, ['patients'])
+    for (index, _), patient_id in zip(accepted, _insert_ids(Patient, patient_rows)):
+        results[index] = {'index': index, 'success': True, 'id': patient_id}
+    return results
+
+
+def bulk_create_appointments(items, today=None):
+    """
+    Book many appointments in one transaction.
+
+    Every item gets the same checks as a single booking (patient/doctor
+    exist, date not in the past, visit length, inside an availability block,
+    no overlap), but availability and existing bookings are loaded once for
+    the whole batch, and each accepted item is added to the in-memory index
+    so items of the same batch cannot overlap each other either.
+
+    Returns:
+        List of per-item results in input order (see bulk_create_patients)
+    """
+    from models.appointment import Appointment
+    from models.doctor import Doctor
+    from models.patient import Patient
+
+    today = today or date.today()
+    results = [None] * len(items)
+    parsed = []
+    for index, item in enumerate(items):
+        error = _missing_field(item, APPOINTMENT_REQUIRED_FIELDS)
+        if error:
+            results[index] = _failed(index, error)
+            continue
+        if not isinstance(item['doctor_id'], int) or not isinstance(item['patient_id'], int):
+            results[index] = _failed(index, 'doctor_id and patient_id must be integers')
+            continue
+        try:
+            appointment_date = datetime.strptime(item['appointment_date'], '%Y-%m-%d').date()
+            appointment_time = datetime.strptime(item['appointment_time'], '%H:%M').time()
+        except (TypeError, ValueError):
+            results[index] = _failed(index, 'Invalid date or time format')
+            continue
+        if appointment_date < today:
+            results[index] = _failed(index, 'Cannot book appointments in the past')
+            continue
+        parsed.append((index, item, appointment_date, appointment_time))
+
+    if not parsed:
+        return results
+
+    doctor_ids = {row[0] for row in db.session.query(Doctor.id).filter(
+        Doctor.id.in_({item['doctor_id'] for _, item, _, _ in parsed}),
+        Doctor.is_deleted == False
+    ).all()}
+    patient_ids = {row[0] for row in db.session.query(Patient.id).filter(
+        Patient.id.in_({item['patient_id'] for _, item, _, _ in parsed}),
+        Patient.is_deleted == False
+    ).all()}
+    default_minutes = visit_minutes_for(doctor_ids)
+
+    start_date = min(row[2] for row in parsed)
+    end_date = max(row[2] for row in parsed)
+    blocks = {}
+    for doctor_id, doctor_blocks in expand_availability(doctor_ids, start_date, end_date).items():
+        for block in doctor_blocks:
+            blocks.setdefault((doctor_id, block.available_date), []).append(block)
+    booked = ScheduleIndex(doctor_ids, start_date, end_date)
+
+    accepted = []
+    for index, item, appointment_date, appointment_time in parsed:
+        doctor_id = item['doctor_id']
+        if doctor_id not in doctor_ids:
+            results[index] = _failed(index, 'Doctor not found')
+            continue
+        if item['patient_id'] not in patient_ids:
+            results[index] = _failed(index, 'Patient not found')
+            continue
+
+        duration = item.get('duration_minutes')
+        if duration is None:
+            duration = default_minutes[doctor_id]
+        if not isinstance(duration, int) or duration < 5 or duration > 480:
+            results[index] = _failed(index, 'duration_minutes must be between 5 and 480')
+            continue
+
+        conflict = booked.conflict(doctor_id, appointment_date, appointment_time, duration)
+        if conflict is not None:
+            results[index] = _failed(
+                index, f"Conflicts with existing appointment at {conflict[0].strftime('%H:%M')}"
+            )
+            continue
+
+        start = datetime.combine(appointment_date, appointment_time)
+        end = start + timedelta(minutes=duration)
+        day_blocks = blocks.get((doctor_id, appointment_date), [])
+        if not day_blocks:
+            results[index] = _failed(index, 'Doctor not available on this date')
+            continue
+        if end.date() != appointment_date or not any(
+            datetime.combine(appointment_date, block.start_time) <= start
+            and end <= datetime.combine(appointment_date, block.end_time)
+            for block in day_blocks
+        ):
+            results[index] = _failed(index, "Requested time is outside doctor's availability")
+            continue
+
+        booked.add(doctor_id, appointment_date, appointment_time, duration)
+        accepted.append((index, {
+            'patient_id': item['patient_id'],
+            'doctor_id': doctor_id,
+            'appointment_date': appointment_date,
+            'appointment_time': appointment_time,
+            'duration_minutes': duration,
+            'reason': item.get('reason'),
+            'status': 'Booked'
+        }))
+
+    rows = [row for _, row in accepted]
+    ids = _insert_ids(Appointment, rows)
+    count_inserted(Appointment, rows)
+    queue_tags(db.session, ['appointments'])
+    column_defaults = {name: column_default(Appointment, name) for name in APPOINTMENT_EVENT_FIELDS}
+    for (index, row), appointment_id in zip(accepted, ids):
+        results[index] = {'index': index, 'success': True, 'id': appointment_id}
+        # Bulk INSERTs skip the flush listener, so queue the live event here
+        channels, data = appointment_event(dict(column_defaults, id=appointment_id, **row), 'created')
+        queue_event(db.session, channels, 'appointment', data)
+    return results
+
+
+def invalidate_booked_doctors(items, results):
+    """Drop cached free slots of every doctor that received a booking"""
+    for doctor_id in {items[result['index']]['doctor_id'] for result in results if result['success']}:
+        invalidate_free_slots(doctor_id)
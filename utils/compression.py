@@ -0,0 +1,175 @@
+"""
+Response compression and precompressed static assets
+
+Compression encodes text responses (HTML pages, JSON lists, NDJSON exports)
+with brotli when the client accepts it and the brotli package is installed,
+and with gzip otherwise. Responses under COMPRESS_MIN_SIZE, content types not
+listed in COMPRESS_MIMETYPES and files sent with send_file are left alone.
+Streamed responses are compressed chunk by chunk with a sync flush, so every
+chunk still reaches the client as soon as it is produced.
+
+Static assets are built ahead of time by build_static.py into static/dist:
+each file gets a content hash in its name plus .gz/.br copies. asset_url()
+(available in templates) returns the fingerprinted URL, and /assets/ serves
+the best precompressed variant with a one-year immutable cache lifetime.
+"""
+import gzip
+import json
+import mimetypes
+import os
+import zlib
+from flask import current_app, request, send_from_directory, url_for
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+ASSET_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+
+
+class _GzipStream:
+    def __init__(self, level):
+        # wbits 16 + MAX_WBITS writes a gzip header and trailer
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def chunk(self, data):
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class _BrotliStream:
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def chunk(self, data):
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+def _accepts(encoding):
+    return request.accept_encodings.quality(encoding) > 0
+
+
+def _mimetype_matches(mimetype, allowed):
+    return any(mimetype == entry or (entry.endswith('/*') and mimetype.startswith(entry[:-1]))
+               for entry in allowed)
+
+
+class Compression:
+    """Flask extension compressing responses and serving precompressed assets"""
+
+    def __init__(self, app=None):
+        self.manifest = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.manifest = self._load_manifest(app)
+        if app.config.get('COMPRESS_RESPONSES', True):
+            app.after_request(self.compress_response)
+        app.add_url_rule('/assets/<path:filename>', 'assets', self.send_asset)
+        app.add_template_global(self.asset_url, 'asset_url')
+        app.extensions['compression'] = self
+
+    def _load_manifest(self, app):
+        path = os.path.join(app.static_folder, ASSET_DIR, MANIFEST_NAME)
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            # build_static.py has not run; asset_url() falls back to /static/
+            return {}
+
+    def _choose_encoding(self):
+        if brotli is not None and _accepts('br'):
+            return 'br'
+        if _accepts('gzip'):
+            return 'gzip'
+        return None
+
+    def compress_response(self, response):
+        config = current_app.config
+        if (response.status_code < 200 or response.status_code in (204, 304)
+                or response.direct_passthrough
+                or 'Content-Encoding' in response.headers
+                or not _mimetype_matches(response.mimetype, config['COMPRESS_MIMETYPES'])):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        if not response.is_streamed and response.content_length is not None \
+                and response.content_length < config['COMPRESS_MIN_SIZE']:
+            return response
+        encoding = self._choose_encoding()
+        if encoding is None:
+            return response
+
+        if encoding == 'br':
+            stream = _BrotliStream(config['COMPRESS_BROTLI_QUALITY'])
+        else:
+            stream = _GzipStream(config['COMPRESS_GZIP_LEVEL'])
+
+        if response.is_streamed:
+            response.response = self._compress_iter(response.response, stream)
+            response.headers.pop('Content-Length', None)
+        else:
+            response.set_data(stream.chunk(response.get_data()) + stream.finish())
+        response.headers['Content-Encoding'] = encoding
+        # Weak ETags stay valid across encodings; strong ones identify the bytes
+        if response.headers.get('ETag', '').startswith('"'):
+            response.headers['ETag'] = 'W/' + response.headers['ETag']
+        return response
+
+    def _compress_iter(self, chunks, stream):
+        try:
+            for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode('utf-8')
+                if chunk:
+                    yield stream.chunk(chunk)
+            yield stream.finish()
+        finally:
+            if hasattr(chunks, 'close'):
+                chunks.close()
+
+    def asset_url(self, filename):
+        """URL of a static file, fingerprinted if build_static.py produced it"""
+        built = self.manifest.get(filename)
+        if built is None:
+            return url_for('static', filename=filename)
+        return url_for('assets', filename=built)
+
+    def send_asset(self, filename):
+        """Serve a built asset, preferring a precompressed copy the client accepts"""
+        folder = os.path.join(current_app.static_folder, ASSET_DIR)
+        mimetype = mimetypes.guess_type(filename)[0]
+        max_age = current_app.config['ASSET_MAX_AGE']
+
+        for suffix, encoding in (('.br', 'br'), ('.gz', 'gzip')):
+            variant = safe_join(folder, filename + suffix)
+            if variant and os.path.isfile(variant) and _accepts(encoding):
+                response = send_from_directory(folder, filename + suffix, mimetype=mimetype, max_age=max_age)
+                response.headers['Content-Encoding'] = encoding
+                break
+        else:
+            response = send_from_directory(folder, filename, max_age=max_age)
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        response.vary.add('Accept-Encoding')
+        return response
+
+
+def precompress(data, level=9):
+    """(gzip bytes, brotli bytes or None) for a static asset"""
+    gz = gzip.compress(data, compresslevel=level, mtime=0)
+    br = brotli.compress(data, quality=11) if brotli is not None else None
+    return gz, br
+
+
+compression = Compression()
@@ -0,0 +1,79 @@
+"""
+Conditional GET (ETag / If-None-Match) for API resources
+
+The validator comes from one aggregate probe - count and max(updated_at)
+over the rows a request would return, plus max(updated_at) of the related
+rows it embeds - so a matching If-None-Match is answered with 304 before
+anything is loaded or serialized.
+"""
+import hashlib
+from flask import request, Response
+from sqlalchemy import func
+from sqlalchemy.orm import aliased
+from werkzeug.http import quote_etag
+
+
+def _probe(model, relationships):
+    """(joins, aggregate columns) whose values identify a representation"""
+    joins = []
+    columns = [func.count(model.id), func.max(model.updated_at)]
+    for relationship in relationships:
+        target = aliased(relationship.property.mapper.class_)
+        joins.append(relationship.of_type(target))
+        columns.append(func.max(target.updated_at))
+    return joins, columns
+
+
+def etag_from_values(values):
+    """ETag for the current URL and the probe's result row"""
+    # The URL is included so every representation (?fields=, page, filters)
+    # gets its own validator
+    return hashlib.sha1(
+        '|'.join([request.full_path] + [str(value) for value in values]).encode()
+    ).hexdigest()
+
+
+def resource_etag(query, model, *relationships):
+    """
+    Weak ETag for the rows `query` matches.
+
+    Args:
+        query: Query for `model` with its filters but no loader options,
+            ordering or limit
+        model: Mapped class of the query
+        relationships: Many-to-one relationships (e.g. Appointment.patient)
+            whose targets' data appears in the representation
+
+    Returns:
+        Opaque ETag value (unquoted)
+    """
+    joins, columns = _probe(model, relationships)
+    for join in joins:
+        query = query.join(join)
+    return etag_from_values(query.with_entities(*columns).one())
+
+
+def etag_statement(stmt, model, *relationships):
+    """
+    resource_etag() for a select(model) statement: the probe as a SELECT
+    to execute elsewhere (e.g. on an async session), whose single row goes
+    to etag_from_values().
+    """
+    joins, columns = _probe(model, relationships)
+    for join in joins:
+        stmt = stmt.join(join)
+    return stmt.with_only_columns(*columns)
+
+
+def not_modified(etag):
+    """A 304 response when If-None-Match matches `etag`, else None"""
+    if not request.if_none_match.contains_weak(etag):
+        return None
+    response = Response(status=304)
+    response.set_etag(etag, weak=True)
+    return response
+
+
+def etag_header(etag):
+    """Headers dict for a 200 response carrying `etag`"""
+    return {'ETag': quote_etag(etag, weak=True)}
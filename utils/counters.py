@@ -0,0 +1,282 @@
+"""
+Incrementally maintained statistics counters
+
+Totals for the stats API and admin dashboard (doctors, patients, and
+appointments per status, priority, day and doctor) live in the
+stat_counters table. Every flush that inserts, updates or deletes a counted
+row adjusts the affected counters in the same transaction, so reading a
+statistic is a primary-key lookup instead of a COUNT(*) over the table.
+reconcile_counters() recomputes everything from scratch to correct drift
+(e.g. rows changed by raw SQL) and runs nightly from Celery beat.
+"""
+from datetime import datetime
+from sqlalchemy import event, func, inspect, bindparam, select
+from sqlalchemy.orm import Session
+from extensions import db
+
+# Present once the table has been filled by reconcile_counters()
+RECONCILED_KEY = 'counters:reconciled'
+
+
+def _appointment_keys(get):
+    if get('is_deleted'):
+        return []
+    keys = [
+        'appointments',
+        f"appointments:status:{get('status')}",
+        f"appointments:priority:{get('priority')}",
+        f"appointments:doctor:{get('doctor_id')}"
+    ]
+    if get('appointment_date') is not None:
+        keys.append(f"appointments:day:{get('appointment_date').isoformat()}")
+    return keys
+
+
+def _doctor_keys(get):
+    return ['doctors:active'] if not get('is_deleted') and get('is_active') else []
+
+
+def _patient_keys(get):
+    return ['patients:active'] if not get('is_deleted') and get('is_active') else []
+
+
+def _counted_models():
+    from models.appointment import Appointment
+    from models.doctor import Doctor
+    from models.patient import Patient
+    return {Appointment: _appointment_keys, Doctor: _doctor_keys, Patient: _patient_keys}
+
+
+# Columns each model's key function reads
+COUNTED_COLUMNS = {
+    'Appointment': ['is_deleted', 'status', 'priority', 'doctor_id', 'appointment_date'],
+    'Doctor': ['is_deleted', 'is_active'],
+    'Patient': ['is_deleted', 'is_active']
+}
+
+
+def column_default(model, name):
+    """Scalar Python-side default of a model column (None when absent or callable)"""
+    default = model.__table__.c[name].default
+    if default is None or not default.is_scalar:
+        return None
+    return default.arg
+
+
+def _needs_committed_values(state, names):
+    """
+    True when attribute history cannot tell the pre-flush value: a counted
+    column was assigned while expired/unloaded (history has no deleted
+    value) or is not loaded at all.
+    """
+    for name in names:
+        if name not in state.dict:
+            return True
+        history = state.attrs[name].history
+        if history.added and not history.deleted:
+            return True
+    return False
+
+
+@event.listens_for(Session, 'before_flush')
+def _capture_committed_values(session, flush_context, instances):
+    """Read the stored counted columns of rows whose old values were never loaded"""
+    counted = _counted_models()
+    ids = {}
+    for obj in list(session.dirty) + list(session.deleted):
+        model = type(obj)
+        state = inspect(obj)
+        if model in counted and state.key is not None \
+                and _needs_committed_values(state, COUNTED_COLUMNS[model.__name__]):
+            ids.setdefault(model, set()).add(state.key[1][0])
+
+    committed = {}
+    with session.no_autoflush:
+        for model, model_ids in ids.items():
+            columns = [getattr(model, name) for name in COUNTED_COLUMNS[model.__name__]]
+            for row in session.execute(select(model.id, *columns).where(model.id.in_(model_ids))):
+                committed[(model, row.id)] = row._asdict()
+    session.info['counter_committed_values'] = committed
+
+
+def _previous_values(obj, committed):
+    """Attribute getter for an instance's state before the current flush"""
+    state = inspect(obj)
+    row = committed.get((type(obj), state.key[1][0])) if state.key is not None else None
+    if row is not None:
+        return row.__getitem__
+
+    def get(name):
+        history = state.attrs[name].history
+        if history.deleted:
+            return history.deleted[0]
+        return getattr(obj, name)
+    return get
+
+
+def _add(deltas, keys, sign):
+    for key in keys:
+        deltas[key] = deltas.get(key, 0) + sign
+
+
+def _apply(connection, deltas):
+    """Add each delta to its counter (creating missing counters) in one executemany"""
+    params = [{'k': key, 'd': delta} for key, delta in deltas.items() if delta]
+    if not params:
+        return
+    from models.stat_counter import StatCounter
+
+    table = StatCounter.__table__
+    now = datetime.utcnow()
+    dialect = connection.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table).values(key=bindparam('k'), value=bindparam('d'), updated_at=now)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.key],
+            set_={'value': table.c.value + stmt.excluded.value, 'updated_at': now}
+        )
+        connection.execute(stmt, params)
+        return
+
+    for param in params:
+        updated = connection.execute(
+            table.update().where(table.c.key == param['k'])
+            .values(value=table.c.value + param['d'], updated_at=now)
+        )
+        if not updated.rowcount:
+            connection.execute(table.insert().values(key=param['k'], value=param['d'], updated_at=now))
+
+
+@event.listens_for(Session, 'after_flush')
+def _track_counted_changes(session, flush_context):
+    counted = _counted_models()
+    committed = session.info.pop('counter_committed_values', {})
+    deltas = {}
+    for obj in session.new:
+        keys_for = counted.get(type(obj))
+        if keys_for:
+            _add(deltas, keys_for(lambda name: getattr(obj, name)), 1)
+    for obj in session.dirty:
+        keys_for = counted.get(type(obj))
+        if keys_for and session.is_modified(obj, include_collections=False):
+            _add(deltas, keys_for(_previous_values(obj, committed)), -1)
+            _add(deltas, keys_for(lambda name: getattr(obj, name)), 1)
+    for obj in session.deleted:
+        keys_for = counted.get(type(obj))
+        if keys_for:
+            _add(deltas, keys_for(_previous_values(obj, committed)), -1)
+    _apply(session.connection(), deltas)
+
+
+def count_inserted(model, rows):
+    """
+    Count rows written with a bulk INSERT (session.execute(insert(model), rows)),
+    which bypasses the flush listener. Call in the same transaction.
+    """
+    keys_for = _counted_models().get(model)
+    if not keys_for:
+        return
+    deltas = {}
+    for row in rows:
+        _add(deltas, keys_for(lambda name: row[name] if name in row else column_default(model, name)), 1)
+    _apply(db.session.connection(), deltas)
+
+
+def _computed_counters():
+    """Every counter recomputed from the source tables"""
+    from models.appointment import Appointment
+    from models.doctor import Doctor
+    from models.patient import Patient
+
+    totals = {
+        'doctors:active': Doctor.query.filter_by(is_deleted=False, is_active=True).count(),
+        'patients:active': Patient.query.filter_by(is_deleted=False, is_active=True).count(),
+        'appointments': Appointment.query.filter_by(is_deleted=False).count()
+    }
+    for prefix, column in (('status', Appointment.status),
+                           ('priority', Appointment.priority),
+                           ('doctor', Appointment.doctor_id),
+                           ('day', Appointment.appointment_date)):
+        for value, count in db.session.query(column, func.count(Appointment.id)).filter(
+            Appointment.is_deleted == False
+        ).group_by(column).all():
+            if prefix == 'day':
+                if value is None:
+                    continue
+                value = value.isoformat()
+            totals[f'appointments:{prefix}:{value}'] = count
+    return totals
+
+
+def reconcile_counters():
+    """
+    Recompute every counter and overwrite the ones that drifted; commits.
+
+    Returns:
+        Number of counters that were corrected
+    """
+    from models.stat_counter import StatCounter
+
+    expected = _computed_counters()
+    expected[RECONCILED_KEY] = 1
+    stored = dict(db.session.query(StatCounter.key, StatCounter.value).all())
+
+    corrected = 0
+    now = datetime.utcnow()
+    table = StatCounter.__table__
+    for key, value in stored.items():
+        if key not in expected and value:
+            db.session.execute(table.delete().where(table.c.key == key))
+            corrected += 1
+    for key, value in expected.items():
+        if key not in stored:
+            db.session.execute(table.insert().values(key=key, value=value, updated_at=now))
+            corrected += 1
+        elif stored[key] != value:
+            db.session.execute(table.update().where(table.c.key == key).values(value=value, updated_at=now))
+            corrected += 1
+    db.session.commit()
+    return corrected
+
+
+def _ensure_reconciled():
+    from models.stat_counter import StatCounter
+
+    if db.session.get(StatCounter, RECONCILED_KEY) is None:
+        reconcile_counters()
+
+
+def read_counters(keys):
+    """Current value of each counter key (0 when absent), in one query"""
+    from models.stat_counter import StatCounter
+
+    keys = list(keys)
+    query = db.session.query(StatCounter.key, StatCounter.value).filter(
+        StatCounter.key.in_(keys + [RECONCILED_KEY])
+    )
+    values = dict(query.all())
+    if RECONCILED_KEY not in values:
+        reconcile_counters()
+        values = dict(query.all())
+    return {key: values.get(key, 0) for key in keys}
+
+
+def counters_with_prefix(prefix, limit=None):
+    """
+    (suffix, value) of the non-zero counters named `prefix` + suffix,
+    largest first.
+    """
+    from models.stat_counter import StatCounter
+
+    _ensure_reconciled()
+    query = db.session.query(StatCounter.key, StatCounter.value).filter(
+        StatCounter.key.startswith(prefix, autoescape=True),
+        StatCounter.value != 0
+    ).order_by(StatCounter.value.desc(), StatCounter.key)
+    if limit:
+        query = query.limit(limit)
+    return [(key[len(prefix):], value) for key, value in query.all()]
@@ -0,0 +1,92 @@
+"""
+Admin dashboard data, cached by tag (see utils.tagged_cache)
+
+The payload holds plain values only, so it can be pickled into the cache;
+the page itself is rendered per request for the current admin.
+"""
+from datetime import date
+from flask import current_app
+from sqlalchemy.orm import joinedload
+from extensions import db
+from utils.counters import read_counters, counters_with_prefix
+from utils.tagged_cache import cached_with_tags, store
+
+DASHBOARD_TAGS = ['appointments', 'patients', 'doctors']
+
+# Keys are per day, so let old days' entries expire
+DASHBOARD_CACHE_TIMEOUT = 2 * 24 * 3600
+
+
+def _cache_key(today):
+    # Per day, since "today's appointments" and "upcoming" depend on the date
+    return f'admin_dashboard_data_{today.isoformat()}'
+
+
+def dashboard_data(today=None):
+    """Statistics, upcoming appointments, recent patients and chart data"""
+    from models.appointment import Appointment
+    from models.doctor import Doctor
+    from models.patient import Patient
+
+    today = today or date.today()
+    day_key = f'appointments:day:{today.isoformat()}'
+    totals = read_counters(['doctors:active', 'patients:active', 'appointments', day_key])
+
+    upcoming = Appointment.query.options(
+        joinedload(Appointment.patient).load_only(Patient.full_name),
+        joinedload(Appointment.doctor).load_only(Doctor.full_name)
+    ).filter(
+        Appointment.appointment_date >= today,
+        Appointment.is_deleted == False,
+        Appointment.status == 'Booked'
+    ).order_by(Appointment.appointment_date, Appointment.appointment_time).limit(10).all()
+
+    recent_patients = db.session.query(Patient.id, Patient.full_name, Patient.contact_number).filter(
+        Patient.is_deleted == False
+    ).order_by(Patient.created_at.desc()).limit(5).all()
+
+    # Appointments by doctor (top 5)
+    top_doctors = counters_with_prefix('appointments:doctor:', limit=5)
+    doctor_names = dict(db.session.query(Doctor.id, Doctor.full_name).filter(
+        Doctor.id.in_([int(doctor_id) for doctor_id, _ in top_doctors])
+    ).all())
+
+    return {
+        'total_doctors': totals['doctors:active'],
+        'total_patients': totals['patients:active'],
+        'total_appointments': totals['appointments'],
+        'today_appointments': totals[day_key],
+        'upcoming_appointments': [{
+            'appointment_date': a.appointment_date,
+            'appointment_time': a.appointment_time,
+            'status': a.status,
+            'patient': {'full_name': a.patient.full_name},
+            'doctor': {'full_name': a.doctor.full_name}
+        } for a in upcoming],
+        'recent_patients': [row._asdict() for row in recent_patients],
+        'status_stats': counters_with_prefix('appointments:status:'),
+        'doctor_stats': [(doctor_names.get(int(doctor_id), 'Unknown'), count)
+                         for doctor_id, count in top_doctors]
+    }
+
+
+def refresh_dashboard_cache():
+    """Recompute and cache today's dashboard data (run by the Celery task)"""
+    today = date.today()
+    return store(_cache_key(today), DASHBOARD_TAGS, lambda: dashboard_data(today), DASHBOARD_CACHE_TIMEOUT)
+
+
+def _queue_refresh():
+    from tasks import celery, refresh_admin_dashboard
+    # Fail fast when the broker is down (no publish retries, no reconnect
+    # loop); the caller then recomputes inline
+    with celery.connection_for_write(transport_options={'max_retries': 0}) as connection:
+        refresh_admin_dashboard.apply_async(retry=False, connection=connection)
+
+
+def get_dashboard_data():
+    """Dashboard data, served from cache and refreshed in the background once stale"""
+    today = date.today()
+    return cached_with_tags(_cache_key(today), DASHBOARD_TAGS, lambda: dashboard_data(today),
+                            _queue_refresh, max_age=current_app.config.get('DASHBOARD_CACHE_MAX_AGE'),
+                            timeout=DASHBOARD_CACHE_TIMEOUT)
@@ -2,6 +2,7 @@
 """
 Helper functions for common operations
 """
+from collections import namedtuple
 from datetime import datetime, timedelta, time
 from flask import current_app
 from flask_mail import Message
@@ -45,13 +46,18 @@ def generate_time_slots(start_hour, end_hour, slot_duration):
     
     return slots
 
-def is_slot_available(doctor_id, appointment_date, appointment_time, end_time=None,
-                      slot_minutes=30, exclude_appointment_id=None):
+SlotCheck = namedtuple('SlotCheck', ['available', 'message', 'conflict_id'])
+
+def check_slot(doctor_id, appointment_date, appointment_time, end_time=None,
+               slot_minutes=30, exclude_appointment_id=None):
     """
-    Check if a slot is available for booking/rescheduling.
+    Validate a slot for booking/rescheduling in a single SQL statement.
 
-    Backward-compatible: original calls that pass (doctor_id, appointment_date, appointment_time)
-    will be treated as start_time with default slot_minutes (30) used to compute end_time.
+    The overlap check against existing appointments (using each appointment's
+    duration_minutes) and the "inside an availability block" check are both
+    evaluated by the database, so no appointment or availability rows are loaded.
+    Availability comes from the date's override rows when any exist, otherwise
+    from the weekly rules in effect on that date.
 
     Params:
       - doctor_id: int
@@ -62,12 +68,15 @@ def is_slot_available(doctor_id, appointment_date, appointment_time, end_time=No
       - exclude_appointment_id: (optional) int - appointment id to ignore (useful for reschedule)
 
     Returns:
-      (available: bool, message: str)
+      SlotCheck(available: bool, message: str, conflict_id: int or None)
     """
     # Import models locally to avoid import cycles
     from extensions import db
+    from sqlalchemy import select, exists, func
     from models.appointment import Appointment
     from models.doctor_availability import DoctorAvailability
+    from models.doctor_availability_rule import DoctorAvailabilityRule
+    from utils.sql import time_add_minutes
 
     # Normalize new slot datetimes
     new_start = datetime.combine(appointment_date, appointment_time)
@@ -76,60 +85,107 @@ def is_slot_available(doctor_id, appointment_date, appointment_time, end_time=No
     else:
         new_end = new_start + timedelta(minutes=slot_minutes)
 
-    # 1) Check existing appointments for the same doctor on that date for overlaps
-    q = Appointment.query.filter(
+    if new_end.date() != appointment_date:
+        return SlotCheck(False, "Requested time is outside doctor's availability", None)
+
+    start_t, end_t = new_start.time(), new_end.time()
+
+    # Existing appointments overlapping [start_t, end_t)
+    ap_end = time_add_minutes(
+        Appointment.appointment_time,
+        func.coalesce(Appointment.duration_minutes, slot_minutes)
+    )
+    conflicts = select(Appointment.id).where(
         Appointment.doctor_id == doctor_id,
         Appointment.appointment_date == appointment_date,
-        Appointment.is_deleted == False
-    ).filter(
-        Appointment.status != 'Canceled'
+        Appointment.is_deleted == False,
+        Appointment.status != 'Canceled',
+        Appointment.appointment_time < end_t,
+        ap_end > start_t
     )
     if exclude_appointment_id:
-        q = q.filter(Appointment.id != exclude_appointment_id)
-
-    existing = q.all()
-
-    for ap in existing:
-        ap_start = datetime.combine(ap.appointment_date, ap.appointment_time)
-
-        # Determine appointment end time if available
-        ap_end = None
-        if hasattr(ap, 'appointment_end_time') and getattr(ap, 'appointment_end_time'):
-            ap_end = datetime.combine(ap.appointment_date, ap.appointment_end_time)
-        elif hasattr(ap, 'duration_minutes') and getattr(ap, 'duration_minutes'):
-            ap_end = ap_start + timedelta(minutes=ap.duration_minutes)
-        else:
-            # fallback to supplied default slot length
-            ap_end = ap_start + timedelta(minutes=slot_minutes)
-
-        # Overlap check: return False if intervals overlap
-        if not (ap_end <= new_start or ap_start >= new_end):
-            return False, f"Conflicts with existing appointment at {ap_start.time().strftime('%H:%M')}"
-
-    # 2) Verify doctor has availability records for that date and that the requested slot
-    #    falls entirely within at least one availability block.
-    avail_blocks = DoctorAvailability.query.filter_by(
-        doctor_id=doctor_id,
-        available_date=appointment_date,
-        is_available=True
-    ).all()
-
-    if not avail_blocks:
-        return False, "Doctor not available on this date"
-
-    inside_any = False
-    for a in avail_blocks:
-        a_start = datetime.combine(a.available_date, a.start_time)
-        a_end = datetime.combine(a.available_date, a.end_time)
-        if new_start >= a_start and new_end <= a_end:
-            inside_any = True
-            break
-
-    if not inside_any:
-        return False, "Requested time is outside doctor's availability"
+        conflicts = conflicts.where(Appointment.id != exclude_appointment_id)
+    conflicts = conflicts.order_by(Appointment.appointment_time).limit(1)
+
+    overrides = select(DoctorAvailability.id).where(
+        DoctorAvailability.doctor_id == doctor_id,
+        DoctorAvailability.available_date == appointment_date
+    )
+    override_blocks = overrides.where(DoctorAvailability.is_available == True)
+    rule_blocks = select(DoctorAvailabilityRule.id).where(
+        DoctorAvailabilityRule.doctor_id == doctor_id,
+        DoctorAvailabilityRule.weekday == appointment_date.weekday(),
+        DoctorAvailabilityRule.effective_from <= appointment_date,
+        db.or_(
+            DoctorAvailabilityRule.effective_until == None,
+            DoctorAvailabilityRule.effective_until >= appointment_date
+        )
+    )
+
+    row = db.session.execute(select(
+        conflicts.scalar_subquery().label('conflict_id'),
+        conflicts.with_only_columns(Appointment.appointment_time).scalar_subquery().label('conflict_time'),
+        exists(overrides).label('has_override'),
+        exists(override_blocks).label('has_override_blocks'),
+        exists(override_blocks.where(
+            DoctorAvailability.start_time <= start_t,
+            DoctorAvailability.end_time >= end_t
+        )).label('inside_override'),
+        exists(rule_blocks).label('has_rule_blocks'),
+        exists(rule_blocks.where(
+            DoctorAvailabilityRule.start_time <= start_t,
+            DoctorAvailabilityRule.end_time >= end_t
+        )).label('inside_rule')
+    )).one()
+
+    if row.conflict_id is not None:
+        return SlotCheck(
+            False,
+            f"Conflicts with existing appointment at {row.conflict_time.strftime('%H:%M')}",
+            row.conflict_id
+        )
+
+    if row.has_override:
+        has_blocks, inside_block = row.has_override_blocks, row.inside_override
+    else:
+        has_blocks, inside_block = row.has_rule_blocks, row.inside_rule
+
+    if not has_blocks:
+        return SlotCheck(False, "Doctor not available on this date", None)
+
+    if not inside_block:
+        return SlotCheck(False, "Requested time is outside doctor's availability", None)
 
     # Passed all checks
-    return True, "Slot available"
+    return SlotCheck(True, "Slot available", None)
+
+ACTIVE_SLOT_INDEX = 'uq_appointments_active_slot'
+
+def is_slot_conflict(error):
+    """
+    Check whether an IntegrityError was raised by the active-slot unique index
+    (i.e. another booking took the same doctor/date/time first).
+    """
+    message = str(getattr(error, 'orig', error))
+    if ACTIVE_SLOT_INDEX in message:
+        return True
+    # SQLite reports the columns instead of the index name
+    return ('UNIQUE' in message and 'appointments.doctor_id' in message
+            and 'appointments.appointment_time' in message)
+
+def is_slot_available(doctor_id, appointment_date, appointment_time, end_time=None,
+                      slot_minutes=30, exclude_appointment_id=None):
+    """
+    Check if a slot is available for booking/rescheduling.
+
+    Thin wrapper around check_slot() kept for existing callers.
+
+    Returns:
+      (available: bool, message: str)
+    """
+    result = check_slot(doctor_id, appointment_date, appointment_time, end_time=end_time,
+                        slot_minutes=slot_minutes, exclude_appointment_id=exclude_appointment_id)
+    return result.available, result.message
 
 def format_date(date_obj):
     """Format date for display"""
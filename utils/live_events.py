@@ -0,0 +1,242 @@
+"""
+Live change events for dashboards (Server-Sent Events)
+
+Committed changes to appointments and triage assessments are published to
+channels such as 'doctor:3', 'appointments' (every booking) and 'triage'
+(the assessment queue); SSE endpoints stream a channel to the browser so
+dashboards update incrementally instead of re-polling whole pages.
+
+Events go through Redis pub/sub so every worker sees them; the in-process
+broker is used when LIVE_EVENTS_BACKEND = 'memory' (tests, single process
+development).
+
+Each open stream occupies a WSGI worker thread, so streams close after
+LIVE_EVENTS_STREAM_SECONDS and the browser's EventSource reconnects (after
+the 'retry:' delay). Run gunicorn with threaded workers so streams do not
+starve ordinary requests (see README, Deployment).
+"""
+import queue
+import threading
+import time as _time
+from collections.abc import Mapping
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+
+def _frame(event_type, payload):
+    """One SSE message"""
+    return f'event: {event_type}\ndata: {payload}\n\n'
+
+
+class MemorySubscription:
+    def __init__(self, broker, channels):
+        self._broker = broker
+        self._channels = channels
+        self.queue = queue.Queue(maxsize=1000)
+
+    def get(self, timeout):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self._broker._unsubscribe(self, self._channels)
+
+
+class MemoryEventBroker:
+    """In-process broker; a subscriber that falls 1000 events behind loses events"""
+
+    def __init__(self):
+        self._subscribers = {}  # channel -> set of MemorySubscription
+        self._lock = threading.Lock()
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait(message)
+            except queue.Full:
+                pass
+
+    def subscribe(self, channels):
+        subscription = MemorySubscription(self, channels)
+        with self._lock:
+            for channel in channels:
+                self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription, channels):
+        with self._lock:
+            for channel in channels:
+                self._subscribers.get(channel, set()).discard(subscription)
+
+
+class RedisSubscription:
+    def __init__(self, client, channels):
+        self.pubsub = client.pubsub(ignore_subscribe_messages=True)
+        self.pubsub.subscribe(*channels)
+
+    def get(self, timeout):
+        message = self.pubsub.get_message(timeout=timeout)
+        return message['data'] if message else None
+
+    def close(self):
+        self.pubsub.close()
+
+
+class RedisEventBroker:
+    """Redis pub/sub broker; channels are prefixed with 'events:'"""
+
+    PREFIX = 'events:'
+
+    def __init__(self, url):
+        import redis
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+
+    def publish(self, channel, message):
+        self.client.publish(self.PREFIX + channel, message)
+
+    def subscribe(self, channels):
+        return RedisSubscription(self.client, [self.PREFIX + channel for channel in channels])
+
+
+class LiveEvents:
+    """Flask extension wrapping the configured event broker"""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        # Kept per app, like the slot hold store
+        backend = app.config.get('LIVE_EVENTS_BACKEND', 'redis')
+        if backend == 'memory':
+            app.extensions['live_events'] = MemoryEventBroker()
+        else:
+            app.extensions['live_events'] = RedisEventBroker(app.config['LIVE_EVENTS_REDIS_URL'])
+
+    @property
+    def broker(self):
+        """Event broker of the current app"""
+        return current_app.extensions['live_events']
+
+    def publish(self, channels, event_type, data):
+        """Send one event to each channel; failures are logged, never raised"""
+        message = _frame(event_type, current_app.json.dumps(data))
+        for channel in channels:
+            try:
+                self.broker.publish(channel, message)
+            except Exception as e:
+                # Live updates are best effort; clients resync on reconnect
+                current_app.logger.warning(f"Live event broker unavailable: {str(e)}")
+                return
+
+    def stream(self, channels, heartbeat=None, lifetime=None):
+        """
+        Generator of SSE frames for `channels` until the client disconnects
+        or `lifetime` seconds (defaults to LIVE_EVENTS_STREAM_SECONDS) have
+        passed; the client then reconnects. A comment line is sent every
+        `heartbeat` seconds (defaults to LIVE_EVENTS_HEARTBEAT_SECONDS) to
+        keep proxies from closing the connection.
+        """
+        heartbeat = heartbeat or current_app.config.get('LIVE_EVENTS_HEARTBEAT_SECONDS', 15)
+        lifetime = lifetime or current_app.config.get('LIVE_EVENTS_STREAM_SECONDS', 60)
+        subscription = self.broker.subscribe(list(channels))
+
+        def generate():
+            deadline = _time.monotonic() + lifetime
+            try:
+                yield 'retry: 3000\n\n'
+                while True:
+                    remaining = deadline - _time.monotonic()
+                    if remaining <= 0:
+                        return
+                    message = subscription.get(min(heartbeat, remaining))
+                    yield message if message is not None else ': keep-alive\n\n'
+            finally:
+                subscription.close()
+        return generate()
+
+
+live_events = LiveEvents()
+
+
+# Appointment columns sent with every appointment event
+APPOINTMENT_EVENT_FIELDS = ('id', 'doctor_id', 'patient_id', 'appointment_date', 'appointment_time',
+                            'status', 'priority', 'is_deleted')
+
+
+def queue_event(session, channels, event_type, data):
+    """Publish an event once the session's transaction commits"""
+    session.info.setdefault('live_events', []).append((list(channels), event_type, data))
+
+
+def appointment_event(appointment, action, old_doctor_id=None):
+    """
+    (channels, data) for an appointment change. `appointment` is an
+    Appointment or a mapping of its column values (e.g. a bulk-inserted row).
+    """
+    if isinstance(appointment, Mapping):
+        values = appointment
+    else:
+        values = {name: getattr(appointment, name) for name in APPOINTMENT_EVENT_FIELDS}
+    doctor_id = values['doctor_id']
+    channels = ['appointments', f'doctor:{doctor_id}', f"patient:{values['patient_id']}"]
+    if old_doctor_id is not None and old_doctor_id != doctor_id:
+        channels.append(f'doctor:{old_doctor_id}')
+    data = {name: values[name] for name in APPOINTMENT_EVENT_FIELDS}
+    data['action'] = action
+    data['appointment_time'] = data['appointment_time'].strftime('%H:%M')
+    return channels, data
+
+
+def triage_event(assessment, action):
+    """(channels, data) for a triage assessment change"""
+    channels = ['triage']
+    if assessment.assigned_doctor_id:
+        channels.append(f'doctor:{assessment.assigned_doctor_id}')
+    return channels, {
+        'id': assessment.id,
+        'action': action,
+        'patient_name': assessment.patient_name,
+        'priority_level': assessment.priority_level,
+        'recommended_specialization': assessment.recommended_specialization,
+        'status': assessment.status,
+        'assigned_doctor_id': assessment.assigned_doctor_id,
+        'appointment_id': assessment.appointment_id
+    }
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_live_events(session, flush_context):
+    from models.appointment import Appointment
+    from models.triage_assessment import TriageAssessment
+
+    changed = [(obj, 'created') for obj in session.new]
+    changed += [(obj, 'updated') for obj in session.dirty
+                if session.is_modified(obj, include_collections=False)]
+    for obj, action in changed:
+        if isinstance(obj, Appointment):
+            history = inspect(obj).attrs.doctor_id.history
+            channels, data = appointment_event(obj, action, history.deleted[0] if history.deleted else None)
+            queue_event(session, channels, 'appointment', data)
+        elif isinstance(obj, TriageAssessment):
+            channels, data = triage_event(obj, action)
+            queue_event(session, channels, 'triage_assessment', data)
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_after_commit(session):
+    pending = session.info.pop('live_events', None)
+    if not pending or not has_app_context() or 'live_events' not in current_app.extensions:
+        return
+    for channels, event_type, data in pending:
+        live_events.publish(channels, event_type, data)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_after_rollback(session):
+    session.info.pop('live_events', None)
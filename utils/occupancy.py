@@ -0,0 +1,219 @@
+"""
+Occupancy bitmaps for doctor schedules
+
+Each doctor-day is encoded as a row of fixed-size cells (SCHEDULE_CELL_MINUTES,
+default 5 minutes). Availability and bookings become boolean matrices of shape
+(doctors, days, cells) so free-slot search, utilisation and multi-doctor
+"first fit" are single vectorized NumPy passes instead of per-appointment loops.
+"""
+from datetime import datetime, timedelta
+import numpy as np
+from flask import current_app
+from extensions import db
+from utils.scheduling import expand_availability
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def _minutes(t):
+    return t.hour * 60 + t.minute + t.second / 60.0
+
+
+class OccupancyGrid:
+    """
+    Availability and booking bitmaps for a set of doctors over a date window.
+
+    Attributes:
+        doctor_ids: List of doctor ids (row order of the matrices)
+        dates: List of datetime.date (second axis)
+        cell_minutes: Minutes represented by one cell
+        available: bool array (doctors, days, cells) - inside an availability block
+        booked: bool array (doctors, days, cells) - covered by an active appointment
+        held: bool array (doctors, days, cells) - covered by a live slot hold
+    """
+
+    def __init__(self, doctor_ids, dates, cell_minutes, available, booked, held=None):
+        self.doctor_ids = doctor_ids
+        self.dates = dates
+        self.cell_minutes = cell_minutes
+        self.available = available
+        self.booked = booked
+        self.held = held if held is not None else np.zeros_like(booked)
+
+    @property
+    def free(self):
+        """Cells that are available and neither booked nor held"""
+        return self.available & ~self.booked & ~self.held
+
+    def _cells_for(self, duration):
+        return max(1, -(-duration // self.cell_minutes))  # ceil division
+
+    def fit_mask(self, duration, not_before=None):
+        """
+        Boolean array (doctors, days, cells) marking cells where a slot of
+        `duration` minutes can start and stay free for its whole length.
+        `duration` is one length for every doctor or a dict of doctor_id -> minutes.
+        """
+        free = self.free
+        n_doctors, n_days, n_cells = free.shape
+        if isinstance(duration, dict):
+            cells = np.array([self._cells_for(duration[doctor_id]) for doctor_id in self.doctor_ids],
+                             dtype=np.intp)
+        else:
+            cells = np.full(n_doctors, self._cells_for(duration), dtype=np.intp)
+        fits = np.zeros_like(free)
+
+        # Sliding-window sum via cumulative sums along the cell axis, one
+        # pass per distinct slot length
+        cs = np.zeros((n_doctors, n_days, n_cells + 1), dtype=np.int32)
+        np.cumsum(free, axis=2, out=cs[:, :, 1:])
+        for k in np.unique(cells).tolist():
+            if k > n_cells:
+                continue
+            rows = cells == k
+            fits[rows, :, :n_cells - k + 1] = (cs[rows, :, k:] - cs[rows, :, :-k]) == k
+
+        if not_before is not None and self.dates:
+            day_offset = (not_before.date() - self.dates[0]).days
+            if day_offset > 0:
+                fits[:, :min(day_offset, n_days), :] = False
+            if 0 <= day_offset < n_days:
+                cutoff = -(-int(_minutes(not_before.time())) // self.cell_minutes)
+                fits[:, day_offset, :cutoff] = False
+        return fits
+
+    def _cell_datetime(self, day_index, cell_index):
+        return datetime.combine(self.dates[day_index], datetime.min.time()) + \
+            timedelta(minutes=int(cell_index) * self.cell_minutes)
+
+    def free_slots(self, doctor_id, duration, step=None, not_before=None):
+        """
+        Slot start datetimes for one doctor, stepping `step` minutes
+        (default `duration`) between consecutive starts inside a free run.
+        """
+        row = self.doctor_ids.index(doctor_id)
+        fits = self.fit_mask(duration, not_before)[row]
+        stride = self._cells_for(step or duration)
+        starts = []
+        for day_index in range(fits.shape[0]):
+            next_allowed = 0
+            for cell_index in np.flatnonzero(fits[day_index]):
+                if cell_index >= next_allowed:
+                    starts.append(self._cell_datetime(day_index, cell_index))
+                    next_allowed = cell_index + stride
+        return starts
+
+    def first_fit(self, duration, limit=1, not_before=None):
+        """
+        Earliest slot start for each doctor, ordered by time. `duration` is
+        one length for every doctor or a dict of doctor_id -> minutes.
+
+        Returns:
+            Up to `limit` (start datetime, doctor_id) tuples, one per doctor
+        """
+        fits = self.fit_mask(duration, not_before)
+        n_doctors, n_days, n_cells = fits.shape
+        flat = fits.reshape(n_doctors, n_days * n_cells)
+        has_fit = flat.any(axis=1)
+        first = flat.argmax(axis=1)  # index of first True per doctor
+        rows = np.flatnonzero(has_fit)
+        order = rows[np.argsort(first[rows], kind='stable')][:limit]
+        return [
+            (self._cell_datetime(*divmod(int(first[row]), n_cells)), self.doctor_ids[row])
+            for row in order
+        ]
+
+    def utilisation(self):
+        """
+        Booked share of available time per doctor.
+
+        Returns:
+            Dict of doctor_id -> {'available_minutes', 'booked_minutes', 'utilisation'}
+        """
+        available = self.available.sum(axis=(1, 2)) * self.cell_minutes
+        booked = (self.available & self.booked).sum(axis=(1, 2)) * self.cell_minutes
+        ratio = np.divide(booked, available, out=np.zeros(len(self.doctor_ids)), where=available > 0)
+        return {
+            doctor_id: {
+                'available_minutes': int(available[i]),
+                'booked_minutes': int(booked[i]),
+                'utilisation': round(float(ratio[i]), 4)
+            }
+            for i, doctor_id in enumerate(self.doctor_ids)
+        }
+
+
+def _paint(shape, rows, days, starts, ends):
+    """Mark [start, end) cell ranges using a difference array and one cumsum"""
+    diff = np.zeros((shape[0], shape[1], shape[2] + 1), dtype=np.int16)
+    if len(rows):
+        starts = np.clip(starts, 0, shape[2])
+        ends = np.clip(ends, 0, shape[2])
+        keep = ends > starts
+        np.add.at(diff, (rows[keep], days[keep], starts[keep]), 1)
+        np.add.at(diff, (rows[keep], days[keep], ends[keep]), -1)
+    return np.cumsum(diff, axis=2)[:, :, :-1] > 0
+
+
+def build_occupancy(doctor_ids, start_date, end_date, cell_minutes=None, held=None):
+    """
+    Build an OccupancyGrid from availability (rules + overrides) and active
+    appointments for the given doctors and inclusive date window. `held`
+    maps doctor_id to held (start, end) datetimes (see
+    SlotHolds.held_intervals_many); they block slots but are not counted
+    as booked time.
+    """
+    from models.appointment import Appointment
+
+    cell_minutes = cell_minutes or current_app.config.get('SCHEDULE_CELL_MINUTES', 5)
+    default_duration = current_app.config.get('APPOINTMENT_SLOT_DURATION', 30)
+    doctor_ids = list(doctor_ids)
+    dates = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+    shape = (len(doctor_ids), len(dates), MINUTES_PER_DAY // cell_minutes)
+    row_of = {doctor_id: i for i, doctor_id in enumerate(doctor_ids)}
+
+    # Availability: round inward so a cell is only available if fully covered
+    rows, days, starts, ends = [], [], [], []
+    for doctor_id, blocks in expand_availability(doctor_ids, start_date, end_date).items():
+        for b in blocks:
+            rows.append(row_of[doctor_id])
+            days.append((b.available_date - start_date).days)
+            starts.append(-(-int(_minutes(b.start_time)) // cell_minutes))
+            ends.append(int(_minutes(b.end_time)) // cell_minutes)
+    available = _paint(shape, np.array(rows, dtype=np.intp), np.array(days, dtype=np.intp),
+                       np.array(starts, dtype=np.intp), np.array(ends, dtype=np.intp))
+
+    # Bookings: round outward so partially covered cells count as busy
+    booked_rows = db.session.query(
+        Appointment.doctor_id,
+        Appointment.appointment_date,
+        Appointment.appointment_time,
+        Appointment.duration_minutes
+    ).filter(
+        Appointment.doctor_id.in_(doctor_ids),
+        Appointment.appointment_date >= start_date,
+        Appointment.appointment_date <= end_date,
+        Appointment.is_deleted == False,
+        Appointment.status != 'Canceled'
+    ).all() if doctor_ids else []
+
+    rows = np.array([row_of[r[0]] for r in booked_rows], dtype=np.intp)
+    days = np.array([(r[1] - start_date).days for r in booked_rows], dtype=np.intp)
+    start_minutes = np.array([_minutes(r[2]) for r in booked_rows], dtype=np.float64)
+    durations = np.array([r[3] or default_duration for r in booked_rows], dtype=np.float64)
+    booked = _paint(shape, rows, days,
+                    np.floor(start_minutes / cell_minutes).astype(np.intp),
+                    np.ceil((start_minutes + durations) / cell_minutes).astype(np.intp))
+
+    # Holds: round outward like bookings
+    intervals = [(row_of[doctor_id], start, end) for doctor_id, held_intervals in (held or {}).items()
+                 for start, end in held_intervals]
+    rows = np.array([row for row, _, _ in intervals], dtype=np.intp)
+    days = np.array([(start.date() - start_date).days for _, start, _ in intervals], dtype=np.intp)
+    start_minutes = np.array([_minutes(start.time()) for _, start, _ in intervals], dtype=np.float64)
+    lengths = np.array([(end - start).total_seconds() / 60 for _, start, end in intervals], dtype=np.float64)
+    held = _paint(shape, rows, days,
+                  np.floor(start_minutes / cell_minutes).astype(np.intp),
+                  np.ceil((start_minutes + lengths) / cell_minutes).astype(np.intp))
+
+    return OccupancyGrid(doctor_ids, dates, cell_minutes, available, booked, held)
@@ -0,0 +1,121 @@
+"""
+Keyset (cursor) pagination for API list endpoints
+
+Pages are selected with a row-value comparison on the ordering columns
+(WHERE (a, b, id) > (:a, :b, :id) ORDER BY a, b, id LIMIT n), so fetching
+page 1,000 costs the same index seek as page 1, unlike OFFSET.
+"""
+import base64
+import json
+from collections import namedtuple
+from datetime import date, time, datetime
+from flask import current_app, request, url_for
+from sqlalchemy import tuple_
+
+Page = namedtuple('Page', ['items', 'next_cursor'])
+
+
+def _dump(value):
+    if isinstance(value, (date, time, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _load(column, value):
+    python_type = column.type.python_type
+    if value is None:
+        return None
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    if python_type is time:
+        return time.fromisoformat(value)
+    return python_type(value)
+
+
+def encode_cursor(values):
+    """Opaque, URL-safe token for a row's ordering values"""
+    raw = json.dumps([_dump(v) for v in values], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token, columns):
+    """
+    Ordering values from a cursor token.
+
+    Raises:
+        ValueError: the token is malformed or was issued for another ordering
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError('Invalid cursor') from e
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise ValueError('Invalid cursor')
+    try:
+        return [_load(column, value) for column, value in zip(columns, values)]
+    except (ValueError, TypeError) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+def page_limit():
+    """`limit` query parameter clamped to API_MAX_PAGE_SIZE (default API_PAGE_SIZE)"""
+    default = current_app.config.get('API_PAGE_SIZE', 100)
+    maximum = current_app.config.get('API_MAX_PAGE_SIZE', 500)
+    limit = request.args.get('limit', default, type=int) or default
+    return min(max(limit, 1), maximum)
+
+
+def keyset_query(query, columns, limit, after=None):
+    """
+    `query` (a Query or select()) restricted to the page after `after`,
+    ordered by `columns`, fetching one extra row to detect a next page.
+
+    Raises:
+        ValueError: `after` is not a valid cursor
+    """
+    if after:
+        query = query.filter(tuple_(*columns) > tuple_(*decode_cursor(after, columns)))
+    return query.order_by(*columns).limit(limit + 1)
+
+
+def page_from_rows(rows, columns, limit):
+    """Page of the rows fetched with keyset_query()"""
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, column.key) for column in columns])
+    return Page(rows, next_cursor)
+
+
+def keyset_page(query, columns, limit, after=None):
+    """
+    Fetch one page of `query` ordered by `columns` (ascending; the last one
+    must be unique, e.g. the primary key).
+
+    Args:
+        query: SQLAlchemy query without ORDER BY/LIMIT
+        columns: Ordering columns
+        limit: Page size
+        after: Cursor token from a previous page's next_cursor
+
+    Returns:
+        Page(items, next_cursor); next_cursor is None on the last page
+
+    Raises:
+        ValueError: `after` is not a valid cursor
+    """
+    rows = keyset_query(query, columns, limit, after).all()
+    return page_from_rows(rows, columns, limit)
+
+
+def next_link(next_cursor):
+    """Absolute URL of the next page: the current request with `after` replaced"""
+    if not next_cursor:
+        return None
+    args = request.args.to_dict()
+    args['after'] = next_cursor
+    return url_for(request.endpoint, _external=True, **request.view_args, **args)
@@ -0,0 +1,201 @@
+"""
+Bulk rescheduling of appointments left outside a doctor's availability
+"""
+from bisect import bisect_left
+from collections import namedtuple
+from datetime import datetime, timedelta
+from flask import current_app
+from extensions import db
+from utils.intervals import ScheduleIndex
+from utils.scheduling import expand_availability, free_slot_streams
+
+
+# One applied move; dates/times are kept so notifications can show the old slot
+RescheduleMove = namedtuple('RescheduleMove', [
+    'appointment_id', 'old_doctor_id', 'old_date', 'old_time',
+    'new_doctor_id', 'new_date', 'new_time'
+])
+
+
+def find_stranded_appointments(doctor_id, now=None):
+    """
+    Upcoming booked appointments of a doctor that no longer fit inside any
+    availability block (e.g. after a day was unticked or a rule removed).
+
+    Returns:
+        List of Appointment in chronological order
+    """
+    from models.appointment import Appointment
+
+    if now is None:
+        now = datetime.now()
+    today = now.date()
+
+    upcoming = Appointment.query.filter(
+        Appointment.doctor_id == doctor_id,
+        Appointment.status == 'Booked',
+        Appointment.is_deleted == False,
+        db.or_(
+            Appointment.appointment_date > today,
+            db.and_(Appointment.appointment_date == today,
+                    Appointment.appointment_time >= now.time())
+        )
+    ).order_by(Appointment.appointment_date, Appointment.appointment_time).all()
+    if not upcoming:
+        return []
+
+    default_duration = current_app.config.get('APPOINTMENT_SLOT_DURATION', 30)
+    blocks_by_date = {}
+    for block in expand_availability([doctor_id], today, upcoming[-1].appointment_date)[doctor_id]:
+        blocks_by_date.setdefault(block.available_date, []).append(block)
+
+    stranded = []
+    for appointment in upcoming:
+        start = datetime.combine(appointment.appointment_date, appointment.appointment_time)
+        end = start + timedelta(minutes=appointment.duration_minutes or default_duration)
+        fits = any(
+            datetime.combine(block.available_date, block.start_time) <= start
+            and end <= datetime.combine(block.available_date, block.end_time)
+            for block in blocks_by_date.get(appointment.appointment_date, [])
+        )
+        if not fits:
+            stranded.append(appointment)
+    return stranded
+
+
+def _nearest_valid(starts, target, is_valid):
+    """Start closest to `target` (visiting outwards from it) that passes `is_valid`, or None"""
+    after = bisect_left(starts, target)
+    before = after - 1
+    while before >= 0 or after < len(starts):
+        if after < len(starts) and (before < 0 or starts[after] - target <= target - starts[before]):
+            candidate, after = starts[after], after + 1
+        else:
+            candidate, before = starts[before], before - 1
+        if is_valid(candidate):
+            return candidate
+    return None
+
+
+def bulk_reschedule(doctor_id, appointments=None, now=None, search_days=None):
+    """
+    Move every stranded appointment of a doctor to the nearest free slot.
+
+    The doctor's own free slots are preferred; when none is left, the nearest
+    slot of an active doctor with the same specialization is used. Candidate
+    start times for all doctors are computed once up front, and each
+    placement is checked against a per doctor-day interval tree (existing
+    bookings plus moves made so far) so mixed visit lengths never overlap.
+    The whole batch costs a fixed number of queries.
+
+    Moves are applied to the session but not committed, so the caller can
+    commit them together with the availability change that caused them.
+
+    Args:
+        doctor_id: Doctor whose availability changed
+        appointments: Appointments to move (defaults to find_stranded_appointments)
+        now: Slots starting before this datetime are never used (defaults to now)
+        search_days: Days past the last stranded appointment to search
+            (defaults to RESCHEDULE_SEARCH_DAYS)
+
+    Returns:
+        Tuple of (list of RescheduleMove, list of Appointment that could not be placed)
+    """
+    from models.doctor import Doctor
+
+    if now is None:
+        now = datetime.now()
+    if appointments is None:
+        appointments = find_stranded_appointments(doctor_id, now)
+    if not appointments:
+        return [], []
+
+    if search_days is None:
+        search_days = current_app.config.get('RESCHEDULE_SEARCH_DAYS', 14)
+
+    doctor = Doctor.query.get(doctor_id)
+    colleague_ids = [row[0] for row in db.session.query(Doctor.id).filter(
+        Doctor.specialization == doctor.specialization,
+        Doctor.id != doctor_id,
+        Doctor.is_deleted == False,
+        Doctor.is_active == True
+    ).order_by(Doctor.id).all()]
+    candidate_ids = [doctor_id] + colleague_ids
+
+    start_date = now.date()
+    end_date = max(a.appointment_date for a in appointments) + timedelta(days=search_days)
+    starts = {
+        candidate_id: [row[0] for row in stream]
+        for candidate_id, stream in free_slot_streams(candidate_ids, start_date, end_date,
+                                                      not_before=now).items()
+    }
+    block_spans = {}
+    for candidate_id, blocks in expand_availability(candidate_ids, start_date, end_date).items():
+        for block in blocks:
+            block_spans.setdefault((candidate_id, block.available_date), []).append(
+                (datetime.combine(block.available_date, block.start_time),
+                 datetime.combine(block.available_date, block.end_time))
+            )
+    booked = ScheduleIndex(candidate_ids, start_date, end_date)
+
+    def fits(candidate_id, start, minutes):
+        end = start + timedelta(minutes=minutes)
+        inside = any(block_start <= start and end <= block_end
+                     for block_start, block_end in block_spans.get((candidate_id, start.date()), []))
+        return inside and booked.conflict(candidate_id, start.date(), start.time(), minutes) is None
+
+    default_duration = current_app.config.get('APPOINTMENT_SLOT_DURATION', 30)
+    moves, unplaced = [], []
+    for appointment in sorted(appointments, key=lambda a: (a.appointment_date, a.appointment_time)):
+        target = datetime.combine(appointment.appointment_date, appointment.appointment_time)
+        minutes = appointment.duration_minutes or default_duration
+        # The appointment is leaving its old slot
+        booked.remove(appointment.doctor_id, appointment.appointment_date,
+                      appointment.appointment_time, appointment.id)
+
+        best = None
+        for candidate_id in candidate_ids:
+            start = _nearest_valid(starts.get(candidate_id, []), target,
+                                   lambda s: fits(candidate_id, s, minutes))
+            if start is None:
+                continue
+            if best is None or abs(start - target) < abs(best[1] - target):
+                best = (candidate_id, start)
+            if candidate_id == doctor_id:
+                # Keep the patient with their own doctor whenever possible
+                break
+
+        if best is None:
+            booked.add(appointment.doctor_id, appointment.appointment_date,
+                       appointment.appointment_time, minutes, appointment.id)
+            unplaced.append(appointment)
+            continue
+
+        new_doctor_id, new_start = best
+        booked.add(new_doctor_id, new_start.date(), new_start.time(), minutes, appointment.id)
+        moves.append(RescheduleMove(
+            appointment.id, appointment.doctor_id, appointment.appointment_date,
+            appointment.appointment_time, new_doctor_id, new_start.date(), new_start.time()
+        ))
+        appointment.doctor_id = new_doctor_id
+        appointment.appointment_date = new_start.date()
+        appointment.appointment_time = new_start.time()
+
+    return moves, unplaced
+
+
+def queue_reschedule_notifications(moves):
+    """Queue one Celery job that emails every patient whose appointment moved"""
+    if not moves:
+        return
+    payload = [{
+        'appointment_id': move.appointment_id,
+        'old_doctor_id': move.old_doctor_id,
+        'old_date': move.old_date.isoformat(),
+        'old_time': move.old_time.strftime('%H:%M')
+    } for move in moves]
+    try:
+        from tasks import send_reschedule_notifications
+        send_reschedule_notifications.delay(payload)
+    except Exception as e:
+        print(f"Warning: Could not queue reschedule emails: {str(e)}")
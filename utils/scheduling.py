@@ -0,0 +1,449 @@
+"""
+Scheduling helpers: availability expansion, free-slot computation and its cache
+"""
+import heapq
+import time as _time
+from itertools import groupby, islice
+from operator import itemgetter
+from collections import namedtuple
+from datetime import datetime, timedelta
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+from extensions import db, cache
+from utils.slot_holds import slot_holds
+
+
+def _default_duration():
+    return current_app.config.get('APPOINTMENT_SLOT_DURATION', 30)
+
+
+def _visit_minutes(minutes, specialization):
+    if minutes:
+        return minutes
+    defaults = current_app.config.get('SPECIALIZATION_VISIT_MINUTES', {})
+    return defaults.get(specialization) or _default_duration()
+
+
+def visit_minutes(doctor):
+    """
+    Default visit length for a doctor: the doctor's own setting, else the
+    specialization default (SPECIALIZATION_VISIT_MINUTES), else
+    APPOINTMENT_SLOT_DURATION.
+    """
+    return _visit_minutes(doctor.default_visit_minutes, doctor.specialization)
+
+
+def visit_minutes_for(doctor_ids):
+    """Default visit length for several doctors in one query (see visit_minutes)"""
+    from models.doctor import Doctor
+
+    doctor_ids = list(doctor_ids)
+    result = {doctor_id: _default_duration() for doctor_id in doctor_ids}
+    if doctor_ids:
+        result.update(
+            (doctor_id, _visit_minutes(minutes, specialization))
+            for doctor_id, minutes, specialization in db.session.query(
+                Doctor.id, Doctor.default_visit_minutes, Doctor.specialization
+            ).filter(Doctor.id.in_(doctor_ids)).all()
+        )
+    return result
+
+
+# A concrete availability window for one doctor on one date. `id` is the
+# override row id, or 'rule-<rule id>-<date>' for blocks expanded from a rule.
+AvailabilityBlock = namedtuple('AvailabilityBlock',
+                               ['id', 'doctor_id', 'available_date', 'start_time', 'end_time'])
+
+
+def availability_statements(doctor_ids, start_date, end_date):
+    """
+    (rules, overrides) SELECTs behind expand_availability(): the weekly
+    rules in effect during the window and the override rows inside it.
+    """
+    from models.doctor_availability import DoctorAvailability
+    from models.doctor_availability_rule import DoctorAvailabilityRule
+
+    rules = select(DoctorAvailabilityRule).where(
+        DoctorAvailabilityRule.doctor_id.in_(doctor_ids),
+        DoctorAvailabilityRule.effective_from <= end_date,
+        db.or_(
+            DoctorAvailabilityRule.effective_until == None,
+            DoctorAvailabilityRule.effective_until >= start_date
+        )
+    ).order_by(DoctorAvailabilityRule.start_time)
+
+    overrides = select(
+        DoctorAvailability.id,
+        DoctorAvailability.doctor_id,
+        DoctorAvailability.available_date,
+        DoctorAvailability.start_time,
+        DoctorAvailability.end_time,
+        DoctorAvailability.is_available
+    ).where(
+        DoctorAvailability.doctor_id.in_(doctor_ids),
+        DoctorAvailability.available_date >= start_date,
+        DoctorAvailability.available_date <= end_date
+    ).order_by(DoctorAvailability.start_time)
+    return rules, overrides
+
+
+def build_availability(doctor_ids, start_date, end_date, rules, overrides):
+    """
+    Concrete blocks from fetched rules and override rows (see
+    availability_statements); for each date, any override rows replace the
+    doctor's rules for that day.
+    """
+    result = {doctor_id: [] for doctor_id in doctor_ids}
+
+    rules_by_doctor = {}
+    for rule in rules:
+        rules_by_doctor.setdefault(rule.doctor_id, []).append(rule)
+
+    overrides_by_day = {}
+    for row in overrides:
+        overrides_by_day.setdefault((row.doctor_id, row.available_date), []).append(row)
+
+    days = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+    for doctor_id in doctor_ids:
+        doctor_rules = rules_by_doctor.get(doctor_id, [])
+        blocks = result[doctor_id]
+        for day in days:
+            day_overrides = overrides_by_day.get((doctor_id, day))
+            if day_overrides is not None:
+                blocks.extend(
+                    AvailabilityBlock(row.id, doctor_id, day, row.start_time, row.end_time)
+                    for row in day_overrides if row.is_available
+                )
+            else:
+                blocks.extend(
+                    AvailabilityBlock(f'rule-{rule.id}-{day.isoformat()}', doctor_id, day,
+                                      rule.start_time, rule.end_time)
+                    for rule in doctor_rules if rule.applies_to(day)
+                )
+    return result
+
+
+def expand_availability(doctor_ids, start_date, end_date):
+    """
+    Expand weekly availability rules and date overrides into concrete blocks.
+
+    Two queries are issued regardless of the window size: the rules in effect
+    during the window and the override rows inside it. For each date, any
+    override rows replace the doctor's rules for that day.
+
+    Args:
+        doctor_ids: Iterable of doctor ids
+        start_date, end_date: datetime.date window (inclusive)
+
+    Returns:
+        Dict of doctor_id -> list of AvailabilityBlock sorted by date and start time
+    """
+    doctor_ids = list(doctor_ids)
+    if not doctor_ids or end_date < start_date:
+        return {doctor_id: [] for doctor_id in doctor_ids}
+
+    rules, overrides = availability_statements(doctor_ids, start_date, end_date)
+    return build_availability(doctor_ids, start_date, end_date,
+                              db.session.scalars(rules).all(),
+                              db.session.execute(overrides).all())
+
+
+def get_availability(doctor_id, start_date, end_date):
+    """Concrete availability blocks for a single doctor (see expand_availability)"""
+    return expand_availability([doctor_id], start_date, end_date)[doctor_id]
+
+
+def booked_statement(doctor_id, start_date, end_date):
+    """Ordered (date, time, duration_minutes) of a doctor's active appointments in a window"""
+    from models.appointment import Appointment
+
+    return select(
+        Appointment.appointment_date,
+        Appointment.appointment_time,
+        Appointment.duration_minutes
+    ).where(
+        Appointment.doctor_id == doctor_id,
+        Appointment.appointment_date >= start_date,
+        Appointment.appointment_date <= end_date,
+        Appointment.is_deleted == False,
+        Appointment.status != 'Canceled'
+    ).order_by(Appointment.appointment_date, Appointment.appointment_time)
+
+
+def free_slots_from(blocks, booked, duration, held=(), not_before=None):
+    """
+    Free slots from one doctor's availability blocks and booked rows
+    (booked_statement), treating `held` (start, end) intervals as busy.
+    """
+    if not_before is None:
+        not_before = datetime.now()
+    busy = _busy_intervals(booked, duration)
+    if held:
+        busy = list(heapq.merge(busy, held))
+    blocks = [(b.available_date, b.start_time, b.end_time) for b in blocks]
+    return list(_sweep_free_slots(blocks, busy, timedelta(minutes=duration), not_before))
+
+
+def compute_free_slots(doctor_id, start_date, end_date, duration=None, not_before=None,
+                       holds=True):
+    """
+    Compute bookable slots for a doctor between start_date and end_date (inclusive).
+
+    Availability blocks (expanded from weekly rules and overrides) and active
+    appointments are fetched as ordered column-only data and merged in a single sorted sweep: a cursor walks
+    each block in `duration` steps and jumps past any appointment it meets.
+
+    Args:
+        doctor_id: Doctor id
+        start_date, end_date: datetime.date window (inclusive)
+        duration: Slot length in minutes (defaults to the doctor's visit length)
+        not_before: datetime; slots starting earlier are skipped (defaults to now)
+        holds: Treat slots currently held by other patients as busy
+
+    Returns:
+        List of (date, start_time, end_time) tuples in chronological order
+    """
+    duration = duration or visit_minutes_for([doctor_id])[doctor_id]
+    blocks = get_availability(doctor_id, start_date, end_date)
+    booked = db.session.execute(booked_statement(doctor_id, start_date, end_date)).all()
+    held = slot_holds.held_intervals(doctor_id, start_date, end_date, minutes=duration) if holds else ()
+    return free_slots_from(blocks, booked, duration, held, not_before)
+
+
+def _busy_intervals(booked, duration):
+    """Turn ordered (date, time, duration_minutes) rows into (start, end) datetimes"""
+    return [
+        (datetime.combine(d, t), datetime.combine(d, t) + timedelta(minutes=m or duration))
+        for d, t, m in booked
+    ]
+
+
+def _sweep_free_slots(blocks, busy, step, not_before):
+    """
+    Lazily yield (date, start_time, end_time) free slots.
+
+    Both `blocks` (date, start, end) and `busy` (start, end) must be sorted
+    by start; each list is walked once.
+    """
+    i = 0
+    for block_date, block_start, block_end in blocks:
+        cursor = datetime.combine(block_date, block_start)
+        limit = datetime.combine(block_date, block_end)
+
+        # Appointments that finished before this block can never matter again
+        while i < len(busy) and busy[i][1] <= cursor:
+            i += 1
+
+        j = i
+        while cursor + step <= limit:
+            while j < len(busy) and busy[j][1] <= cursor:
+                j += 1
+            if j < len(busy) and busy[j][0] < cursor + step:
+                cursor = max(cursor, busy[j][1])
+                continue
+            if cursor >= not_before:
+                yield block_date, cursor.time(), (cursor + step).time()
+            cursor += step
+
+
+def find_earliest_slots(specialization=None, priority=None, start_date=None, end_date=None,
+                        limit=5, duration=None, not_before=None):
+    """
+    Find the `limit` earliest open slots across all doctors of a specialization.
+
+    Availability and appointments for every matching doctor are fetched in a
+    fixed number of queries, turned into one lazy free-slot stream per doctor, and combined with
+    a k-way heap merge so only the first `limit` slots are ever generated.
+
+    Args:
+        specialization: Case-insensitive substring match (None = all doctors)
+        priority: Triage priority; sets the default horizon (TRIAGE_SEARCH_HORIZON_DAYS)
+        start_date, end_date: datetime.date window (inclusive)
+        limit: Number of slots to return
+        duration: Slot length in minutes (defaults to each doctor's visit length)
+
+    Returns:
+        List of (doctor, date, start_time, end_time) tuples, earliest first
+    """
+    from models.doctor import Doctor
+
+    if not_before is None:
+        not_before = datetime.now()
+    if start_date is None:
+        start_date = not_before.date()
+    if end_date is None:
+        horizons = current_app.config.get('TRIAGE_SEARCH_HORIZON_DAYS', {})
+        end_date = start_date + timedelta(days=horizons.get(priority, 30))
+
+    doctor_query = db.session.query(Doctor.id).filter(
+        Doctor.is_deleted == False,
+        Doctor.is_active == True
+    )
+    if specialization:
+        doctor_query = doctor_query.filter(Doctor.specialization.ilike(f'%{specialization}%'))
+    doctor_ids = [row[0] for row in doctor_query.all()]
+    if not doctor_ids:
+        return []
+
+    streams = free_slot_streams(doctor_ids, start_date, end_date, duration, not_before)
+    earliest = list(islice(heapq.merge(*streams.values()), limit))
+
+    doctors = {
+        d.id: d for d in Doctor.query.filter(Doctor.id.in_({row[1] for row in earliest})).all()
+    } if earliest else {}
+    return [
+        (doctors[doctor_id], slot_date, slot_start, slot_end)
+        for _, doctor_id, slot_date, slot_start, slot_end in earliest
+    ]
+
+
+def free_slot_streams(doctor_ids, start_date, end_date, duration=None, not_before=None):
+    """
+    Lazy free-slot generators for several doctors, built from a fixed number of queries.
+
+    Without an explicit `duration`, each doctor's stream uses that doctor's
+    visit length (see visit_minutes).
+
+    Returns:
+        Dict of doctor_id -> generator of (start datetime, doctor_id, date, start_time, end_time),
+        each in chronological order (doctors without availability are omitted)
+    """
+    from models.appointment import Appointment
+
+    doctor_ids = list(doctor_ids)
+    durations = (dict.fromkeys(doctor_ids, duration) if duration
+                 else visit_minutes_for(doctor_ids))
+    if not_before is None:
+        not_before = datetime.now()
+
+    availability = expand_availability(doctor_ids, start_date, end_date)
+
+    booked = db.session.query(
+        Appointment.doctor_id,
+        Appointment.appointment_date,
+        Appointment.appointment_time,
+        Appointment.duration_minutes
+    ).filter(
+        Appointment.doctor_id.in_(doctor_ids),
+        Appointment.appointment_date >= start_date,
+        Appointment.appointment_date <= end_date,
+        Appointment.is_deleted == False,
+        Appointment.status != 'Canceled'
+    ).order_by(
+        Appointment.doctor_id,
+        Appointment.appointment_date,
+        Appointment.appointment_time
+    ).all()
+
+    busy_by_doctor = {
+        doctor_id: _busy_intervals([row[1:] for row in rows], durations[doctor_id])
+        for doctor_id, rows in groupby(booked, key=itemgetter(0))
+    }
+
+    held_by_doctor = slot_holds.held_intervals_many(doctor_ids, start_date, end_date, minutes=durations)
+
+    def stream(doctor_id, doctor_blocks):
+        step = timedelta(minutes=durations[doctor_id])
+        busy = list(heapq.merge(busy_by_doctor.get(doctor_id, []), held_by_doctor[doctor_id]))
+        for slot_date, slot_start, slot_end in _sweep_free_slots(doctor_blocks, busy, step, not_before):
+            yield datetime.combine(slot_date, slot_start), doctor_id, slot_date, slot_start, slot_end
+
+    return {
+        doctor_id: stream(doctor_id, [(b.available_date, b.start_time, b.end_time) for b in blocks])
+        for doctor_id, blocks in availability.items() if blocks
+    }
+
+
+# ============= FREE-SLOT CACHE =============
+
+def _version_key(doctor_id):
+    return f'free_slots_version_{doctor_id}'
+
+
+def free_slots_cache_key(doctor_id, start_date, end_date, duration):
+    """Cache key for a free-slot window; changes whenever the doctor's version is bumped"""
+    version = cache.get(_version_key(doctor_id)) or 0
+    return f'free_slots_{doctor_id}_{version}_{start_date.isoformat()}_{end_date.isoformat()}_{duration}'
+
+
+def invalidate_free_slots(doctor_id):
+    """Drop every cached free-slot window for a doctor"""
+    if not has_app_context():
+        return
+    try:
+        cache.set(_version_key(doctor_id), _time.time_ns(), timeout=0)
+    except Exception as e:
+        current_app.logger.warning(f"Failed to invalidate free-slot cache: {str(e)}")
+
+
+def get_free_slots(doctor_id, start_date, end_date, duration=None, holder=None):
+    """
+    Cached wrapper around compute_free_slots().
+
+    Holds change far more often than bookings, so the cached list ignores
+    them and live holds (except those owned by `holder`) are filtered out
+    on every read.
+    """
+    duration = duration or visit_minutes_for([doctor_id])[doctor_id]
+    try:
+        key = free_slots_cache_key(doctor_id, start_date, end_date, duration)
+        slots = cache.get(key)
+    except Exception as e:
+        current_app.logger.warning(f"Free-slot cache unavailable: {str(e)}")
+        slots = None
+        key = None
+
+    if slots is None:
+        slots = compute_free_slots(doctor_id, start_date, end_date, duration, holds=False)
+        # Short timeout bounds how stale the "not before now" cut-off can get
+        if key is not None:
+            try:
+                cache.set(key, slots, timeout=60)
+            except Exception as e:
+                current_app.logger.warning(f"Failed to cache free slots: {str(e)}")
+
+    held = slot_holds.held_intervals(doctor_id, start_date, end_date,
+                                     exclude_holder=holder, minutes=duration)
+    if not held:
+        return slots
+    return [
+        (slot_date, slot_start, slot_end) for slot_date, slot_start, slot_end in slots
+        if not any(start < datetime.combine(slot_date, slot_end)
+                   and datetime.combine(slot_date, slot_start) < end for start, end in held)
+    ]
+
+
+# Collect doctors whose schedule changed during a flush and invalidate
+# their cached slots once the transaction has committed.
+
+def _track_doctor(session, doctor_id):
+    if doctor_id is not None:
+        session.info.setdefault('free_slot_doctors', set()).add(int(doctor_id))
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_schedule_changes(session, flush_context):
+    from models.appointment import Appointment
+    from models.doctor_availability import DoctorAvailability
+    from models.doctor_availability_rule import DoctorAvailabilityRule
+
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, (Appointment, DoctorAvailability, DoctorAvailabilityRule)):
+            _track_doctor(session, obj.doctor_id)
+            # A moved appointment frees time on the previous doctor as well
+            for old_doctor_id in inspect(obj).attrs.doctor_id.history.deleted:
+                _track_doctor(session, old_doctor_id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(session):
+    doctor_ids = session.info.pop('free_slot_doctors', None)
+    if doctor_ids:
+        for doctor_id in doctor_ids:
+            invalidate_free_slots(doctor_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_after_rollback(session):
+    session.info.pop('free_slot_doctors', None)
@@ -0,0 +1,227 @@
+"""
+Short-lived slot holds taken while a patient fills in the booking form
+
+A hold reserves one (doctor, date, time) slot for a holder (e.g. 'user-12')
+for SLOT_HOLD_SECONDS. Holds live in Redis so every worker sees them; the
+in-process store is used when SLOT_HOLD_BACKEND = 'memory' (tests, single
+process development).
+"""
+import threading
+import time as _time
+from datetime import datetime, timedelta
+from flask import current_app
+
+
+def holder_for(user):
+    """Hold owner id for a logged-in user"""
+    return holder_for_user_id(user.id)
+
+
+def holder_for_user_id(user_id):
+    """Hold owner id for a user id (e.g. from the session, without loading the user)"""
+    return f'user-{user_id}'
+
+
+def _slot_key(slot_date, slot_time):
+    return f"{slot_date.isoformat()}T{slot_time.strftime('%H:%M')}"
+
+
+class MemorySlotHoldStore:
+    """In-process hold store; expired holds are purged lazily"""
+
+    def __init__(self):
+        self._holds = {}  # doctor_id -> {slot_key: (holder, expires_at)}
+        self._lock = threading.Lock()
+
+    def _live(self, doctor_id, now):
+        holds = self._holds.get(doctor_id, {})
+        for key in [k for k, (_, expires_at) in holds.items() if expires_at <= now]:
+            del holds[key]
+        return holds
+
+    def acquire(self, doctor_id, slot_key, holder, seconds):
+        now = _time.time()
+        with self._lock:
+            holds = self._live(doctor_id, now)
+            current = holds.get(slot_key)
+            if current and current[0] != holder:
+                return False
+            self._holds.setdefault(doctor_id, holds)[slot_key] = (holder, now + seconds)
+            return True
+
+    def release(self, doctor_id, slot_key, holder):
+        with self._lock:
+            holds = self._live(doctor_id, _time.time())
+            if holds.get(slot_key, (None,))[0] == holder:
+                del holds[slot_key]
+
+    def holds(self, doctor_id):
+        return self.holds_many([doctor_id])[doctor_id]
+
+    def holds_many(self, doctor_ids):
+        now = _time.time()
+        with self._lock:
+            return {doctor_id: {key: holder for key, (holder, _) in self._live(doctor_id, now).items()}
+                    for doctor_id in doctor_ids}
+
+
+class RedisSlotHoldStore:
+    """
+    Redis hold store. Each hold is a key with a TTL (so expiry is handled by
+    Redis); a per-doctor sorted set scored by expiry lists the live holds.
+    """
+
+    _ACQUIRE = """
+    local current = redis.call('GET', KEYS[1])
+    if current and current ~= ARGV[1] then
+        return 0
+    end
+    redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+    redis.call('ZADD', KEYS[2], ARGV[3], ARGV[4])
+    return 1
+    """
+
+    _RELEASE = """
+    if redis.call('GET', KEYS[1]) == ARGV[1] then
+        redis.call('DEL', KEYS[1])
+        redis.call('ZREM', KEYS[2], ARGV[2])
+    end
+    return 0
+    """
+
+    def __init__(self, url):
+        import redis
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self._acquire = self.client.register_script(self._ACQUIRE)
+        self._release = self.client.register_script(self._RELEASE)
+
+    @staticmethod
+    def _keys(doctor_id, slot_key):
+        return f'slot_hold:{doctor_id}:{slot_key}', f'slot_holds:{doctor_id}'
+
+    def acquire(self, doctor_id, slot_key, holder, seconds):
+        hold_key, index_key = self._keys(doctor_id, slot_key)
+        return bool(self._acquire(keys=[hold_key, index_key],
+                                  args=[holder, seconds, _time.time() + seconds, slot_key]))
+
+    def release(self, doctor_id, slot_key, holder):
+        hold_key, index_key = self._keys(doctor_id, slot_key)
+        self._release(keys=[hold_key, index_key], args=[holder, slot_key])
+
+    def holds(self, doctor_id):
+        return self.holds_many([doctor_id])[doctor_id]
+
+    def holds_many(self, doctor_ids):
+        """Live holds of several doctors in two round trips"""
+        doctor_ids = list(doctor_ids)
+        now = _time.time()
+        pipe = self.client.pipeline()
+        for doctor_id in doctor_ids:
+            index_key = f'slot_holds:{doctor_id}'
+            pipe.zremrangebyscore(index_key, '-inf', now)
+            pipe.zrangebyscore(index_key, now, '+inf')
+        indexed = [(doctor_id, key) for doctor_id, slot_keys in zip(doctor_ids, pipe.execute()[1::2])
+                   for key in slot_keys]
+        result = {doctor_id: {} for doctor_id in doctor_ids}
+        if not indexed:
+            return result
+        holders = self.client.mget([self._keys(doctor_id, key)[0] for doctor_id, key in indexed])
+        # A hold refreshed by its owner may outlive its index score, and a
+        # key may expire before the index is trimmed: trust the key itself.
+        for (doctor_id, key), holder in zip(indexed, holders):
+            if holder:
+                result[doctor_id][key] = holder
+        return result
+
+
+class SlotHolds:
+    """Flask extension wrapping the configured hold store"""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        # The store is kept per app, so creating a second app (e.g. the
+        # Celery worker's) does not re-point the one already serving requests
+        backend = app.config.get('SLOT_HOLD_BACKEND', 'redis')
+        if backend == 'memory':
+            app.extensions['slot_holds'] = MemorySlotHoldStore()
+        else:
+            app.extensions['slot_holds'] = RedisSlotHoldStore(app.config['SLOT_HOLD_REDIS_URL'])
+
+    @property
+    def store(self):
+        """Hold store of the current app"""
+        return current_app.extensions['slot_holds']
+
+    def hold(self, doctor_id, slot_date, slot_time, holder, seconds=None):
+        """
+        Reserve a slot for `holder`, or refresh the holder's existing hold.
+
+        Returns:
+            True if the slot is now held by `holder`, False if someone else holds it
+        """
+        seconds = seconds or current_app.config.get('SLOT_HOLD_SECONDS', 300)
+        try:
+            return self.store.acquire(doctor_id, _slot_key(slot_date, slot_time), holder, int(seconds))
+        except Exception as e:
+            # Holds are an optimisation; the unique index still guards bookings
+            current_app.logger.warning(f"Slot hold store unavailable: {str(e)}")
+            return True
+
+    def release(self, doctor_id, slot_date, slot_time, holder):
+        """Drop a hold if it belongs to `holder`"""
+        try:
+            self.store.release(doctor_id, _slot_key(slot_date, slot_time), holder)
+        except Exception as e:
+            current_app.logger.warning(f"Slot hold store unavailable: {str(e)}")
+
+    def holder_of(self, doctor_id, slot_date, slot_time):
+        """Current holder of a slot, or None"""
+        return self.holds(doctor_id).get(_slot_key(slot_date, slot_time))
+
+    def holds(self, doctor_id):
+        """Live holds for a doctor as {'YYYY-MM-DDTHH:MM': holder}"""
+        return self.holds_many([doctor_id])[doctor_id]
+
+    def holds_many(self, doctor_ids):
+        """Live holds for several doctors as {doctor_id: {'YYYY-MM-DDTHH:MM': holder}}"""
+        try:
+            return self.store.holds_many(doctor_ids)
+        except Exception as e:
+            current_app.logger.warning(f"Slot hold store unavailable: {str(e)}")
+            return {doctor_id: {} for doctor_id in doctor_ids}
+
+    def held_intervals(self, doctor_id, start_date, end_date, exclude_holder=None, minutes=None):
+        """
+        Held slots inside a date window as sorted (start, end) datetimes,
+        ignoring holds owned by `exclude_holder`. Each hold covers `minutes`
+        (defaults to APPOINTMENT_SLOT_DURATION).
+        """
+        return self.held_intervals_many([doctor_id], start_date, end_date, exclude_holder,
+                                        {doctor_id: minutes})[doctor_id]
+
+    def held_intervals_many(self, doctor_ids, start_date, end_date, exclude_holder=None, minutes=None):
+        """
+        held_intervals() for several doctors from one store lookup, as
+        {doctor_id: intervals}. `minutes` maps doctor_id to hold length.
+        """
+        minutes = minutes or {}
+        default = current_app.config.get('APPOINTMENT_SLOT_DURATION', 30)
+        held = {}
+        for doctor_id, holds in self.holds_many(doctor_ids).items():
+            step = timedelta(minutes=minutes.get(doctor_id) or default)
+            intervals = []
+            for key, holder in holds.items():
+                if holder == exclude_holder:
+                    continue
+                start = datetime.strptime(key, '%Y-%m-%dT%H:%M')
+                if start_date <= start.date() <= end_date:
+                    intervals.append((start, start + step))
+            intervals.sort()
+            held[doctor_id] = intervals
+        return held
+
+
+slot_holds = SlotHolds()
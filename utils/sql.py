@@ -0,0 +1,47 @@
+"""
+Portable SQL expressions used by the scheduling queries
+"""
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+from sqlalchemy.types import Time
+
+
+class time_add_minutes(FunctionElement):
+    """
+    time_add_minutes(time_column, minutes) -> TIME
+
+    Adds a number of minutes to a TIME value inside the database so that
+    appointment end times can be compared without loading rows.
+    """
+    type = Time()
+    name = 'time_add_minutes'
+    inherit_cache = True
+
+
+@compiles(time_add_minutes)
+def _time_add_minutes_default(element, compiler, **kw):
+    time_expr, minutes = list(element.clauses)
+    return "(%s + %s * INTERVAL '1 minute')" % (
+        compiler.process(time_expr, **kw),
+        compiler.process(minutes, **kw)
+    )
+
+
+@compiles(time_add_minutes, 'sqlite')
+def _time_add_minutes_sqlite(element, compiler, **kw):
+    # SQLAlchemy stores SQLite TIME values as 'HH:MM:SS.ffffff'; keep the
+    # same text layout so string comparisons against bound times stay valid.
+    time_expr, minutes = list(element.clauses)
+    return "(strftime('%%H:%%M:%%S', %s, '+' || %s || ' minutes') || '.000000')" % (
+        compiler.process(time_expr, **kw),
+        compiler.process(minutes, **kw)
+    )
+
+
+@compiles(time_add_minutes, 'mysql')
+def _time_add_minutes_mysql(element, compiler, **kw):
+    time_expr, minutes = list(element.clauses)
+    return "ADDTIME(%s, SEC_TO_TIME(%s * 60))" % (
+        compiler.process(time_expr, **kw),
+        compiler.process(minutes, **kw)
+    )
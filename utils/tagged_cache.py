@@ -0,0 +1,136 @@
+"""
+Tag-invalidated caching with stale-while-revalidate
+
+A cached payload records the version of every tag it depends on (e.g.
+'appointments', 'patients'). Commits that insert, update or delete a tagged
+model bump that tag's version, which marks every payload depending on it
+stale. A stale payload keeps being served while one background job
+recomputes it, so readers never wait for the recompute; only a cold cache,
+an unreachable job queue or a refresh no worker picked up computes inline.
+"""
+import time as _time
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from extensions import cache
+
+# Model class name -> tag bumped when one of its rows changes
+MODEL_TAGS = {
+    'Appointment': 'appointments',
+    'Patient': 'patients',
+    'Doctor': 'doctors'
+}
+
+# How long one refresh job may run before another can be queued
+REFRESH_LOCK_SECONDS = 60
+
+
+def _tag_key(tag):
+    return f'cache_tag_{tag}'
+
+
+def tag_versions(tags):
+    """Current version of each tag (0 when never bumped)"""
+    values = cache.get_many(*[_tag_key(tag) for tag in tags])
+    return {tag: value or 0 for tag, value in zip(tags, values)}
+
+
+def bump_tags(tags):
+    """Mark every payload depending on `tags` stale"""
+    if not has_app_context():
+        return
+    now = _time.time_ns()
+    try:
+        cache.set_many({_tag_key(tag): now for tag in tags}, timeout=0)
+    except Exception as e:
+        current_app.logger.warning(f"Failed to bump cache tags: {str(e)}")
+
+
+def store(key, tags, compute, timeout=0):
+    """
+    Compute a payload and cache it with the tag versions read beforehand, so
+    a commit landing mid-computation still leaves the entry stale. The entry
+    expires after `timeout` seconds (0 = never).
+    """
+    versions = tag_versions(tags)
+    value = compute()
+    cache.set(key, {'versions': versions, 'stored_at': _time.time(), 'value': value}, timeout=timeout)
+    cache.delete(f'{key}_refreshing')
+    return value
+
+
+def cached_with_tags(key, tags, compute, refresh, max_age=None, timeout=0):
+    """
+    Cached result of `compute()`, revalidated by tag.
+
+    Args:
+        key: Cache key of the payload
+        tags: Tags the payload depends on
+        compute: Callable returning the (picklable) payload
+        refresh: Callable queueing a background store() of this key; called
+            at most once per REFRESH_LOCK_SECONDS while the entry is stale
+        max_age: Seconds after which an entry is revalidated even if no tag
+            moved (catches rows changed outside the ORM). An entry older
+            than max_age + REFRESH_LOCK_SECONDS is recomputed inline, so
+            data stays bounded when no worker picks up the refresh.
+        timeout: Seconds before the cache drops the entry (0 = never)
+
+    Returns:
+        The cached payload, possibly stale while a refresh is pending
+    """
+    try:
+        entry = cache.get(key)
+        overdue = False
+        if entry is not None:
+            age = _time.time() - entry['stored_at']
+            stale = entry['versions'] != tag_versions(tags) or (max_age is not None and age > max_age)
+            overdue = max_age is not None and age > max_age + REFRESH_LOCK_SECONDS
+            if not stale:
+                return entry['value']
+            if not overdue and not cache.add(f'{key}_refreshing', 1, timeout=REFRESH_LOCK_SECONDS):
+                return entry['value']
+    except Exception as e:
+        current_app.logger.warning(f"Tagged cache unavailable: {str(e)}")
+        return compute()
+
+    if entry is None or overdue:
+        # Cold cache, or a queued refresh never ran (e.g. no worker)
+        return store(key, tags, compute, timeout)
+    try:
+        refresh()
+    except Exception as e:
+        # No broker to hand the job to; recompute now rather than serve stale data indefinitely
+        current_app.logger.warning(f"Could not queue cache refresh for {key}: {str(e)}")
+        return store(key, tags, compute, timeout)
+    return entry['value']
+
+
+# Collect the tags touched during a flush and bump them once the
+# transaction has committed.
+
+def queue_tags(session, tags):
+    """Bump `tags` when the session's transaction commits (for bulk INSERTs that skip the flush)"""
+    session.info.setdefault('cache_tags', set()).update(tags)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_cache_tags(session, flush_context):
+    tags = {MODEL_TAGS.get(type(obj).__name__) for obj in session.new}
+    tags.update(MODEL_TAGS.get(type(obj).__name__) for obj in session.deleted)
+    tags.update(MODEL_TAGS.get(type(obj).__name__) for obj in session.dirty
+                if session.is_modified(obj, include_collections=False))
+    tags.discard(None)
+    if tags:
+        queue_tags(session, tags)
+
+
+@event.listens_for(Session, 'after_commit')
+def _bump_after_commit(session):
+    tags = session.info.pop('cache_tags', None)
+    if tags:
+        bump_tags(sorted(tags))
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_after_rollback(session):
+    session.info.pop('cache_tags', None)